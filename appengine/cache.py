@@ -0,0 +1,252 @@
+import hashlib
+from collections import OrderedDict
+from threading import Event, Lock
+import time
+
+PLAN_CACHE_SIZE = 256
+PLAN_CACHE_TTL = 5 * 60  # seconds
+CATALOG_CACHE_SIZE = 4096
+DATASET_TTL = 60  # seconds
+WORKERS_TTL = 10  # seconds
+
+
+class LRUCache(object):
+    """A bounded, thread-safe least-recently-used cache.
+
+    Entries optionally expire ``ttl`` seconds after they were stored.
+    Concurrent misses on the same key are coalesced: one caller computes
+    the value while the others wait for it and then share the result."""
+
+    def __init__(self, max_size=128, ttl=None, clock=time.time):
+        assert max_size > 0
+        self.max_size = max_size
+        self.ttl = ttl
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # key -> (expiry time, value)
+        self._pending = {}  # key -> Event set when the computation ends
+        self._lock = Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        with self._lock:
+            return self._lookup(key)[0]
+
+    def _lookup(self, key):
+        """Return (found, value) and mark the entry as recently used. Must
+        be called with the lock held."""
+        try:
+            expiry, value = self._entries.pop(key)
+        except KeyError:
+            return False, None
+        if expiry is not None and expiry <= self.clock():
+            return False, None
+        self._entries[key] = (expiry, value)
+        return True, value
+
+    def _store(self, key, value):
+        """Must be called with the lock held."""
+        expiry = None
+        if self.ttl is not None:
+            expiry = self.clock() + self.ttl
+        self._entries.pop(key, None)
+        self._entries[key] = (expiry, value)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def get(self, key, default=None):
+        with self._lock:
+            found, value = self._lookup(key)
+            if found:
+                self.hits += 1
+                return value
+            self.misses += 1
+            return default
+
+    def put(self, key, value):
+        with self._lock:
+            self._store(key, value)
+
+    def invalidate(self, key=None):
+        """Drop the entry for key, or every entry if no key is given."""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def get_or_compute(self, key, compute):
+        """Return the cached value for key, calling compute() to produce
+        and store it on a miss. Only one thread computes a given key at a
+        time; exceptions are not cached and propagate to that thread, after
+        which a waiting thread retries the computation itself."""
+        while True:
+            with self._lock:
+                found, value = self._lookup(key)
+                if found:
+                    self.hits += 1
+                    return value
+                pending = self._pending.get(key)
+                if pending is None:
+                    pending = self._pending[key] = Event()
+                    self.misses += 1
+                    break
+            pending.wait()
+
+        try:
+            value = compute()
+            with self._lock:
+                self._store(key, value)
+            return value
+        finally:
+            with self._lock:
+                del self._pending[key]
+            pending.set()
+
+    @property
+    def stats(self):
+        return {'size': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses}
+
+
+class RefreshingValue(object):
+    """A single value, fetched on first use and refreshed once it is older
+    than ttl seconds. The first reader to find it stale fetches a new one
+    itself (App Engine does not let a request leave a thread running), and
+    the readers that come while it does get the last fetched value. Only the
+    very first readers wait, and they share one fetch. Exceptions propagate
+    to the reader that fetched, after which the next one retries."""
+
+    def __init__(self, fetch, ttl, clock=time.time):
+        self.fetch = fetch
+        self.ttl = ttl
+        self.clock = clock
+        self.fetches = 0
+        self._value = None
+        self._fetched_at = None
+        self._refreshing = None  # Event set when the running fetch ends
+        self._lock = Lock()
+
+    def get(self):
+        while True:
+            with self._lock:
+                refreshing = self._refreshing
+                if self._fetched_at is not None:
+                    stale = self.clock() - self._fetched_at >= self.ttl
+                    if not stale or refreshing is not None:
+                        return self._value
+                    self._refreshing = Event()
+                    break
+                if refreshing is None:
+                    self._refreshing = Event()
+                    break
+            refreshing.wait()
+        self._refresh()
+        with self._lock:
+            return self._value
+
+    def _refresh(self):
+        try:
+            value = self.fetch()
+            with self._lock:
+                self.fetches += 1
+                self._value = value
+                self._fetched_at = self.clock()
+        finally:
+            with self._lock:
+                refreshing, self._refreshing = self._refreshing, None
+            refreshing.set()
+
+
+class PlanCache(LRUCache):
+    """Caches the compiled forms of a query (logical plan, physical plan and
+    Myria JSON) so that the /plan, /dot, /optimize, /compile and /execute
+    requests the editor issues for the same program compile it only once.
+
+    Keys include a catalog version, which is bumped whenever the catalog may
+    have changed in a way that affects compiled plans."""
+
+    def __init__(self, max_size=PLAN_CACHE_SIZE, ttl=PLAN_CACHE_TTL,
+                 clock=time.time):
+        LRUCache.__init__(self, max_size=max_size, ttl=ttl, clock=clock)
+        self.catalog_version = 0
+
+    def key(self, query, language, plan_type,
+            multiway_join=False, push_sql=False):
+        if isinstance(query, unicode):
+            query = query.encode('utf-8')
+        if plan_type == 'logical':
+            # the logical plan does not depend on the physical options
+            multiway_join = push_sql = False
+        return (hashlib.sha1(query).hexdigest(), language, plan_type,
+                bool(multiway_join), bool(push_sql), self.catalog_version)
+
+    def catalog_changed(self):
+        """Forget every plan compiled against the previous catalog."""
+        with self._lock:
+            self.catalog_version += 1
+            self._entries.clear()
+
+
+class CatalogCache(object):
+    """Caches the coordinator's catalog: dataset descriptions (which carry
+    both the schema and the cardinality of a relation) and the list of live
+    workers. Each kind of entry has its own time-to-live, and the cache can
+    be warmed in bulk from a single datasets() listing.
+
+    Every invalidation bumps the cache's version and calls on_change, so
+    that derived caches (like the PlanCache) can drop what they hold."""
+
+    def __init__(self, connection, dataset_ttl=DATASET_TTL,
+                 workers_ttl=WORKERS_TTL, max_datasets=CATALOG_CACHE_SIZE,
+                 on_change=None, clock=time.time):
+        self.connection = connection
+        self.datasets = LRUCache(max_size=max_datasets, ttl=dataset_ttl,
+                                 clock=clock)
+        self.workers = LRUCache(max_size=1, ttl=workers_ttl, clock=clock)
+        self.on_change = on_change
+        self.version = 0
+        self._lock = Lock()
+
+    @staticmethod
+    def key(relation_key):
+        return (relation_key['userName'], relation_key['programName'],
+                relation_key['relationName'])
+
+    def dataset(self, relation_key):
+        """The description of the dataset with the given relation key, as
+        returned by connection.dataset(). Lookup errors are not cached."""
+        return self.datasets.get_or_compute(
+            self.key(relation_key),
+            lambda: self.connection.dataset(relation_key))
+
+    def workers_alive(self):
+        return self.workers.get_or_compute(
+            'alive', self.connection.workers_alive)
+
+    def warm(self, datasets=None):
+        """Store every dataset in the listing, fetching the listing with a
+        single connection.datasets() call if it is not given. Returns the
+        listing."""
+        if datasets is None:
+            datasets = self.connection.datasets()
+        for dataset in datasets:
+            self.datasets.put(self.key(dataset['relationKey']), dataset)
+        return datasets
+
+    def invalidate(self, relation_key=None):
+        """Forget the given dataset, or the whole catalog if no relation key
+        is given."""
+        if relation_key is None:
+            self.datasets.invalidate()
+            self.workers.invalidate()
+        else:
+            self.datasets.invalidate(self.key(relation_key))
+        with self._lock:
+            self.version += 1
+        if self.on_change is not None:
+            self.on_change()
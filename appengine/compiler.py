@@ -0,0 +1,236 @@
+import copy
+import os
+
+from ply import lex, yacc
+# Lexers built from here on, such as the Myrial scanner's (built when raco
+# imports it), find the rules to try by the next character (see FastLexer).
+# myria_web_main sets this too, before raco can be imported through another
+# module; it is set here for scripts, such as parser_tables.py, that import
+# the compiler directly.
+lex.fast_lexer = 1
+from raco import RACompiler
+from raco.myrial.exceptions import MyrialCompileException
+from raco.myrial import parser as MyrialParser
+from raco.myrial import interpreter as MyrialInterpreter
+from raco.language.myrialang import (MyriaLeftDeepTreeAlgebra,
+                                     MyriaHyperCubeAlgebra,
+                                     compile_to_json)
+from raco.language.logical import OptLogicalAlgebra
+
+from raco.viz import get_dot
+from raco.catalog import Catalog
+from raco.algebra import DEFAULT_CARDINALITY
+from raco import scheme
+from locked_parser import LockedParser
+
+import myria
+
+__all__ = ['CompilationSession', 'MyriaCatalog', 'MyrialCompileException',
+           'NoSuchRelationException', 'get_dot', 'get_logical_plan',
+           'get_physical_plan', 'get_plan', 'myrial_parser',
+           'normalize_language']
+
+# Exceptions raised by the compiler when the query itself is at fault
+NoSuchRelationException = MyrialInterpreter.NoSuchRelationException
+
+# The directory of the Myrial parser's binary LR table cache, prebuilt by
+# parser_tables.py at deploy time. yacc() calls in the application load their
+# tables from it, each grammar from a file named by its signature (written,
+# where the filesystem allows, when there is none for the grammar yet).
+MYRIAL_TABLES = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                             'myrial_tables')
+yacc.tab_cache_dir = MYRIAL_TABLES
+
+# We need a (global) lock on the Myrial parser because yacc is not Threadsafe,
+# .. see uwescience/datalogcompiler#39
+# ..    (https://github.com/uwescience/datalogcompiler/issues/39)
+# .. and raco's Parser.parse() lexes with the module's one scanner.lexer and
+# .. keeps the functions a program defines in class attributes, so separate
+# .. parsers could not parse concurrently either.
+myrial_parser = LockedParser(MyrialParser.Parser)
+
+
+def normalize_language(language):
+    if language is None:
+        return "datalog"
+    return language.strip().lower()
+
+
+class CompilationSession(object):
+    """Compiles one program for one set of options. The program is parsed
+    and interpreted at most once, and the logical plan, physical plan and
+    Myria JSON are all derived from that single evaluation (and catalog).
+    Plans found in the (optional) PlanCache are returned without parsing
+    the program at all."""
+
+    def __init__(self, query, language, connection,
+                 multiway_join=False, push_sql=False, cache=None,
+                 catalog_cache=None):
+        self.query = query
+        self.language = normalize_language(language)
+        self.connection = connection
+        self.multiway_join = multiway_join
+        self.push_sql = push_sql
+        self.cache = cache
+        self.catalog_cache = catalog_cache
+        self._catalog = None
+        self._evaluated = None
+
+    @property
+    def catalog(self):
+        if self._catalog is None:
+            self._catalog = MyriaCatalog(self.connection,
+                                         cache=self.catalog_cache)
+        return self._catalog
+
+    def target_algebra(self):
+        if self.multiway_join:
+            assert self.catalog.get_num_servers()
+            return MyriaHyperCubeAlgebra(self.catalog)
+        return MyriaLeftDeepTreeAlgebra()
+
+    def evaluate(self):
+        """Parse and interpret the program, returning the RACompiler (for
+        Datalog) or StatementProcessor (for MyriaL and SQL) holding it."""
+        if self._evaluated is not None:
+            return self._evaluated
+
+        if self.language == "datalog":
+            dlog = RACompiler()
+            dlog.fromDatalog(self.query)
+            if not dlog.logicalplan:
+                raise SyntaxError("Unable to parse Datalog")
+            self._evaluated = dlog
+        elif self.language in ["myrial", "sql"]:
+            parsed = myrial_parser.parse(self.query)
+            processor = MyrialInterpreter.StatementProcessor(self.catalog)
+            processor.evaluate(parsed)
+            self._evaluated = processor
+        else:
+            raise NotImplementedError(
+                'Language %s is not supported' % self.language)
+        return self._evaluated
+
+    def compile(self, plan_type):
+        evaluated = self.evaluate()
+        # Optimization rewrites operator trees in place, so the logical plan
+        # is copied to keep it intact when a physical plan is derived from
+        # the same evaluation.
+        if self.language == "datalog":
+            if plan_type == 'logical':
+                return copy.deepcopy(evaluated.logicalplan)
+            elif plan_type == 'physical':
+                evaluated.optimize(target=self.target_algebra(),
+                                   push_sql=self.push_sql)
+                return evaluated.physicalplan
+            else:
+                raise NotImplementedError('Datalog plan type %s' % plan_type)
+        else:
+            if plan_type == 'logical':
+                return copy.deepcopy(evaluated.get_physical_plan(
+                    target_alg=OptLogicalAlgebra()))
+            elif plan_type == 'physical':
+                return evaluated.get_physical_plan(
+                    target_alg=self.target_algebra(),
+                    multiway_join=self.multiway_join,
+                    push_sql=self.push_sql)
+            else:
+                raise NotImplementedError('Myria plan type %s' % plan_type)
+
+    def compile_json(self):
+        return compile_to_json(self.query, str(self.logical_plan()),
+                               self.physical_plan(), self.language)
+
+    def _cached(self, plan_type, compile_func):
+        if self.cache is None:
+            return compile_func()
+        key = self.cache.key(self.query, self.language, plan_type,
+                             multiway_join=self.multiway_join,
+                             push_sql=self.push_sql)
+        return self.cache.get_or_compute(key, compile_func)
+
+    def plan(self, plan_type):
+        return self._cached(plan_type, lambda: self.compile(plan_type))
+
+    def logical_plan(self):
+        return self.plan('logical')
+
+    def physical_plan(self):
+        return self.plan('physical')
+
+    def compiled(self):
+        """The query compiled to Myria JSON. The returned dictionary may be
+        shared with other requests through the cache, so callers must copy
+        it before modifying it."""
+        return self._cached('json', self.compile_json)
+
+
+def get_plan(query, language, plan_type, connection,
+             multiway_join=False, push_sql=False, cache=None):
+    return CompilationSession(
+        query, language, connection, multiway_join=multiway_join,
+        push_sql=push_sql, cache=cache).plan(plan_type)
+
+
+def get_logical_plan(query, language, connection, push_sql=False,
+                     cache=None):
+    return get_plan(query, language, 'logical', connection,
+                    push_sql=push_sql, cache=cache)
+
+
+def get_physical_plan(query, language, connection,
+                      multiway_join=False, push_sql=False, cache=None):
+    return get_plan(query, language, 'physical', connection,
+                    multiway_join=multiway_join, push_sql=push_sql,
+                    cache=cache)
+
+
+class MyriaCatalog(Catalog):
+
+    def __init__(self, connection, cache=None):
+        self.connection = connection
+        self.cache = cache
+
+    def dataset_info(self, rel_key):
+        relation_args = {
+            'userName': rel_key.user,
+            'programName': rel_key.program,
+            'relationName': rel_key.relation
+        }
+        if self.cache is not None:
+            return self.cache.dataset(relation_args)
+        return self.connection.dataset(relation_args)
+
+    def get_scheme(self, rel_key):
+        if not self.connection:
+            raise RuntimeError(
+                "no schema for relation %s because no connection" % rel_key)
+        try:
+            dataset_info = self.dataset_info(rel_key)
+        except myria.MyriaError:
+            raise ValueError('No relation {} in the catalog'.format(rel_key))
+        schema = dataset_info['schema']
+        return scheme.Scheme(zip(schema['columnNames'], schema['columnTypes']))
+
+    def get_num_servers(self):
+        if not self.connection:
+            raise RuntimeError("no connection.")
+        if self.cache is not None:
+            return len(self.cache.workers_alive())
+        return len(self.connection.workers_alive())
+
+    def num_tuples(self, rel_key):
+        if not self.connection:
+            raise RuntimeError(
+                "no cardinality of %s because no connection" % rel_key)
+        try:
+            dataset_info = self.dataset_info(rel_key)
+        except myria.MyriaError:
+            raise ValueError(rel_key)
+        num_tuples = dataset_info['numTuples']
+        assert isinstance(num_tuples, (int, long)), type(num_tuples)
+        # that's a work round. numTuples is -1 if the dataset is old
+        if num_tuples != -1:
+            assert num_tuples >= 0
+            return num_tuples
+        return DEFAULT_CARDINALITY
@@ -0,0 +1,102 @@
+from threading import Lock
+import time
+
+from cache import LRUCache
+
+# How long (seconds) a listing of the catalog, and searches over it, are
+# reused before the coordinator is asked again
+DATASET_LISTING_TTL = 30
+# How many distinct searches (filters and sort orders) to keep
+DATASET_SEARCH_CACHE_SIZE = 64
+
+# The orders datasets can be listed in, and what each one sorts by
+SORT_KEYS = {
+    'created': lambda d: d.get('created') or '',
+    'size': lambda d: d.get('numTuples', -1),
+    'name': lambda d: (d['relationKey']['relationName'].lower(),
+                       d['relationKey']['userName'].lower(),
+                       d['relationKey']['programName'].lower()),
+}
+DEFAULT_SORT = 'created'
+
+
+def normalize_sort(sort, order=None):
+    """The (sort key, descending) a request asks for. Unknown sort keys fall
+    back to the default, and dates and sizes list the newest or largest
+    first unless asked otherwise."""
+    if sort not in SORT_KEYS:
+        sort = DEFAULT_SORT
+    if order in ('asc', 'desc'):
+        return sort, order == 'desc'
+    return sort, sort != 'name'
+
+
+def matches(dataset, user=None, program=None, name=None):
+    """Whether the dataset's relation key matches the filters. The user and
+    program must match exactly, the name is a case-insensitive substring;
+    empty filters match everything."""
+    key = dataset['relationKey']
+    if user and key['userName'] != user:
+        return False
+    if program and key['programName'] != program:
+        return False
+    if name and name.lower() not in key['relationName'].lower():
+        return False
+    return True
+
+
+class DatasetIndex(object):
+    """A searchable, sorted view of the datasets in the catalog.
+
+    The coordinator only lists every dataset at once, so the listing is
+    fetched at most once per ttl seconds (also warming the CatalogCache) and
+    shared by every request. The matching datasets of each search are kept,
+    in order, for as long as the listing they came from, so that paging
+    through results does not filter and sort the catalog again."""
+
+    def __init__(self, catalog_cache, ttl=DATASET_LISTING_TTL,
+                 max_searches=DATASET_SEARCH_CACHE_SIZE, clock=time.time):
+        self.catalog_cache = catalog_cache
+        self.listings = LRUCache(max_size=1, ttl=ttl, clock=clock)
+        self.searches = LRUCache(max_size=max_searches, ttl=ttl, clock=clock)
+        self._generation = 0
+        self._lock = Lock()
+
+    def listing(self):
+        """Returns (generation, datasets), where the generation identifies
+        this fetch of the listing. The listing is fetched again once it
+        expires or the catalog changes."""
+        return self.listings.get_or_compute(
+            self.catalog_cache.version, self._fetch)
+
+    def _fetch(self):
+        datasets = self.catalog_cache.warm()
+        with self._lock:
+            self._generation += 1
+            return self._generation, datasets
+
+    def search(self, user=None, program=None, name=None, sort=None,
+               order=None):
+        """Every dataset that matches the filters, in the requested order."""
+        sort, descending = normalize_sort(sort, order)
+        generation, datasets = self.listing()
+        key = (generation, user or None, program or None, name or None,
+               sort, descending)
+
+        def compute():
+            found = [d for d in datasets
+                     if matches(d, user, program, name)]
+            found.sort(key=SORT_KEYS[sort], reverse=descending)
+            return found
+        return self.searches.get_or_compute(key, compute)
+
+    def page(self, offset, limit, **filters):
+        """One page of a search: returns a dictionary with the matching
+        datasets in the page ('results'), the page's offset and limit, and
+        the number of datasets that match ('total')."""
+        found = self.search(**filters)
+        offset = max(0, min(offset, len(found)))
+        return {'results': found[offset:offset + limit],
+                'offset': offset,
+                'limit': limit,
+                'total': len(found)}
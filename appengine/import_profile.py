@@ -0,0 +1,87 @@
+"""Measures what importing modules costs, to find what slows down the first
+request to a cold instance.
+
+    python import_profile.py [--limit N] [module ...]
+
+imports each module (by default the web application, then everything it
+loads lazily) and prints the slowest imports, with the time spent in each
+module itself and including the modules it imported in turn.
+"""
+import __builtin__
+import argparse
+import sys
+import time
+
+# What a cold instance imports: the application, then its lazy modules
+DEFAULT_MODULES = ['myria_web_main', 'compiler', 'raco.myrial.keywords',
+                   'examples', 'demo3_examples']
+
+
+class ImportProfiler(object):
+    """Wraps __import__ to time every import of a module that is not
+    already loaded. Nested imports are charged to the importing module's
+    inclusive time but not to its self time."""
+
+    def __init__(self, clock=time.time):
+        self.clock = clock
+        self.inclusive = {}
+        self.self_time = {}
+        self._stack = []
+        self._original = None
+
+    def _import(self, name, globals=None, locals=None, fromlist=None,
+                level=-1):
+        if name in sys.modules:
+            return self._original(name, globals, locals, fromlist, level)
+        start = self.clock()
+        self._stack.append(0.0)
+        try:
+            return self._original(name, globals, locals, fromlist, level)
+        finally:
+            children = self._stack.pop()
+            elapsed = self.clock() - start
+            if name not in self.inclusive:
+                self.inclusive[name] = elapsed
+                self.self_time[name] = elapsed - children
+            if self._stack:
+                self._stack[-1] += elapsed
+
+    def __enter__(self):
+        self._original = __builtin__.__import__
+        __builtin__.__import__ = self._import
+        return self
+
+    def __exit__(self, *exc_info):
+        __builtin__.__import__ = self._original
+
+    def report(self, limit=30, out=sys.stdout):
+        total = sum(self.self_time.values())
+        out.write('%d modules imported in %.3fs\n' %
+                  (len(self.inclusive), total))
+        out.write('%10s %10s  %s\n' % ('self (s)', 'incl (s)', 'module'))
+        slowest = sorted(self.inclusive, key=self.self_time.get,
+                         reverse=True)[:limit]
+        for name in slowest:
+            out.write('%10.4f %10.4f  %s\n' % (
+                self.self_time[name], self.inclusive[name], name))
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--limit', type=int, default=30,
+                        help='how many modules to list')
+    parser.add_argument('modules', nargs='*', default=DEFAULT_MODULES)
+    args = parser.parse_args(argv)
+
+    profiler = ImportProfiler()
+    with profiler:
+        for module in args.modules:
+            start = time.time()
+            __import__(module)
+            sys.stdout.write('import %s: %.3fs\n' %
+                             (module, time.time() - start))
+    profiler.report(limit=args.limit)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
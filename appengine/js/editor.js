@@ -190,9 +190,8 @@ function displayQueryStatus(query_status) {
   $("abbr.timeago").timeago();
 
   if (status === 'ACCEPTED' || status === 'RUNNING' || status === 'PAUSED' || status === 'KILLING') {
-    setTimeout(function () {
-      checkQueryStatus(query_id);
-    }, 1000);
+    // the server holds the request until the status changes
+    checkQueryStatus(query_id, status);
   }
 }
 
@@ -205,17 +204,24 @@ function displayQueryError(error, query_id) {
   }, 1000);
 }
 
-function checkQueryStatus(query_id) {
+function checkQueryStatus(query_id, known_status) {
   var errFunc = function (error) {
     displayQueryError(error, query_id);
   };
-  $.ajax("execute", {
+  var data = {queryId: query_id};
+  if (known_status) {
+    data.status = known_status;
+  }
+  $.ajax("status", {
     type: 'GET',
-    data: {
-      queryId: query_id,
-      language: editorLanguage
+    data: data,
+    success: function (statuses) {
+      if (!(query_id in statuses)) {
+        errFunc({responseText: ''});
+        return;
+      }
+      displayQueryStatus(statuses[query_id]);
     },
-    success: displayQueryStatus,
     error: errFunc
   });
 }
@@ -218,11 +218,8 @@ var lineChart = function(element, fragmentId, numWorkers, operators, callback, g
             onlyRootOp: false
         });
 
-        d3.csv(url, function(d) {
-            d.nanoTime = +d.nanoTime;
-            d.numWorkers = +d.numWorkers;
-            return d;
-        }, function(error, incompleteData) {
+        fetchColumns(url, function(error, table) {
+            var incompleteData = error ? [] : tableRows(table);
             var incompleteNested = d3.nest()
                 .key(function(d) { return d.opId; })
                 .entries(incompleteData);
@@ -212,8 +212,8 @@ function drawLineChart(element, fragmentId, graph, numWorkers, lanesChart) {
             .style("opacity", 0);
     });
 
-    // fetch histogram data and show it
-    function fetchData(range, callback) {
+    // fetch histogram data
+    function fetchHistogram(range, callback) {
         var start = range[0],
             end = range[1];
         var step = Math.floor((end - start)/width);
@@ -229,12 +229,15 @@ function drawLineChart(element, fragmentId, graph, numWorkers, lanesChart) {
             onlyRootOp: true
         });
 
-        d3.csv(url, function(d) {
-            d.nanoTime = +d.nanoTime;
-            d.numWorkers = +d.numWorkers;
-            return d;
-        }, function(error, incompleteData) {
-            var data = reconstructFullData(incompleteData, start, end, step, false);
+        fetchColumns(url, function(error, table) {
+            var incompleteData = error ? [] : tableRows(table);
+            callback(reconstructFullData(incompleteData, start, end, step, false));
+        });
+    }
+
+    // fetch histogram data and show it
+    function fetchData(range, callback) {
+        fetchHistogram(range, function(data) {
             x.domain(range);
             y.domain([0, numWorkers]);
 
@@ -288,18 +291,58 @@ function drawLineChart(element, fragmentId, graph, numWorkers, lanesChart) {
         });
     d3.csv(url, function(d) {
         wholeRange = [+d[0].min_startTime, +d[0].max_endTime];
-        fetchData(wholeRange, function(data) {
-            x2.domain(wholeRange);
-            y2.domain([0, numWorkers]);
+        fetchData(wholeRange, drawMinimap);
+        if (isRunning(graph.queryStatus)) {
+            tail(null);
+        }
+    });
 
-            plot.select(".y.axis").call(yAxis);
+    function drawMinimap(data) {
+        x2.domain(wholeRange);
+        y2.domain([0, numWorkers]);
 
-            mini_brush.select(".x.axis").call(xAxis2);
-            mini_brush.select(".area")
-                .datum(data)
-                .attr("d", area2);
+        plot.select(".y.axis").call(yAxis);
+
+        mini_brush.select(".x.axis").call(xAxis2);
+        mini_brush.select(".area")
+            .datum(data)
+            .attr("d", area2);
+    }
+
+    // Follow a running query: the intervals that ended are added to the
+    // lanes, and the charts are redrawn from the (updated) histograms when
+    // the activity changed.
+    function tail(version) {
+        var url = templates.urls.tail({
+            query: graph.queryStatus.queryId,
+            subquery: graph.queryStatus.subqueryId,
+            fragment: fragmentId,
+            version: version
         });
-    });
+        d3.json(url, function(delta) {
+            if (!delta) {
+                return;
+            }
+            if (delta.timeRange) {
+                wholeRange = delta.timeRange;
+            }
+            if (version !== null && (delta.reset || delta.activity.length)) {
+                if (brush.empty()) {
+                    fetchData(wholeRange, drawMinimap);
+                } else {
+                    fetchHistogram(wholeRange, drawMinimap);
+                }
+            }
+            if (delta.reset) {
+                lanesChart.reload();
+            } else {
+                lanesChart.addIntervals(delta.intervals);
+            }
+            if (!delta.finished) {
+                setTimeout(function() { tail(delta.version); }, liveRefreshInterval);
+            }
+        });
+    }
 
     function brushed() {
         x.domain(brush.empty() ? wholeRange : brush.extent());
@@ -314,7 +357,7 @@ function drawLineChart(element, fragmentId, graph, numWorkers, lanesChart) {
         fetchData(range, function() {});
 
         if (brush.empty()) {
-            lanesChart.redrawLanes([], [0, 1]);
+            lanesChart.clear();
             lanesChart.toggleHelp(true);
         } else {
             lanesChart.fetchData(range);
@@ -327,7 +370,7 @@ function drawLineChart(element, fragmentId, graph, numWorkers, lanesChart) {
         var range = [Math.floor(brush_extent[0]), Math.ceil(brush_extent[1])];
 
         if (brush2.empty()) {
-            lanesChart.redrawLanes([], [0, 1]);
+            lanesChart.clear();
             lanesChart.toggleHelp(true);
         } else {
             lanesChart.fetchData(range);
@@ -501,23 +544,65 @@ function drawLanes(element, fragmentId, graph, numWorkers, idNameMapping, levels
             alert("We are only showing events for the root operators because the selected range is too long.");
          }
 
-        d3.csv(url, function(d) {
-            d.workerId = +d.workerId;
-            d.startTime = +d.startTime;
-            d.endTime = +d.endTime;
-            d.numTuples = +d.numTuples;
-            return d;
-        }, function(error, data) {
+        fetchColumns(url, function(error, table) {
+            var data = error ? [] : tableRows(table);
             var aggregatedData = [],
                 grouped = _.groupBy(data, 'workerId'),
                 numOps = graph.fragments[fragmentId].operators.length;
             aggregatedData = _.map(grouped, function(val, key){
                 return { workerId: +key, states: val };
             });
+            shown = {
+                range: range,
+                onlyRootOp: tooLarge,
+                minLength: Math.floor(0.5*(range[1] - range[0])/width),
+                data: aggregatedData
+            };
             redrawLanes(aggregatedData, range);
         });
     }
 
+    // the range and intervals the lanes show, if any
+    var shown = null;
+
+    // add the intervals of a running query that ended since the lanes were
+    // fetched, as [workerId, depth, opId, startTime, endTime, numTuples]
+    function addIntervals(intervals) {
+        if (shown === null) {
+            return;
+        }
+        var added = false;
+        _.each(intervals, function(i) {
+            var d = {workerId: i[0], opId: i[2], startTime: i[3], endTime: i[4], numTuples: i[5]};
+            if (d.endTime < shown.range[0] || d.startTime > shown.range[1] ||
+                    d.endTime - d.startTime < shown.minLength ||
+                    (shown.onlyRootOp && i[1] > 0)) {
+                return;
+            }
+            var lane = _.findWhere(shown.data, {workerId: d.workerId});
+            if (lane === undefined) {
+                lane = {workerId: d.workerId, states: []};
+                shown.data.push(lane);
+            }
+            lane.states.push(d);
+            added = true;
+        });
+        if (added) {
+            redrawLanes(shown.data, shown.range);
+        }
+    }
+
+    function clear() {
+        shown = null;
+        redrawLanes([], [0, 1]);
+    }
+
+    function reload() {
+        if (shown !== null) {
+            fetchData(shown.range);
+        }
+    }
+
     var maxLevel = _.max(_.values(levels));
 
     function redrawLanes(data, range) {
@@ -640,7 +725,10 @@ function drawLanes(element, fragmentId, graph, numWorkers, idNameMapping, levels
     return {
         redrawLanes: redrawLanes,
         toggleHelp: toggleHelp,
-        fetchData: fetchData
+        fetchData: fetchData,
+        clear: clear,
+        addIntervals: addIntervals,
+        reload: reload
     };
 }
 
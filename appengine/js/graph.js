@@ -178,17 +178,13 @@ function Graph () {
     Graph.prototype.loadCosts = function(cb) {
         var self = this;
 
-        var url = templates.urls.aggregatedSentData({
-            myria: myriaConnection,
+        var url = templates.urls.shuffle({
             query: self.queryStatus.queryId,
             subquery: self.queryStatus.subqueryId
         });
 
-        d3.csv(url, function(d) {
-            d.numTuples = +d.numTuples;
-            d.duration = +d.duration;
-            return d;
-        }, function(data) {
+        d3.json(url, function(shuffle) {
+            var data = shuffle ? shuffle.fragments : [];
             var d = _.pluck(data, "numTuples");
             self.costs = d3.scale.linear().domain([0, _.max(d)]).range([2, 6]);
             self.linkAttr = {};
@@ -77,53 +77,51 @@ var networkVisualization = function (element, fragments, queryStatus, linkAttr)
             .attr('class','ticks')
             .attr('transform', 'translate(' + (-4) + ', 0)');
 
-        // download data
+        // download the aggregates of the fragment's sent log
         var fragmentId = fragments[0];
-        var url = templates.urls.sentData({
-            myria: myriaConnection,
+        var url = templates.urls.fragmentShuffle({
             query: queryStatus.queryId,
             subquery: queryStatus.subqueryId,
             fragment: fragmentId
         });
 
-        d3.csv(url, function(d) {
-            d.numTuples = +d.numTuples;
-            return d;
-        }, function (data) {
-            var summary = {
-                    numTuples: 0,
-                    localTuples: 0
-                },
-                sources = {},
-                destinations = {};
-
-            data = _.map(data, function(d) {
-                if (!(d.src in sources)) {
-                    sources[d.src] = 0;
-                }
-                sources[d.src] += +d.numTuples;
-
-                if (!(d.dest in destinations)) {
-                    destinations[d.dest] = 0;
-                }
-                destinations[d.dest] += +d.numTuples;
-
-                summary.numTuples += d.numTuples;
-                if (d.src == d.dest) {
-                    summary.localTuples += d.numTuples;
-                }
-                d.pixelID = '' + d.src + '_' + d.dest;
-                return d;
+        d3.json(url, function(shuffle) {
+            var workers = shuffle.workers,
+                data = [];
+
+            _.each(shuffle.matrix, function(row, i) {
+                _.each(row, function(numTuples, j) {
+                    if (numTuples > 0) {
+                        data.push({
+                            src: workers[i],
+                            dest: workers[j],
+                            numTuples: numTuples,
+                            pixelID: '' + workers[i] + '_' + workers[j]
+                        });
+                    }
+                });
             });
 
+            var summary = {
+                numTuples: shuffle.numTuples,
+                localTuples: shuffle.localTuples,
+                sourceSkew: shuffle.sourceSkew,
+                destinationSkew: shuffle.destinationSkew
+            };
+
             // Dan NB: we could also get numTuples from linkAttr.
             // .. I did verify that they match for q46220 and q59564
             summary.duration = linkAttr.duration;
 
             updateSummary(element.select(".summary"), summary);
 
-            sourceList = _.map(_.pairs(sources), function(d) {return {id: +d[0], numTuples: d[1]}; });
-            destinationList = _.map(_.pairs(destinations), function(d) {return {id: +d[0], numTuples: d[1]}; });
+            var workerTotals = function(totals) {
+                return _.filter(_.map(workers, function(id, i) {
+                    return {id: id, numTuples: totals[i]};
+                }), function(d) { return d.numTuples > 0; });
+            };
+            sourceList = workerTotals(shuffle.sources);
+            destinationList = workerTotals(shuffle.destinations);
 
             draw(data, sourceList, destinationList, 'id');
         });
@@ -346,6 +344,13 @@ var updateSummary = function(element, summary) {
     items += templates.defItem({key: "Local tuples sent", value: Intl.NumberFormat().format(summary.localTuples)});
     items += templates.defItem({key: "Duration", value: customFullTimeFormat(summary.duration, false)});
     items += templates.defItem({key: "Tuples per second", value: (summary.numTuples / summary.duration * 1000000).toFixed(3)});
+    // how much more the busiest worker sent or received than the average
+    if (summary.sourceSkew && summary.sourceSkew.maxOverMean !== null) {
+        items += templates.defItem({key: "Send skew (max / mean)", value: summary.sourceSkew.maxOverMean.toFixed(2)});
+    }
+    if (summary.destinationSkew && summary.destinationSkew.maxOverMean !== null) {
+        items += templates.defItem({key: "Receive skew (max / mean)", value: summary.destinationSkew.maxOverMean.toFixed(2)});
+    }
     var dl = templates.defList({items: items});
     $(element.node()).html(dl);
 };
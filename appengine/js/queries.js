@@ -1,23 +1,170 @@
+// How often (ms) the first page of the log checks for new queries
+var NEW_QUERIES_INTERVAL = 10 * 1000;
+
+// The CodeMirror mode that highlights each query language
+var queryModes = {myrial: 'myrial', sql: 'text/x-sql', datalog: 'prolog'};
+
+function highlightQuery(cell) {
+	var mode = queryModes[cell.attr('data-language')];
+	if (!mode) {
+		return;
+	}
+	var text = cell.text();
+	var pre = document.createElement('pre');
+	pre.className += "CodeMirror";
+	cell.empty().append(pre);
+	CodeMirror.runMode(text, {name: mode, singleLineStringErrors: false}, pre);
+}
+
+function isActive(status) {
+	return status == 'RUNNING' || status == 'ACCEPTED';
+}
+
+// A row of the query log, as templates/queries.html renders it
+function queryRow(q) {
+	var row = $('<tr class="query-row">')
+		.addClass(q.bootstrapStatus)
+		.attr('data-status', q.status)
+		.attr('data-id', q.queryId);
+	$('<td class="query-url">').append(
+		$('<a target="_blank">').attr('href', q.url).text(q.queryId)).appendTo(row);
+	highlightQuery($('<td class="query-raw">')
+		.attr('data-language', q.language).text(q.rawQuery).appendTo(row));
+	$('<td class="query-status">').text(q.status).appendTo(row);
+
+	var profile = $('<td>').appendTo(row);
+	if (q.profilingMode && q.profilingMode.indexOf('QUERY') >= 0) {
+		if (q.status == 'SUCCESS') {
+			$('<a class="glyphicon glyphicon-dashboard" data-toggle="tooltip" title="Visualization of query profiling">')
+				.attr('href', '/profile?queryId=' + q.queryId).appendTo(profile);
+		} else {
+			var title = isActive(q.status) ?
+				"Visualization will be available when the query has finished" :
+				"Visualization not available for failed queries";
+			$('<span class="glyphicon glyphicon-dashboard" data-toggle="tooltip">')
+				.attr('title', title).appendTo(profile);
+		}
+	} else {
+		$('<span title="Profiling not enabled for this query" data-toggle="tooltip">-</span>')
+			.appendTo(profile);
+	}
+
+	$('<td class="query-elapsed">').text(q.elapsedStr || '').appendTo(row);
+	var finish = $('<td class="query-finish">').appendTo(row);
+	if (isActive(q.status)) {
+		$('<a class="kill-query glyphicon glyphicon-remove-circle text-danger" data-toggle="tooltip">')
+			.attr('href', q.url).attr('title', 'Kill query ' + q.queryId).appendTo(finish);
+	} else {
+		$('<abbr class="timeago">').attr('title', q.finishTime).text(q.finishTime)
+			.appendTo(finish).timeago();
+	}
+	return row;
+}
+
 $(document).ready(function() {
-	$('.query-row[data-status="RUNNING"]').each(function(i, e) {
-		var qid = $(this).attr('data-id');
+	var table = $('.query-row').closest('table');
+	if (table.length === 0) {
+		table = $('.panel table');
+	}
+	// Only the unfiltered first page shows queries as they are submitted
+	var firstPage = !/[?&](max|q)=/.test(location.search);
+	var pageSize = Math.max($('.query-row').length, 1);
+	var rowIds = function(filter) {
+		return $('.query-row').filter(filter || '*').map(function() {
+			return parseInt($(this).attr('data-id'), 10);
+		}).get();
+	};
+	var latest = Math.max.apply(null, [0].concat(rowIds()));
+
+	// Replace the rows of queries that changed, and add new ones on top
+	var update = function(queries) {
+		_.each(_.sortBy(queries, 'queryId'), function(q) {
+			var row = $('.query-row[data-id="' + q.queryId + '"]');
+			if (row.length) {
+				row.replaceWith(queryRow(q));
+			} else if (firstPage && q.queryId > latest) {
+				table.find('td[colspan]').closest('tr').remove();
+				var first = $('.query-row').first();
+				if (first.length) {
+					first.before(queryRow(q));
+				} else {
+					table.append(queryRow(q));
+				}
+				$('.query-row').slice(pageSize).remove();
+			}
+		});
+		latest = Math.max.apply(null, [latest].concat(_.pluck(queries, 'queryId')));
+	};
+
+	// Fetch only the queries newer than the newest shown, and those shown
+	// as active; the server answers 304 when nothing changed
+	var refreshing = false;
+	var refresh = function() {
+		if (refreshing) {
+			return $.Deferred().resolve();
+		}
+		refreshing = true;
+		var args = {since: latest, active: rowIds('[data-status="RUNNING"],[data-status="ACCEPTED"]')};
+		return $.ajax({
+			url: '/queries.json?' + $.param(args, true),
+			dataType: 'json',
+			ifModified: true
+		}).done(function(data, textStatus) {
+			if (textStatus != 'notmodified') {
+				latest = Math.max(latest, data.latest);
+				update(data.results);
+			}
+		}).always(function() {
+			refreshing = false;
+		});
+	};
+
+	// Wait for any running query to change status with one long-poll
+	// request, and refresh the rows of the queries that did
+	var watching = false;
+	var watchRunning = function() {
+		var running = rowIds('[data-status="RUNNING"]');
+		if (running.length === 0) {
+			watching = false;
+			return;
+		}
+		watching = true;
+		var known = $.map(running, function() { return 'RUNNING'; });
+		$.getJSON('/status?' + $.param({queryId: running, status: known}, true))
+			.done(function(statuses) {
+				var changed = _.some(running, function(qid) {
+					return qid in statuses && statuses[qid].status != 'RUNNING';
+				});
+				if (changed) {
+					refresh().always(watchRunning);
+				} else {
+					watchRunning();
+				}
+			})
+			.fail(function() {
+				window.setTimeout(watchRunning, 10*1000);
+			});
+	};
+	watchRunning();
+
+	if (firstPage) {
 		window.setInterval(function() {
-			$.getJSON('/execute', { 'queryId': qid }, function(data) {
-				if (data.status != 'RUNNING') {
-					location.reload();
+			refresh().done(function() {
+				if (!watching) {
+					watchRunning();
 				}
 			});
-		}, 10*1000);
-	});
+		}, NEW_QUERIES_INTERVAL);
+	}
 
-	$('.kill-query').click(function() {
+	$(document).on('click', '.kill-query', function() {
 		$.ajax({
 		    url: $(this).attr('href'),
 		    type: 'DELETE',
 		    success: function(result) {
-		        location.reload();
+		        refresh();
 		    }
 		});
 		return false;
 	});
-});
\ No newline at end of file
+});
@@ -2,12 +2,18 @@
 var templates = {
     //*/
     urls: {
-        sentData: _.template("<%- myria %>/logs/sent?queryId=<%- query %>&subqueryId=<%- subquery %>&fragmentId=<%- fragment %>"),
-        aggregatedSentData: _.template("<%- myria %>/logs/aggregated_sent?queryId=<%- query %>&subqueryId=<%- subquery %>"),
-        profiling: _.template("<%- myria %>/logs/profiling?queryId=<%- query %>&subqueryId=<%- subquery %>&fragmentId=<%- fragment %>&start=<%- start %>&end=<%- end %>&onlyRootOp=<%- onlyRootOp %>&minLength=<%- minLength %>"),
-        range: _.template("<%- myria %>/logs/range?queryId=<%- query %>&subqueryId=<%- subquery %>&fragmentId=<%- fragment %>"),
+        // served by the web app from the sums of the sent logs
+        shuffle: _.template("/profile/shuffle?queryId=<%- query %>&subqueryId=<%- subquery %>"),
+        fragmentShuffle: _.template("/profile/shuffle?queryId=<%- query %>&subqueryId=<%- subquery %>&fragmentId=<%- fragment %>"),
+        // served by the web app from its operator interval index; runs of
+        // intervals shorter than minLength are merged into one
+        profiling: _.template("/profile/intervals?queryId=<%- query %>&subqueryId=<%- subquery %>&fragmentId=<%- fragment %>&start=<%- start %>&end=<%- end %>&onlyRootOp=<%- onlyRootOp %>&minLength=<%- minLength %>&merge=true&format=binary"),
+        // what changed in the profile of a running query since version
+        tail: _.template("/profile/tail?queryId=<%- query %>&subqueryId=<%- subquery %>&fragmentId=<%- fragment %><% if (version !== null) { %>&version=<%- version %><% } %>"),
+        range: _.template("/profile/range?queryId=<%- query %>&subqueryId=<%- subquery %>&fragmentId=<%- fragment %>"),
         contribution: _.template("<%- myria %>/logs/contribution?queryId=<%- query %>&subqueryId=<%- subquery %>&fragmentId=<%- fragment %>"),
-        histogram: _.template("<%- myria %>/logs/histogram?queryId=<%- query %>&subqueryId=<%- subquery %>&fragmentId=<%- fragment %>&start=<%- start %>&end=<%- end %>&step=<%- step %>&onlyRootOp=<%- onlyRootOp %>")
+        // served by the web app from its histogram pyramids
+        histogram: _.template("/profile/histogram?queryId=<%- query %>&subqueryId=<%- subquery %>&fragmentId=<%- fragment %>&start=<%- start %>&end=<%- end %>&step=<%- step %>&onlyRootOp=<%- onlyRootOp %>&format=binary")
     },
     /*/
     urls: {
@@ -173,6 +179,68 @@ var defaultNumSteps = 1000;
 // data is limited to root operators
 var maxTimeForDetails = 100 * 1e9;
 
+// how often the profile of a running query is refreshed, in milliseconds
+var liveRefreshInterval = 5000;
+
+function isRunning(queryStatus) {
+    return queryStatus.status == 'RUNNING' || queryStatus.status == 'ACCEPTED';
+}
+
+// Fetch a table served with format=binary: a JSON header followed by
+// little-endian columns that are viewed in place as typed arrays, without
+// parsing. Calls callback(error, table), where table.columns maps each
+// column name to its typed array and table.dictionaries maps the names of
+// string columns to the strings their codes stand for.
+function fetchColumns(url, callback) {
+    var xhr = new XMLHttpRequest();
+    xhr.open("GET", url);
+    xhr.responseType = "arraybuffer";
+    xhr.onload = function() {
+        if (xhr.status != 200) {
+            callback(xhr.status, null);
+            return;
+        }
+        callback(null, readFrame(xhr.response));
+    };
+    xhr.onerror = function() {
+        callback(xhr.status, null);
+    };
+    xhr.send();
+}
+
+function readFrame(buffer) {
+    var magic = String.fromCharCode.apply(null, new Uint8Array(buffer, 0, 8));
+    if (magic !== "MYRIAFRM") {
+        throw new Error("not a frame");
+    }
+    var headerLength = new DataView(buffer).getUint32(8, true),
+        header = JSON.parse(String.fromCharCode.apply(null, new Uint8Array(buffer, 12, headerLength))),
+        table = {kind: header.kind, rows: header.rows, columns: {}, dictionaries: {}};
+    _.each(header.columns, function(c) {
+        table.columns[c.name] = new window[c.type + "Array"](buffer, c.offset, c.length);
+        if (c.dictionary) {
+            table.dictionaries[c.name] = c.dictionary;
+        }
+    });
+    return table;
+}
+
+// the rows of a table as objects, with the strings of string columns
+function tableRows(table) {
+    var names = _.keys(table.columns),
+        rows = new Array(table.rows);
+    for (var i = 0; i < table.rows; i++) {
+        var row = {};
+        _.each(names, function(name) {
+            var value = table.columns[name][i],
+                dictionary = table.dictionaries[name];
+            row[name] = dictionary ? dictionary[value] : value;
+        });
+        rows[i] = row;
+    }
+    return rows;
+}
+
 // reconstruct all data, the data from myria has missing values where no workers were active
 function reconstructFullData(incompleteData, start, end, step, nested) {
     if (!nested) {
@@ -0,0 +1,49 @@
+import importlib
+from threading import Lock
+
+# Every lazy module created, so that a warmup request can load them all
+_lazy_modules = []
+
+
+class LazyModule(object):
+    """Stands in for a module that is only imported the first time one of
+    its attributes is used. Importing is thread-safe: Python's import lock
+    makes concurrent first uses share one import."""
+
+    def __init__(self, name):
+        self.__dict__['_name'] = name
+        self.__dict__['_module'] = None
+        self.__dict__['_lock'] = Lock()
+        _lazy_modules.append(self)
+
+    def _load(self):
+        module = self.__dict__['_module']
+        if module is None:
+            with self.__dict__['_lock']:
+                module = self.__dict__['_module']
+                if module is None:
+                    module = importlib.import_module(self.__dict__['_name'])
+                    self.__dict__['_module'] = module
+        return module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __setattr__(self, attr, value):
+        setattr(self._load(), attr, value)
+
+    def __repr__(self):
+        state = 'loaded' if is_loaded(self) else 'not loaded'
+        return '<lazy module %r (%s)>' % (self.__dict__['_name'], state)
+
+
+def is_loaded(lazy):
+    """Whether the lazy module has been imported, without importing it."""
+    return lazy.__dict__['_module'] is not None
+
+
+def load_all():
+    """Import every lazy module. Returns the names of the modules."""
+    for lazy in _lazy_modules:
+        lazy._load()
+    return [lazy.__dict__['_name'] for lazy in _lazy_modules]
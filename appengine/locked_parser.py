@@ -0,0 +1,54 @@
+from threading import Lock
+import time
+
+
+class LockedParser(object):
+    """One parser, shared by every thread behind a lock. raco's Myrial
+    parser keeps its lexer and the functions a program defines in module and
+    class state, so even separate instances cannot parse at the same time;
+    more of them would only cost memory. The parser is created by factory()
+    on first use.
+
+    The parser records how long callers wait for the lock, how long they
+    spend parsing and how long creating the parser took, to tell contention
+    apart from slow parses."""
+
+    def __init__(self, factory, clock=time.time):
+        self.factory = factory
+        self.clock = clock
+        self.lock = Lock()
+        self._parser = None
+        self._stats_lock = Lock()
+        self.parses = 0
+        self.build_time = 0.0
+        self.wait_time = 0.0
+        self.max_wait_time = 0.0
+        self.parse_time = 0.0
+
+    def parse(self, text):
+        start = self.clock()
+        with self.lock:
+            locked = self.clock()
+            if self._parser is None:
+                self._parser = self.factory()
+            built = self.clock()
+            try:
+                return self._parser.parse(text)
+            finally:
+                elapsed = self.clock() - built
+                with self._stats_lock:
+                    self.parses += 1
+                    self.build_time += built - locked
+                    self.wait_time += locked - start
+                    self.max_wait_time = max(self.max_wait_time,
+                                             locked - start)
+                    self.parse_time += elapsed
+
+    @property
+    def stats(self):
+        with self._stats_lock:
+            return {'parses': self.parses,
+                    'build_time': self.build_time,
+                    'wait_time': self.wait_time,
+                    'max_wait_time': self.max_wait_time,
+                    'parse_time': self.parse_time}
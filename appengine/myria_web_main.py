@@ -1,39 +1,55 @@
+import csv
 from distutils.util import strtobool
+import hashlib
 import json
 import logging
 import os
 import requests
-from threading import Lock
+import sys
 import urllib
 import webapp2
 
 import jinja2
 
-from raco import RACompiler
-from raco.myrial.exceptions import MyrialCompileException
-from raco.myrial import parser as MyrialParser
-from raco.myrial import interpreter as MyrialInterpreter
-from raco.language.myrialang import (MyriaLeftDeepTreeAlgebra,
-                                     MyriaHyperCubeAlgebra,
-                                     compile_to_json)
-from raco.language.logical import OptLogicalAlgebra
-
-from raco.viz import get_dot
-from raco.myrial.keywords import get_keywords
-from raco.catalog import Catalog
-from raco.algebra import DEFAULT_CARDINALITY
-from raco import scheme
-from examples import examples
-from demo3_examples import demo3_examples
-from pagination import Pagination, QUERIES_PER_PAGE
+from ply import lex
+# Lexers built from here on find the rules to try by the next character (see
+# FastLexer). This is set before anything can import raco, whose Myrial
+# scanner builds its lexer on import: either compiler or keywords may be the
+# first to load it.
+lex.fast_lexer = 1
+
+from pagination import (DatasetPagination, Pagination, QUERIES_PER_PAGE,
+                        MAX_QUERIES_PER_PAGE)
+from query_log import annotate, changed_since, parse_timestamp
+from cache import CatalogCache, LRUCache, PlanCache, RefreshingValue
+from status_poller import QueryStatusPoller, LONG_POLL_TIMEOUT, is_active
+from dataset_index import DatasetIndex, DATASET_LISTING_TTL, normalize_sort
+from lazy_import import LazyModule, is_loaded, load_all
+from profiling.analysis import query_report
+from profiling.archive import MemcacheArchive
+from profiling.columns import frame, rows_frame
+from profiling.logs import CoordinatorLogs
+from profiling.pyramid import STATS
+from profiling.shuffle import ShuffleMatrix
+from profiling.store import ProfileStore
 
 import myria
 
-# We need a (global) lock on the Myrial parser because yacc is not Threadsafe.
-# .. see uwescience/datalogcompiler#39
-# ..    (https://github.com/uwescience/datalogcompiler/issues/39)
-myrial_parser_lock = Lock()
-myrial_parser = MyrialParser.Parser()
+# The query compiler (raco, its parser tables and networkx) and the example
+# programs are only imported by the requests that use them, so that a cold
+# instance serving /queries or /datasets does not pay for them. Warmup
+# requests load everything up front.
+compiler = LazyModule('compiler')
+keywords = LazyModule('raco.myrial.keywords')
+examples = LazyModule('examples')
+demo3_examples = LazyModule('demo3_examples')
+
+# How long (seconds) a page may show a worker summary before refreshing it
+CONNECTION_STRING_TTL = 10
+# How many distinct renderings of the static pages to keep
+PAGE_CACHE_SIZE = 16
+# How many buckets a histogram of a fragment has if no step is given
+DEFAULT_HISTOGRAM_BUCKETS = 1000
 
 
 def is_small_dataset(d, cell_limit=0):
@@ -43,12 +59,6 @@ def is_small_dataset(d, cell_limit=0):
             ((cell_limit == 0) or
             (len(d['schema']['columnNames']) * d['numTuples'] <= cell_limit)))
 
-JINJA_ENVIRONMENT = jinja2.Environment(
-    loader=jinja2.FileSystemLoader('templates'),
-    extensions=['jinja2.ext.autoescape'],
-    autoescape=True)
-JINJA_ENVIRONMENT.tests["small_dataset"] = is_small_dataset
-
 version_file_path = os.path.join(os.path.dirname(__file__), 'VERSION')
 branch_file_path = os.path.join(os.path.dirname(__file__), 'BRANCH')
 
@@ -65,63 +75,46 @@ except:
     BRANCH = "branch file not found"
 
 
-def get_plan(query, language, plan_type, connection,
-             multiway_join=False, push_sql=False):
-    catalog = None
-    if multiway_join:
-        catalog = MyriaCatalog(connection)
-        assert catalog.get_num_servers()
-    # Fix up the language string
-    if language is None:
-        language = "datalog"
-    language = language.strip().lower()
-
-    if multiway_join:
-        target_algebra = MyriaHyperCubeAlgebra(catalog)
-    else:
-        target_algebra = MyriaLeftDeepTreeAlgebra()
-
-    if language == "datalog":
-        dlog = RACompiler()
-        dlog.fromDatalog(query)
-        if not dlog.logicalplan:
-            raise SyntaxError("Unable to parse Datalog")
-
-        if plan_type == 'logical':
-            return dlog.logicalplan
-        elif plan_type == 'physical':
-            dlog.optimize(target=target_algebra, push_sql=push_sql)
-            return dlog.physicalplan
-        else:
-            raise NotImplementedError('Datalog plan type %s' % plan_type)
-    elif language in ["myrial", "sql"]:
-        # We need a (global) lock on the Myrial parser because yacc
-        # .. is not Threadsafe and App Engine uses multiple threads.
-        with myrial_parser_lock:
-            parsed = myrial_parser.parse(query)
-        processor = MyrialInterpreter.StatementProcessor(
-            MyriaCatalog(connection))
-        processor.evaluate(parsed)
-        if plan_type == 'logical':
-            return processor.get_physical_plan(target_alg=OptLogicalAlgebra())
-        elif plan_type == 'physical':
-            return processor.get_physical_plan(target_alg=target_algebra,
-                                               multiway_join=multiway_join,
-                                               push_sql=push_sql)
-        else:
-            raise NotImplementedError('Myria plan type %s' % plan_type)
+def template_bytecode_cache():
+    """Share compiled template bytecode between instances through memcache,
+    so that a cold instance does not compile the templates again. Not
+    available outside App Engine."""
+    try:
+        from google.appengine.api import memcache
+    except ImportError:
+        return None
+    return jinja2.MemcachedBytecodeCache(
+        memcache.Client(), prefix='jinja2/bytecode/{}/'.format(VERSION))
 
-    raise NotImplementedError('Language %s is not supported' % language)
 
+def profile_archive():
+    """Share the packed logs of finished queries between instances through
+    memcache. Not available outside App Engine."""
+    try:
+        from google.appengine.api import memcache
+    except ImportError:
+        return None
+    return MemcacheArchive(memcache.Client())
+
+JINJA_ENVIRONMENT = jinja2.Environment(
+    loader=jinja2.FileSystemLoader('templates'),
+    extensions=['jinja2.ext.autoescape'],
+    autoescape=True,
+    bytecode_cache=template_bytecode_cache())
+JINJA_ENVIRONMENT.tests["small_dataset"] = is_small_dataset
+
+# Page fragments that only change between deployed versions
+STATIC_FRAGMENTS = LRUCache(max_size=32)
 
-def get_logical_plan(query, language, connection, push_sql=False):
-    return get_plan(query, language, 'logical', connection, push_sql=push_sql)
 
+def static_fragment(name, render):
+    """The fragment with the given name, rendered once per version."""
+    return STATIC_FRAGMENTS.get_or_compute((VERSION, name), render)
 
-def get_physical_plan(query, language, connection,
-                      multiway_join=False, push_sql=False):
-    return get_plan(query, language, 'physical', connection,
-                    multiway_join=multiway_join, push_sql=push_sql)
+
+def myrial_keywords():
+    return static_fragment('myrialKeywords',
+                           lambda: json.dumps(keywords.get_keywords()))
 
 
 def format_rule(expressions):
@@ -139,52 +132,13 @@ def get_datasets(connection):
         return []
 
 
-class MyriaCatalog(Catalog):
-
-    def __init__(self, connection):
-        self.connection = connection
-
-    def get_scheme(self, rel_key):
-        relation_args = {
-            'userName': rel_key.user,
-            'programName': rel_key.program,
-            'relationName': rel_key.relation
-        }
-        if not self.connection:
-            raise RuntimeError(
-                "no schema for relation %s because no connection" % rel_key)
-        try:
-            dataset_info = self.connection.dataset(relation_args)
-        except myria.MyriaError:
-            raise ValueError('No relation {} in the catalog'.format(rel_key))
-        schema = dataset_info['schema']
-        return scheme.Scheme(zip(schema['columnNames'], schema['columnTypes']))
-
-    def get_num_servers(self):
-        if not self.connection:
-            raise RuntimeError("no connection.")
-        return len(self.connection.workers_alive())
-
-    def num_tuples(self, rel_key):
-        relation_args = {
-            'userName': rel_key.user,
-            'programName': rel_key.program,
-            'relationName': rel_key.relation
-        }
-        if not self.connection:
-            raise RuntimeError(
-                "no cardinality of %s because no connection" % rel_key)
-        try:
-            dataset_info = self.connection.dataset(relation_args)
-        except myria.MyriaError:
-            raise ValueError(rel_key)
-        num_tuples = dataset_info['numTuples']
-        assert isinstance(num_tuples, (int, long)), type(num_tuples)
-        # that's a work round. numTuples is -1 if the dataset is old
-        if num_tuples != -1:
-            assert num_tuples >= 0
-            return num_tuples
-        return DEFAULT_CARDINALITY
+def bad_request_errors():
+    """The exceptions that mean the request, rather than the server, is at
+    fault. The compiler's exceptions cannot have been raised before it is
+    loaded, so it is not loaded just to check for them."""
+    if is_loaded(compiler):
+        return (ValueError, SyntaxError, compiler.MyrialCompileException)
+    return (ValueError, SyntaxError)
 
 
 class MyriaHandler(webapp2.RequestHandler):
@@ -200,10 +154,18 @@ class MyriaHandler(webapp2.RequestHandler):
         """
         return bool(strtobool(self.request.get(name, str(default))))
 
+    def compilation_session(self, query, language,
+                            multiway_join=False, push_sql=False):
+        """A CompilationSession that shares this application's plan and
+        catalog caches."""
+        return compiler.CompilationSession(
+            query, language, self.app.connection,
+            multiway_join=multiway_join, push_sql=push_sql,
+            cache=self.app.plan_cache, catalog_cache=self.app.catalog_cache)
+
     def handle_exception(self, exception, debug_mode):
         self.response.headers['Content-Type'] = 'text/plain'
-        if isinstance(exception,
-                      (ValueError, SyntaxError, MyrialCompileException)):
+        if isinstance(exception, bad_request_errors()):
             self.response.status = 400
             msg = '{}: {}'.format(exception.__class__.__name__, exception)
         else:
@@ -216,6 +178,19 @@ class MyriaHandler(webapp2.RequestHandler):
 
         self.response.out.write(msg)
 
+    def write_json(self, value):
+        """Write value as JSON with an ETag, answering a request that
+        already has this exact value (If-None-Match) with an empty 304."""
+        body = json.dumps(value, sort_keys=True)
+        etag = hashlib.sha1(body).hexdigest()
+        self.response.etag = etag
+        if etag in self.request.if_none_match:
+            self.response.status = 304
+            del self.response.headers['Content-Type']
+            return
+        self.response.headers['Content-Type'] = 'application/json'
+        self.response.write(body)
+
 
 class RedirectToEditor(MyriaHandler):
 
@@ -229,49 +204,21 @@ class RedirectToEditor(MyriaHandler):
 class MyriaPage(MyriaHandler):
 
     def get_connection_string(self):
-        conn = self.app.connection
-        hostname = self.app.hostname
-        port = self.app.port
-        if not conn:
-            connection_string = "unable to connect to %s:%d" % (hostname, port)
-        else:
-            try:
-                workers = conn.workers()
-                alive = conn.workers_alive()
-                connection_string = "%s:%d [%d/%d]" %\
-                    (hostname, port, len(alive), len(workers))
-            except:
-                connection_string = "error connecting to %s:%d" % (
-                    hostname, port)
-        return connection_string
+        return self.app.connection_string.get()
 
     def base_template_vars(self):
-        if self.app.ssl:
-            uri_scheme = "https"
-        else:
-            uri_scheme = "http"
         return {'connectionString': self.get_connection_string(),
-                'myriaConnection': "{s}://{h}:{p}".format(
-                    s=uri_scheme, h=self.app.hostname, p=self.app.port),
+                'myriaConnection': self.app.myria_url,
                 'version': VERSION,
                 'branch': BRANCH}
 
-
-def nano_to_str(elapsed):
-    if elapsed is None:
-        return None
-    s = elapsed / 1000000000.0
-    m, s = divmod(s, 60)
-    h, m = divmod(m, 60)
-    d, h = divmod(h, 24)
-    elapsed_str = ' %fs' % s
-    if m:
-        elapsed_str = '%dm ' % m + elapsed_str
-    if h:
-        elapsed_str = '%dh ' % h + elapsed_str
-    if d:
-        elapsed_str = '%dd ' % d + elapsed_str
-    return elapsed_str
+    def render_cached(self, template_name, template_vars):
+        """Render a template whose output depends only on the (hashable)
+        template_vars, reusing an earlier rendering with the same vars."""
+        key = (template_name, tuple(sorted(template_vars.items())))
+        return self.app.page_cache.get_or_compute(
+            key, lambda: JINJA_ENVIRONMENT.get_template(
+                template_name).render(template_vars))
 
 
 class Queries(MyriaPage):
@@ -299,18 +246,11 @@ class Queries(MyriaPage):
         queries = result['results']
 
         for q in queries:
-            q['elapsedStr'] = nano_to_str(q['elapsedNanos'])
-            bootstrap_status = {
-                'ERROR': 'danger',
-                'KILLED': 'danger',
-                'SUCCESS': 'success',
-                'RUNNING': 'warning',
-            }
-            q['bootstrapStatus'] = bootstrap_status.get(q['status'], '')
+            annotate(q)
 
         template_vars = self.base_template_vars()
         template_vars.update({'queries': queries})
-        template_vars['myrialKeywords'] = get_keywords()
+        template_vars['myrialKeywords'] = myrial_keywords()
         template_vars['pagination'] = Pagination(args, result)
         template_vars['page_url'] = lambda largs: '{}?{}'.format(
             self.request.path, urllib.urlencode(largs))
@@ -323,6 +263,69 @@ class Queries(MyriaPage):
         self.response.out.write(template.render(template_vars))
 
 
+class QueryLog(MyriaHandler):
+
+    def get(self):
+        """The query log as JSON, for clients that keep it up to date
+        themselves. Takes the same arguments as the /queries page, plus:
+
+        since: a query id. Only newer queries are returned, together with
+            the current status of each query listed as active.
+        active: (repeated) ids of queries the client shows as running.
+        changed: an ISO 8601 time. Only queries in the page that changed
+            since then (or are still running) are returned.
+
+        The response carries an ETag, so an unchanged log costs a 304."""
+        self.response.headers.add_header("Access-Control-Allow-Origin", "*")
+        conn = self.app.connection
+        try:
+            limit = max(1, min(int(self.request.get('limit',
+                                                    QUERIES_PER_PAGE)),
+                               MAX_QUERIES_PER_PAGE))
+            since = self.request.get('since')
+            since = int(since) if since else None
+            active = [int(a) for a in self.request.get_all('active')]
+        except ValueError:
+            self.response.headers['Content-Type'] = 'text/plain'
+            self.response.status = 400
+            self.response.write(
+                "Error 400 (Bad Request): limit, since and active must be "
+                "integers")
+            return
+
+        min_id = self.request.get('min') or None
+        if since is not None:
+            min_id = max(since + 1, int(min_id or 0))
+        try:
+            result = conn.queries(limit=limit, min_id=min_id,
+                                  max_id=self.request.get('max') or None,
+                                  q=self.request.get('q').strip() or None)
+        except myria.MyriaError:
+            result = {'max': 0, 'min': 0, 'results': []}
+
+        queries = result['results']
+        if active:
+            # The poller shares these lookups with every other client
+            listed = set(q['queryId'] for q in queries)
+            statuses = self.app.status_poller.wait(
+                dict((query_id, None) for query_id in active), timeout=0)
+            queries.extend(dict(status) for query_id, status
+                           in sorted(statuses.items(), reverse=True)
+                           if query_id not in listed)
+
+        changed = self.request.get('changed')
+        if changed:
+            changed = parse_timestamp(changed)
+            if changed is not None:
+                queries = changed_since(queries, changed)
+
+        latest = max([q['queryId'] for q in queries] + [since or 0])
+        self.write_json({'max': result['max'],
+                         'min': result['min'],
+                         'latest': latest,
+                         'results': [annotate(q) for q in queries]})
+
+
 class Profile(MyriaPage):
 
     def get(self):
@@ -352,15 +355,226 @@ class Profile(MyriaPage):
         self.response.out.write(template.render(template_vars))
 
 
+class ProfileData(MyriaHandler):
+    """Base class of the handlers that serve aggregates of the profiling
+    log of one query fragment, identified by the queryId, subqueryId and
+    fragmentId arguments, as CSV like the coordinator's /logs."""
+
+    def fragment(self):
+        return (int(self.request.get("queryId")),
+                int(self.request.get("subqueryId", 0)),
+                int(self.request.get("fragmentId")))
+
+    def handle_exception(self, exception, debug_mode):
+        if isinstance(exception, (requests.RequestException, IOError,
+                                  myria.MyriaError)):
+            self.response.headers['Content-Type'] = 'text/plain'
+            self.response.status = 404
+            self.response.write(
+                "Error 404 (Not Found): no profiling log for this fragment")
+            return
+        MyriaHandler.handle_exception(self, exception, debug_mode)
+
+    def write_csv(self, header, rows):
+        self.response.headers.add_header("Access-Control-Allow-Origin", "*")
+        self.response.headers['Content-Type'] = 'text/csv'
+        writer = csv.writer(self.response.out, lineterminator='\n')
+        writer.writerow(header)
+        writer.writerows(rows)
+
+    def binary(self):
+        return self.request.get("format") == "binary"
+
+    def write_frame(self, data):
+        """Write a frame of typed columns (see profiling.columns). Range
+        requests are answered with the requested bytes."""
+        self.response.headers.add_header("Access-Control-Allow-Origin", "*")
+        self.response.headers['Content-Type'] = 'application/octet-stream'
+        self.response.headers['Accept-Ranges'] = 'bytes'
+        self.response.conditional_response = True
+        self.response.body = data
+
+    def write_table(self, kind, header, rows):
+        """Write rows as CSV or, if the format argument is binary, as a
+        frame."""
+        if self.binary():
+            self.write_frame(rows_frame(kind, header, rows))
+        else:
+            self.write_csv(header, rows)
+
+
+class ProfileHistogram(ProfileData):
+
+    def get(self):
+        """The number of workers active in each of the buckets
+        range(start, end, step), from the fragment's histogram pyramid. Only
+        buckets with active workers are listed. Unless onlyRootOp is true,
+        each operator is listed separately."""
+        activity = self.app.profiles.activity(*self.fragment())
+        if activity.time_range is None:
+            self.write_table('histogram', ['nanoTime', 'numWorkers'], [])
+            return
+        start = int(self.request.get("start", activity.time_range[0]))
+        end = int(self.request.get("end", activity.time_range[1]))
+        step = int(self.request.get("step", 0)) or max(
+            1, (end - start) // DEFAULT_HISTOGRAM_BUCKETS)
+        stat = self.request.get("stat", "max")
+        if stat not in STATS:
+            raise ValueError("stat must be one of {}".format(STATS))
+
+        if self.get_boolean_request_param("onlyRootOp", True):
+            self.write_table('histogram', ['nanoTime', 'numWorkers'],
+                             activity.root.histogram(start, end, step, stat))
+        else:
+            self.write_table('histogram', ['opId', 'nanoTime', 'numWorkers'],
+                             ((op, t, n) for op, pyramid
+                              in sorted(activity.ops.items())
+                              for t, n in pyramid.histogram(
+                                  start, end, step, stat)))
+
+
+class ProfileIntervals(ProfileData):
+
+    def get(self):
+        """The operator intervals of every worker that overlap [start,
+        end] and are at least minLength long, from the fragment's interval
+        index. With onlyRootOp, only the root operators are listed. With
+        merge, runs of shorter intervals are listed as one interval each
+        (count says how many intervals it stands for)."""
+        index = self.app.profiles.intervals(*self.fragment())
+        intervals = index.query(
+            int(self.request.get("start", 0)),
+            int(self.request.get("end", sys.maxint)),
+            min_length=int(self.request.get("minLength", 0)),
+            only_root=self.get_boolean_request_param("onlyRootOp"),
+            merge=self.get_boolean_request_param("merge"))
+        self.write_table('intervals', ['workerId', 'opId', 'startTime',
+                                       'endTime', 'numTuples', 'depth',
+                                       'count'], intervals)
+
+
+class ProfileAnalysis(ProfileData):
+
+    def get(self):
+        """Where the time of a subquery went, as JSON: for each of its
+        fragments (or those given as repeated fragmentId arguments), the
+        self time of each operator, its workers ranked by how late they
+        finished, the chain of operators that took longest and the time
+        spent waiting for tuples from other workers; and for the subquery,
+        the chain of fragments that decided when it finished and its worst
+        stragglers."""
+        query_id = int(self.request.get("queryId"))
+        subquery_id = int(self.request.get("subqueryId", 0))
+        plan = self.app.connection.get_query_plan(query_id, subquery_id)
+        fragment_ids = (self.request.get_all("fragmentId") or
+                        [f['fragmentIndex'] for f in plan])
+        analyses = dict((int(fragment_id), self.app.profiles.analysis(
+            query_id, subquery_id, fragment_id))
+            for fragment_id in fragment_ids)
+        self.write_json(query_report(analyses, plan))
+
+
+class ProfileTail(ProfileData):
+
+    def get(self):
+        """What changed in the profile of a fragment of a running query
+        since the client's version, as JSON: the operator intervals that
+        ended and the changes in the number of active workers (as
+        [nanoTime, change] pairs). Without a version, or if the changes
+        since it are no longer kept, reset is true and the client should
+        reload the charts."""
+        live = self.app.profiles.tail(*self.fragment())
+        delta = None
+        if self.request.get("version"):
+            delta = live.delta(int(self.request.get("version")))
+        version, intervals, changes = delta or (live.version, [], [])
+        self.write_json({'version': version,
+                         'reset': delta is None,
+                         'finished': live.finished,
+                         'highWaterMark': live.high_water_mark,
+                         'timeRange': live.activity.time_range,
+                         'intervals': intervals,
+                         'activity': changes})
+
+
+class ProfileSent(ProfileData):
+
+    def get(self):
+        """The fragment's sent log: how many tuples each worker sent, when,
+        and to which worker."""
+        log = self.app.profiles.sent(*self.fragment())
+        if self.binary():
+            self.write_frame(frame('sent', [
+                ('workerId', log.worker_ids), ('nanoTime', log.times),
+                ('numTuples', log.num_tuples),
+                ('destWorkerId', log.dest_worker_ids)]))
+        else:
+            self.write_csv(['workerId', 'nanoTime', 'numTuples',
+                            'destWorkerId'], log.rows())
+
+
+class ProfileShuffle(ProfileData):
+
+    def get(self):
+        """The tuples sent between each pair of workers by the fragments
+        given as (repeated) fragmentId arguments, or by every fragment of
+        the subquery, as JSON: the worker-by-worker matrix, the totals and
+        skew of the sources and destinations, and the totals of each
+        fragment. The sends of a single fragment are also counted in time
+        buckets."""
+        query_id = int(self.request.get("queryId"))
+        subquery_id = int(self.request.get("subqueryId", 0))
+        fragment_ids = self.request.get_all("fragmentId")
+        if not fragment_ids:
+            fragments = self.app.connection.get_query_plan(query_id,
+                                                           subquery_id)
+            fragment_ids = [f['fragmentIndex'] for f in fragments]
+
+        matrices = [(int(fragment_id), self.app.profiles.shuffle(
+            query_id, subquery_id, fragment_id))
+            for fragment_id in fragment_ids]
+        if len(matrices) == 1:
+            summary = matrices[0][1].summary()
+        else:
+            summary = ShuffleMatrix.merge([m for _, m in matrices]).summary()
+        summary['fragments'] = [{'fragmentId': fragment_id,
+                                 'numTuples': matrix.num_tuples,
+                                 'duration': matrix.duration}
+                                for fragment_id, matrix in matrices]
+        self.write_json(summary)
+
+
+class ProfileRange(ProfileData):
+
+    def get(self):
+        """The time of the first and last events of the fragment."""
+        activity = self.app.profiles.activity(*self.fragment())
+        self.write_csv(['min_startTime', 'max_endTime'],
+                       [activity.time_range or (0, 0)])
+
+
 class Datasets(MyriaPage):
 
     def get(self, connection_=None):
-        conn = self.app.connection
+        args = dict((a, self.request.get(a).strip())
+                    for a in self.request.arguments())
+        sort, descending = normalize_sort(args.get('sort'), args.get('order'))
+        args['sort'] = sort
+        args['order'] = 'desc' if descending else 'asc'
+        filters = dict((f, args.get(f)) for f in ('user', 'program', 'name'))
+
+        limit = DatasetPagination.limit(args)
         try:
-            datasets = conn.datasets()
-        except:
-            datasets = []
-
+            result = self.app.dataset_index.page(
+                DatasetPagination.offset(args), limit, sort=sort,
+                order=args['order'], **filters)
+        except (myria.MyriaError, requests.ConnectionError):
+            # The coordinator cannot list its datasets; show none
+            result = {'results': [], 'offset': 0, 'limit': limit, 'total': 0}
+
+        # The listing is shared by every request, so annotate copies of the
+        # datasets on this page only
+        datasets = [dict(d) for d in result['results']]
         for d in datasets:
             try:
                 d['queryUrl'] = 'http://%s:%d/query/query-%d' %\
@@ -368,11 +582,33 @@ class Datasets(MyriaPage):
             except:
                 pass
 
+        def sort_args(key):
+            """The arguments that sort by key, reversing the order if the
+            datasets are already sorted by it."""
+            ret = dict((k, v) for k, v in args.items() if v and k != 'offset')
+            ret['sort'] = key
+            if key == sort:
+                ret['order'] = 'asc' if descending else 'desc'
+            else:
+                ret.pop('order', None)
+            return ret
+
         template_vars = self.base_template_vars()
         template_vars['datasets'] = datasets
+        template_vars['filters'] = filters
+        template_vars['sort'] = sort
+        template_vars['descending'] = descending
+        template_vars['total'] = result['total']
+        template_vars['pagination'] = DatasetPagination(args, result)
+        template_vars['sort_args'] = sort_args
+        template_vars['page_url'] = lambda largs: '{}?{}'.format(
+            self.request.path, urllib.urlencode(largs))
 
         # Actually render the page: HTML content
         self.response.headers['Content-Type'] = 'text/html'
+        # The listing behind the page is itself up to this old
+        self.response.cache_control.private = True
+        self.response.cache_control.max_age = DATASET_LISTING_TTL
         # .. load and render the template
         template = JINJA_ENVIRONMENT.get_template('datasets.html')
         self.response.out.write(template.render(template_vars))
@@ -392,9 +628,9 @@ class Examples(MyriaPage):
 
         example_set = self.request.get('subset') or 'default'
         if example_set == 'demo3':
-            examples_to_use = demo3_examples
+            examples_to_use = demo3_examples.demo3_examples
         else:
-            examples_to_use = examples
+            examples_to_use = examples.examples
 
         if language not in examples_to_use:
             self.response.headers['Content-Type'] = 'text/plain'
@@ -404,7 +640,9 @@ class Examples(MyriaPage):
             return
         # Return the objects as json
         self.response.headers['Content-Type'] = 'application/json'
-        self.response.write(json.dumps(examples_to_use[language]))
+        self.response.write(static_fragment(
+            ('examples', example_set, language),
+            lambda: json.dumps(examples_to_use[language])))
 
 
 class Editor(MyriaPage):
@@ -413,12 +651,12 @@ class Editor(MyriaPage):
         # Actually render the page: HTML content
         self.response.headers['Content-Type'] = 'text/html'
         template_vars = self.base_template_vars()
-        template_vars['myrialKeywords'] = get_keywords()
+        template_vars['myrialKeywords'] = myrial_keywords()
         template_vars['subset'] = 'default'
 
-        # .. load and render the template
-        template = JINJA_ENVIRONMENT.get_template('editor.html')
-        self.response.out.write(template.render(template_vars))
+        # .. render the template, or reuse an identical earlier rendering
+        self.response.out.write(
+            self.render_cached('editor.html', template_vars))
 
 
 class Demo3(MyriaPage):
@@ -426,12 +664,12 @@ class Demo3(MyriaPage):
         # Actually render the page: HTML content
         self.response.headers['Content-Type'] = 'text/html'
         template_vars = self.base_template_vars()
-        template_vars['myrialKeywords'] = get_keywords()
+        template_vars['myrialKeywords'] = myrial_keywords()
         template_vars['subset'] = 'demo3'
 
-        # .. load and render the template
-        template = JINJA_ENVIRONMENT.get_template('editor.html')
-        self.response.out.write(template.render(template_vars))
+        # .. render the template, or reuse an identical earlier rendering
+        self.response.out.write(
+            self.render_cached('editor.html', template_vars))
 
 
 class Plan(MyriaHandler):
@@ -445,9 +683,9 @@ class Plan(MyriaHandler):
         query = self.request.get("query")
         language = self.request.get("language")
         try:
-            plan = get_logical_plan(query, language, self.app.connection)
-        except (MyrialCompileException,
-                MyrialInterpreter.NoSuchRelationException) as e:
+            plan = self.compilation_session(query, language).logical_plan()
+        except (compiler.MyrialCompileException,
+                compiler.NoSuchRelationException) as e:
             self.response.headers['Content-Type'] = 'text/plain'
             self.response.write(str(e))
             self.response.status = 400
@@ -466,9 +704,9 @@ class Optimize(MyriaHandler):
         multiway_join = self.get_boolean_request_param("multiway_join")
         push_sql = self.get_boolean_request_param("push_sql")
         try:
-            optimized = get_physical_plan(
-                query, language, self.app.connection, multiway_join, push_sql)
-        except MyrialInterpreter.NoSuchRelationException as e:
+            optimized = self.compilation_session(
+                query, language, multiway_join, push_sql).physical_plan()
+        except compiler.NoSuchRelationException as e:
             self.response.headers['Content-Type'] = 'text/plain'
             self.response.write(
                 "Error 400 (Bad Request): Relation %s not found" % str(e))
@@ -493,16 +731,9 @@ class Compile(MyriaHandler):
         multiway_join = self.get_boolean_request_param("multiway_join")
         push_sql = self.get_boolean_request_param("push_sql")
 
-        cached_logicalplan = str(get_logical_plan(
-            query, language, self.app.connection, push_sql=push_sql))
-        # Generate physical plan
-        physicalplan = get_physical_plan(
-            query, language, self.app.connection, multiway_join=multiway_join,
-            push_sql=push_sql)
-
         try:
-            compiled = compile_to_json(
-                query, cached_logicalplan, physicalplan, language)
+            compiled = dict(self.compilation_session(
+                query, language, multiway_join, push_sql).compiled())
 
             if profile:
                 compiled['profilingMode'] = ["QUERY", "RESOURCE"]
@@ -535,19 +766,10 @@ class Execute(MyriaHandler):
         multiway_join = self.get_boolean_request_param("multiway_join")
         push_sql = self.get_boolean_request_param("push_sql")
 
-        cached_logicalplan = str(
-            get_logical_plan(query, language, self.app.connection,
-                             push_sql=push_sql))
-
         try:
-            # Generate physical plan
-            physicalplan = get_physical_plan(
-                query, language, self.app.connection,
-                multiway_join=multiway_join, push_sql=push_sql)
-
-            # .. and compile
-            compiled = compile_to_json(
-                query, cached_logicalplan, physicalplan, language)
+            # Compile the query, or reuse the plan the editor just compiled
+            compiled = dict(self.compilation_session(
+                query, language, multiway_join, push_sql).compiled())
 
             if profile:
                 compiled['profilingMode'] = ["QUERY", "RESOURCE"]
@@ -556,6 +778,7 @@ class Execute(MyriaHandler):
 
             # Issue the query
             query_status = conn.submit_query(compiled)
+            self.app.status_poller.submitted(query_status)
             query_url = 'http://%s:%d/execute?query_id=%d' %\
                 (self.app.hostname, self.app.port, query_status['queryId'])
             self.response.status = 201
@@ -578,7 +801,6 @@ class Execute(MyriaHandler):
 
     def get(self):
         self.response.headers.add_header("Access-Control-Allow-Origin", "*")
-        conn = self.app.connection
 
         query_id = self.request.get("queryId")
 
@@ -588,11 +810,38 @@ class Execute(MyriaHandler):
             self.response.write("Error 400 (Bad Request): missing query_id")
             return
 
-        query_status = conn.get_query_status(query_id)
+        query_status = self.app.status_poller.status(query_id)
         self.response.headers['Content-Type'] = 'application/json'
         self.response.write(json.dumps(query_status))
 
 
+class Status(MyriaHandler):
+
+    def get(self):
+        """Long-poll for changes in the status of one or more queries. The
+        client passes each queryId together with the status it last saw for
+        that query, and the response is sent as soon as one of them differs
+        (or after timeout seconds, with the statuses unchanged)."""
+        self.response.headers.add_header("Access-Control-Allow-Origin", "*")
+        query_ids = self.request.get_all("queryId")
+        statuses = self.request.get_all("status")
+
+        if not query_ids:
+            self.response.headers['Content-Type'] = 'text/plain'
+            self.response.status = 400
+            self.response.write("Error 400 (Bad Request): missing queryId")
+            return
+
+        known = dict((query_id, None) for query_id in query_ids)
+        known.update(zip(query_ids, statuses))
+        timeout = min(float(self.request.get("timeout", LONG_POLL_TIMEOUT)),
+                      LONG_POLL_TIMEOUT)
+
+        query_statuses = self.app.status_poller.wait(known, timeout=timeout)
+        self.response.headers['Content-Type'] = 'application/json'
+        self.response.write(json.dumps(query_statuses))
+
+
 class Dot(MyriaHandler):
 
     def get(self):
@@ -603,18 +852,40 @@ class Dot(MyriaHandler):
         multiway_join = self.get_boolean_request_param("multiway_join")
         push_sql = self.get_boolean_request_param("push_sql")
 
-        plan = get_plan(
-            query, language, plan_type, self.app.connection,
-            multiway_join=multiway_join, push_sql=push_sql)
+        plan = self.compilation_session(
+            query, language, multiway_join, push_sql).plan(plan_type)
 
         self.response.headers['Content-Type'] = 'text/plain'
-        self.response.write(get_dot(plan))
+        self.response.write(compiler.get_dot(plan))
 
     def post(self):
         "The same as get(), here because there may be long programs"
         self.get()
 
 
+class Stats(MyriaHandler):
+
+    def get(self):
+        stats = {'parser': (compiler.myrial_parser.stats
+                            if is_loaded(compiler) else None),
+                 'plan_cache': self.app.plan_cache.stats,
+                 'catalog_cache': self.app.catalog_cache.datasets.stats,
+                 'status_poller': self.app.status_poller.stats,
+                 'profiles': self.app.profiles.stats}
+        self.response.headers['Content-Type'] = 'application/json'
+        self.response.write(json.dumps(stats))
+
+
+class Warmup(webapp2.RequestHandler):
+
+    def get(self):
+        """Loaded before an instance serves traffic, so import everything
+        that the other handlers would otherwise import on first use."""
+        loaded = load_all()
+        self.response.headers['Content-Type'] = 'text/plain'
+        self.response.write('loaded %s' % ', '.join(loaded))
+
+
 class Application(webapp2.WSGIApplication):
     def __init__(self, debug=True,
                  hostname='localhost',
@@ -623,15 +894,26 @@ class Application(webapp2.WSGIApplication):
             ('/', RedirectToEditor),
             ('/editor', Editor),
             ('/queries', Queries),
+            ('/queries.json', QueryLog),
             ('/profile', Profile),
+            ('/profile/analysis', ProfileAnalysis),
+            ('/profile/histogram', ProfileHistogram),
+            ('/profile/intervals', ProfileIntervals),
+            ('/profile/range', ProfileRange),
+            ('/profile/sent', ProfileSent),
+            ('/profile/shuffle', ProfileShuffle),
+            ('/profile/tail', ProfileTail),
             ('/datasets', Datasets),
             ('/plan', Plan),
             ('/optimize', Optimize),
             ('/compile', Compile),
             ('/execute', Execute),
+            ('/status', Status),
             ('/dot', Dot),
             ('/examples', Examples),
-            ('/demo3', Demo3)
+            ('/demo3', Demo3),
+            ('/stats', Stats),
+            ('/_ah/warmup', Warmup)
         ]
 
         # Connection to Myria. Thread-safe
@@ -640,6 +922,35 @@ class Application(webapp2.WSGIApplication):
         self.hostname = hostname
         self.port = port
         self.ssl = ssl
+        self.myria_url = "{s}://{h}:{p}".format(
+            s="https" if ssl else "http", h=hostname, p=port)
+
+        # Compiled plans and the Myria catalog, shared by the handlers.
+        # Thread-safe
+        self.plan_cache = PlanCache()
+        self.catalog_cache = CatalogCache(
+            self.connection, on_change=self.plan_cache.catalog_changed)
+        # Profiling logs of query fragments, downloaded once and aggregated.
+        # The logs of finished queries are also archived in memcache.
+        self.profiles = ProfileStore(CoordinatorLogs(self.myria_url),
+                                     archive=profile_archive(),
+                                     is_finished=self.query_finished)
+
+        # Searchable listing of the datasets in the catalog
+        self.dataset_index = DatasetIndex(self.catalog_cache)
+        # Shared view of running queries. A query that succeeded may have
+        # created or replaced relations, so it invalidates the catalog.
+        self.status_poller = QueryStatusPoller(
+            self.connection, on_success=self.catalog_cache.invalidate)
+
+        # Rendered pages that only depend on a few, rarely changing values
+        self.page_cache = LRUCache(max_size=PAGE_CACHE_SIZE)
+
+        # The worker summary shown in the header of every page. Concurrent
+        # page loads share one fetch, and pages render from the last value
+        # while one of them refreshes it.
+        self.connection_string = RefreshingValue(
+            self.fetch_connection_string, ttl=CONNECTION_STRING_TTL)
 
         # Quiet logging for production
         logging.getLogger().setLevel(logging.WARN)
@@ -647,4 +958,29 @@ class Application(webapp2.WSGIApplication):
         webapp2.WSGIApplication.__init__(
             self, routes, debug=debug, config=None)
 
+    def query_finished(self, query_id):
+        """Whether the query has finished (successfully or not), as far as
+        the status poller knows."""
+        try:
+            return not is_active(self.status_poller.status(query_id))
+        except Exception:
+            return False
+
+    def fetch_connection_string(self):
+        conn = self.connection
+        hostname = self.hostname
+        port = self.port
+        if not conn:
+            connection_string = "unable to connect to %s:%d" % (hostname, port)
+        else:
+            try:
+                workers = conn.workers()
+                alive = conn.workers_alive()
+                connection_string = "%s:%d [%d/%d]" %\
+                    (hostname, port, len(alive), len(workers))
+            except:
+                connection_string = "error connecting to %s:%d" % (
+                    hostname, port)
+        return connection_string
+
 app = Application()
@@ -2,7 +2,6 @@
 A package for generating various graphs in networkx. 
 
 """
-from networkx.generators.atlas import *
 from networkx.generators.bipartite import *
 from networkx.generators.classic import *
 from networkx.generators.degree_seq import *
@@ -19,3 +18,13 @@ from networkx.generators.threshold import *
 from networkx.generators.intersection import *
 from networkx.generators.random_clustered import *
 
+
+def graph_atlas_g():
+    """Return the list of all graphs with up to seven nodes named in the
+    Graph Atlas. See networkx.generators.atlas.graph_atlas_g.
+
+    The atlas module is very large and rarely used, so it is only imported
+    when the atlas is first requested.
+    """
+    from networkx.generators.atlas import graph_atlas_g
+    return graph_atlas_g()
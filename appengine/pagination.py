@@ -2,6 +2,7 @@ import copy
 
 
 QUERIES_PER_PAGE = 25
+MAX_QUERIES_PER_PAGE = 500
 QUERIES = 'results'
 QUERY_ID = 'queryId'
 MAX = 'max'
@@ -92,4 +93,81 @@ class Pagination(object):
                 yield {'page': num,
                        'args': ret,
                        'current': num == current_page}
-                last = num
\ No newline at end of file
+                last = num
+
+DATASETS_PER_PAGE = 50
+MAX_DATASETS_PER_PAGE = 500
+OFFSET = 'offset'
+TOTAL = 'total'
+
+
+class DatasetPagination(object):
+    """Pages through a search of the datasets by offset, as Pagination
+    pages through queries by id. args are the request's arguments, and
+    result is the page returned by DatasetIndex.page()."""
+
+    def __init__(self, args, result):
+        self.args = args
+        self.result = result
+        # every argument but the offset is kept when changing page
+        self.base_args = dict((k, v) for k, v in args.items()
+                              if k != OFFSET and v)
+        self.base_args[LIMIT] = result[LIMIT]
+
+    @staticmethod
+    def limit(args):
+        """The page size a request asks for, within bounds."""
+        try:
+            limit = int(args[LIMIT])
+        except (KeyError, ValueError, TypeError):
+            return DATASETS_PER_PAGE
+        return max(1, min(limit, MAX_DATASETS_PER_PAGE))
+
+    @staticmethod
+    def offset(args):
+        try:
+            return max(0, int(args[OFFSET]))
+        except (KeyError, ValueError, TypeError):
+            return 0
+
+    def _args(self, offset):
+        ret = copy.copy(self.base_args)
+        if offset:
+            ret[OFFSET] = offset
+        return ret
+
+    @property
+    def has_prev(self):
+        return self.result[OFFSET] > 0
+
+    @property
+    def prev_args(self):
+        return self._args(max(0, self.result[OFFSET] - self.result[LIMIT]))
+
+    @property
+    def has_next(self):
+        return self.result[OFFSET] + self.result[LIMIT] < self.result[TOTAL]
+
+    @property
+    def next_args(self):
+        assert self.has_next
+        return self._args(self.result[OFFSET] + self.result[LIMIT])
+
+    def iter_pages(self, left_edge=2, left_current=3,
+                   right_current=3, right_edge=2):
+        per_page = self.result[LIMIT]
+        current_page = 1 + self.result[OFFSET] / per_page
+        all_pages = max(current_page,
+                        (self.result[TOTAL] + per_page - 1) / per_page)
+        last = 0
+        for num in xrange(1, all_pages + 1):
+            if (num <= left_edge or  # we show the first left_edge pages
+                    (current_page - left_current <= num
+                     <= current_page + right_current)  # +/- a few nearby
+                    or num > all_pages - right_edge):  # and last right_edge
+                if last + 1 != num:
+                    yield None
+                yield {'page': num,
+                       'args': self._args((num - 1) * per_page),
+                       'current': num == current_page}
+                last = num
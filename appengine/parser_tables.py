@@ -0,0 +1,182 @@
+"""Builds the binary LR table cache of the Myrial parser, and measures how
+long loading and generating the parser's tables take.
+
+    python parser_tables.py build
+    python parser_tables.py bench [--repeat N]
+
+build (re)writes the Myrial parser's cache in compiler.MYRIAL_TABLES, which
+deploy.sh ships with the application. bench times each way a parser can get
+its tables: decoding the binary cache, taking the tables this process already
+decoded from it, importing raco's parsetab module and generating them from
+the grammar. It then compares PLY's indexed LALR construction with the
+reference one it replaced, and checks that both generate the same tables.
+Last, it lexes the Myrial examples with the token() loop of PLY's Lexer and
+with its FastLexer, and checks that both produce the same tokens.
+"""
+import argparse
+import os
+import sys
+import time
+
+from ply import lex, yacc
+
+# How many times each way of loading the tables is timed (the best counts)
+DEFAULT_REPEAT = 20
+
+
+def grammar_info(module):
+    """The ParserReflect of a parser object, as yacc() collects it."""
+    pdict = dict((name, getattr(module, name)) for name in dir(module))
+    pinfo = yacc.ParserReflect(pdict, log=yacc.NullLogger())
+    pinfo.get_all()
+    return pinfo
+
+
+def grammar_of(pinfo):
+    """The yacc.Grammar of a ParserReflect, as yacc() builds it."""
+    pinfo.validate_all()
+    grammar = yacc.Grammar(pinfo.tokens)
+    for term, assoc, level in pinfo.preclist:
+        grammar.set_precedence(term, assoc, level)
+    for funcname, (file, line, prodname, syms) in pinfo.grammar:
+        grammar.add_production(prodname, syms, funcname, file, line)
+    grammar.set_start(pinfo.start)
+    return grammar
+
+
+def best_time(function, repeat, clock=time.time):
+    best = None
+    for _ in xrange(repeat):
+        start = clock()
+        function()
+        elapsed = clock() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def load_times(module, path, tabmodule='parsetab', repeat=DEFAULT_REPEAT):
+    """How long each way of loading the tables of the parser object module
+    takes, as a list of (way, seconds); path is its binary table cache."""
+    signature = grammar_info(module).signature()
+
+    def decode():
+        yacc._binary_tables.clear()
+        assert yacc.LRTable().read_binary_table(path, signature) == signature
+
+    def shared():
+        yacc.LRTable().read_binary_table(path, signature)
+
+    def import_module():
+        parsetab = __import__(tabmodule)
+        reload(parsetab)
+        yacc.LRTable().read_table(parsetab)
+
+    def generate():
+        yacc.yacc(module=module, debug=0, write_tables=0, tabcache='',
+                  tabmodule='no_such_parsetab', errorlog=yacc.NullLogger())
+
+    times = [('binary cache', best_time(decode, repeat)),
+             ('binary cache, already decoded', best_time(shared, repeat))]
+    try:
+        __import__(tabmodule)
+    except ImportError:
+        pass
+    else:
+        times.append(('%s module' % tabmodule,
+                      best_time(import_module, repeat)))
+    times.append(('generated from the grammar',
+                  best_time(generate, max(1, repeat // 10))))
+    return times
+
+
+def construction_times(module, repeat=DEFAULT_REPEAT):
+    """How long the indexed and the reference LALR constructions take on the
+    grammar of the parser object module, as a list of (builder, seconds).
+    Raises AssertionError if they generate different tables."""
+    pinfo = grammar_info(module)
+    tables = {}
+    times = []
+    for fast, builder in ((1, 'indexed LALR construction'),
+                          (0, 'reference LALR construction')):
+        def construct():
+            lr = yacc.LRGeneratedTable(grammar_of(pinfo), 'LALR', fast=fast)
+            tables[fast] = (lr.lr_action, lr.lr_goto)
+        times.append((builder, best_time(construct, max(1, repeat // 10))))
+    assert tables[0] == tables[1], "the constructions' tables differ"
+    return times
+
+
+def token_stream(lexer, text):
+    lexer = lexer.clone()
+    lexer.input(text)
+    return [(tok.type, tok.value, tok.lineno, tok.lexpos) for tok in lexer]
+
+
+def lexing_times(module, text, repeat=DEFAULT_REPEAT):
+    """How long lexing text takes with the rules of the lexer module, by
+    the Lexer's token() loop and by the FastLexer's, as a list of (lexer,
+    seconds). Raises AssertionError if they produce different tokens."""
+    streams = {}
+    times = []
+    for fast, name in ((0, 'Lexer.token()'), (1, 'FastLexer.token()')):
+        lexer = lex.lex(module=module, fast=fast,
+                        errorlog=lex.NullLogger())
+
+        def tokenize():
+            streams[fast] = token_stream(lexer, text)
+        times.append(('%s, %d characters' % (name, len(text)),
+                      best_time(tokenize, repeat)))
+    assert streams[0] == streams[1], "the lexers' tokens differ"
+    return times
+
+
+def cache_file(directory, module):
+    """The binary table cache in directory of the parser object module."""
+    return yacc.tab_cache_file(directory, grammar_info(module).signature())
+
+
+def build(directory):
+    """Write the binary table cache of the Myrial parser to directory,
+    removing the caches of other grammars from it, and return its path."""
+    from raco.myrial import parser as MyrialParser
+    if os.path.isdir(directory):
+        for name in os.listdir(directory):
+            os.remove(os.path.join(directory, name))
+    else:
+        os.makedirs(directory)
+    yacc._binary_tables.clear()
+    yacc.tab_cache_dir = directory
+    path = cache_file(directory, MyrialParser.Parser())
+    if not os.path.exists(path):
+        raise IOError("could not write %s" % path)
+    return path
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('command', choices=['build', 'bench'])
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT,
+                        help='how many times to time each way of loading')
+    args = parser.parse_args(argv)
+
+    from compiler import MYRIAL_TABLES, MyrialParser
+    module = MyrialParser.Parser()
+    path = cache_file(MYRIAL_TABLES, module)
+    if args.command == 'build' or not os.path.exists(path):
+        build(MYRIAL_TABLES)
+        sys.stdout.write('wrote %s (%d bytes)\n' %
+                         (path, os.path.getsize(path)))
+    if args.command == 'bench':
+        from examples import myria_examples
+        from raco.myrial import scanner
+        # as long as a long script
+        text = '\n'.join(code for _, code in myria_examples) * 20
+        times = (load_times(module, path, repeat=args.repeat) +
+                 construction_times(module, repeat=args.repeat) +
+                 lexing_times(scanner, text, repeat=args.repeat))
+        for way, seconds in times:
+            sys.stdout.write('%10.2f ms  %s\n' % (seconds * 1000, way))
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -34,7 +34,15 @@
 __version__    = "3.4"
 __tabversion__ = "3.2"       # Version of table file used
 
-import re, sys, types, copy, os
+fast_lexer     = 0           # Default for lex(fast=...): build a FastLexer,
+                             # which picks the rules to try by first character
+
+import re, sys, types, copy, os, sre_parse, functools
+from array import array
+from itertools import repeat
+from operator import itemgetter
+from sre_constants import LITERAL, NOT_LITERAL, ANY, IN, NEGATE, RANGE, \
+     CATEGORY, BRANCH, SUBPATTERN, MAX_REPEAT, MIN_REPEAT, AT, ASSERT, ASSERT_NOT
 
 # This tuple contains known string types
 try:
@@ -137,6 +145,7 @@ class Lexer:
         self.lexmodule = None         # Module
         self.lineno = 1               # Current line number
         self.lexoptimize = 0          # Optimized mode
+        self.lexfirst = None          # First character table (see FastLexer)
 
     def clone(self,object=None):
         c = copy.copy(self)
@@ -397,6 +406,138 @@ class Lexer:
              raise RuntimeError("No input string given with input()")
         return None
 
+    # ------------------------------------------------------------
+    # tokenize_all() - Return all of the tokens of the input at once
+    #
+    # Lexes the rest of the input (or s, if given) in one call and
+    # returns its tokens as a TokenArray.  The tokens of rules without
+    # a function, and of literals, are not made into LexToken objects,
+    # and their values are not sliced from the input until they are
+    # read.  Rules with functions are called as token() calls them.
+    # ------------------------------------------------------------
+    def tokenize_all(self,s=None):
+        if s is not None:
+            self.input(s)
+        if self.lexdata is None:
+            raise RuntimeError("No input string given with input()")
+
+        lexpos    = self.lexpos
+        lexlen    = self.lexlen
+        lexignore = self.lexignore
+        lexdata   = self.lexdata
+        lexre     = self.lexre
+        table, other = self.lexfirst or ({}, (None, lexre))
+
+        flat      = [ ]                 # Type, start, end and line number of each token
+        add       = flat.extend
+        objects   = { }                 # Index -> token returned by a rule function
+        values    = { }                 # Index -> value of a token made by a rule function
+        afters    = { }                 # Index -> where the lexer was after such a token
+
+        while lexpos < lexlen:
+            c = lexdata[lexpos]
+            if c in lexignore:
+                lexpos += 1
+                continue
+
+            strings, regexes = table.get(c,other)
+            if strings is not None:
+                for s,toktype in strings:
+                    if lexdata.startswith(s,lexpos):
+                        break
+                else:
+                    s = None
+                if s is not None:
+                    end = lexpos + len(s)
+                    if toktype:
+                        add((toktype,lexpos,end,self.lineno))
+                    lexpos = end
+                    continue
+            else:
+                for regex,lexindexfunc in regexes:
+                    m = regex.match(lexdata,lexpos)
+                    if m: break
+                else:
+                    m = None
+                if m:
+                    end = m.end()
+                    func,toktype = lexindexfunc[m.lastindex]
+                    if not func:
+                        if toktype:
+                            add((toktype,lexpos,end,self.lineno))
+                        lexpos = end
+                        continue
+
+                    tok = LexToken()
+                    tok.value = m.group()
+                    tok.lineno = self.lineno
+                    tok.lexpos = lexpos
+                    tok.type = toktype
+                    tok.lexer = self
+                    self.lexmatch = m
+                    self.lexpos = end
+
+                    newtok = func(tok)
+
+                    lexpos = self.lexpos            # In case the rule updated lexpos
+                    if self.lexre is not lexre:     # or changed the state
+                        lexre     = self.lexre
+                        lexignore = self.lexignore
+                        table, other = self.lexfirst or ({}, (None, lexre))
+                    if newtok:
+                        if not self.lexoptimize and not newtok.type in self.lextokens:
+                            raise LexError("%s:%d: Rule '%s' returned an unknown token type '%s'" % (
+                                func_code(func).co_filename, func_code(func).co_firstlineno,
+                                func.__name__, newtok.type),lexdata[end:])
+                        i = len(flat)//4
+                        if newtok is tok and len(tok.__dict__) == 5:
+                            # Only the value needs keeping: holding on to
+                            # every token object would make the cyclic
+                            # garbage collector go over them again and again
+                            values[i] = tok.value
+                        else:
+                            objects[i] = newtok
+                        if lexpos != end or self.lineno != newtok.lineno:
+                            afters[i] = (lexpos,self.lineno)
+                        add((newtok.type,newtok.lexpos,end,newtok.lineno))
+                    continue
+
+            # No match, see if in literals
+            if c in self.lexliterals:
+                add((c,lexpos,lexpos + 1,self.lineno))
+                lexpos += 1
+                continue
+
+            # No match. Call t_error() if defined.
+            if self.lexerrorf:
+                tok = LexToken()
+                tok.value = lexdata[lexpos:]
+                tok.lineno = self.lineno
+                tok.type = "error"
+                tok.lexer = self
+                tok.lexpos = lexpos
+                self.lexpos = lexpos
+                newtok = self.lexerrorf(tok)
+                if lexpos == self.lexpos:
+                    # Error method didn't change text position at all. This is an error.
+                    raise LexError("Scanning error. Illegal character '%s'" % (lexdata[lexpos]), lexdata[lexpos:])
+                lexpos    = self.lexpos
+                lexre     = self.lexre
+                lexignore = self.lexignore
+                table, other = self.lexfirst or ({}, (None, lexre))
+                if newtok:
+                    objects[len(flat)//4] = newtok
+                    if self.lineno != newtok.lineno:
+                        afters[len(flat)//4] = (lexpos,self.lineno)
+                    add((newtok.type,newtok.lexpos,lexpos,newtok.lineno))
+                continue
+
+            self.lexpos = lexpos
+            raise LexError("Illegal character '%s' at index %d" % (lexdata[lexpos],lexpos), lexdata[lexpos:])
+
+        self.lexpos = lexpos
+        return TokenArray(self,flat,objects,values,afters)
+
     # Iterator interface
     def __iter__(self):
         return self
@@ -409,6 +550,518 @@ class Lexer:
 
     __next__ = next
 
+# -----------------------------------------------------------------------------
+# TokenArray
+#
+# The tokens of an input, as returned by Lexer.tokenize_all(): parallel arrays
+# of their type codes (indexes into typenames), the offsets where they start
+# and end in lexdata, and their line numbers.  A token's value is the text
+# between its offsets, unless a rule function made the token.  Then its value
+# is kept (in values), or, if the function returned another object or set
+# attributes of its own on the token, the object is (in objects) and is used
+# as it is.
+#
+# LRParser.parse(tokens=...) parses a TokenArray by the indexes of its tokens,
+# without making objects for them.  Iterating over a TokenArray, or calling
+# the function tokenfunc() returns, gives token objects instead: ArrayTokens,
+# which are made (and their values sliced) only then, and the objects kept.
+# -----------------------------------------------------------------------------
+
+class TokenArray(object):
+    # flat is a list of the type, start, end and line number of each token in turn
+    def __init__(self,lexer,flat=(),objects=None,values=None,afters=None):
+        names = flat[0::4]
+        self.lexer     = lexer
+        self.lexdata   = lexer.lexdata
+        self.typenames = sorted(set(names),key=str)     # Token types by code
+        self.codes     = { }                            # Dictionary mapping token types to codes
+        for code, name in enumerate(self.typenames):
+            self.codes[name] = code
+        self.types     = array('i',map(self.codes.__getitem__,names))
+        self.starts    = array('i',flat[1::4])          # Offset of each token
+        self.ends      = array('i',flat[2::4])          # Offset after each token
+        self.linenos   = array('i',flat[3::4])          # Line number of each token
+        self.objects   = objects or { }                 # Index -> token returned by a rule function
+        self.values    = values or { }                  # Index -> value, if not the text of the token
+        self.afters    = afters or { }                  # Index -> (lexpos, lineno) of the lexer after a
+                                                        # token made by a rule function, if not its end
+        self.endlineno = lexer.lineno                   # Line number at the end of the input
+
+    def __len__(self):
+        return len(self.types)
+
+    def type(self,i):
+        tok = self.objects.get(i)
+        if tok is not None:
+            return tok.type
+        return self.typenames[self.types[i]]
+
+    def value(self,i):
+        tok = self.objects.get(i)
+        if tok is not None:
+            return tok.value
+        if i in self.values:
+            return self.values[i]
+        return self.lexdata[self.starts[i]:self.ends[i]]
+
+    def lineno(self,i):
+        tok = self.objects.get(i)
+        if tok is not None:
+            return tok.lineno
+        return self.linenos[i]
+
+    def lexpos(self,i):
+        tok = self.objects.get(i)
+        if tok is not None:
+            return tok.lexpos
+        return self.starts[i]
+
+    # The (lexpos, lineno) the lexer had after returning token i, or, for
+    # i == len(self), after returning None at the end of the input
+    def after(self,i):
+        if i >= len(self.types):
+            return len(self.lexdata) + 1, self.endlineno
+        return self.afters.get(i) or (self.ends[i],self.linenos[i])
+
+    # The token object of token i
+    def token(self,i):
+        tok = self.objects.get(i)
+        if tok is None:
+            tok = ArrayToken((self.typenames[self.types[i]],self.value(i),
+                              self.linenos[i],self.starts[i],self.lexer))
+        return tok
+
+    # The token objects of all of the tokens, made in a few passes over the
+    # arrays rather than one token at a time
+    def symbols(self):
+        values = list(map(self.lexdata.__getitem__,map(slice,self.starts,self.ends)))
+        for i, value in self.values.items():
+            values[i] = value
+        symbols = list(map(ArrayToken,zip(map(self.typenames.__getitem__,self.types),values,
+                                          self.linenos,self.starts,repeat(self.lexer))))
+        for i, tok in self.objects.items():
+            symbols[i] = tok
+        return symbols
+
+    def __iter__(self):
+        return iter(self.symbols())
+
+    # A function returning the next token object on each call, and None at
+    # the end.  If lexer is given, its lexpos and lineno are moved past each
+    # token as it is taken, as if its token() had returned the token.
+    def tokenfunc(self,lexer=None):
+        symbols = iter(self.symbols())
+        if lexer is not None:
+            symbols = self._moving(symbols,lexer)
+        return functools.partial(next,symbols,None)
+
+    def _moving(self,symbols,lexer):
+        for i, tok in enumerate(symbols):
+            lexer.lexpos, lexer.lineno = self.after(i)
+            yield tok
+        lexer.lexpos, lexer.lineno = self.after(len(self))
+
+# A token of a TokenArray: a tuple (type, value, lineno, lexpos, lexer).  Unlike
+# a LexToken, its attributes cannot be set.
+class ArrayToken(tuple):
+    __slots__ = ()
+
+    type   = property(itemgetter(0))
+    value  = property(itemgetter(1))
+    lineno = property(itemgetter(2))
+    lexpos = property(itemgetter(3))
+    lexer  = property(itemgetter(4))
+
+    def __str__(self):
+        return "LexToken(%s,%r,%d,%d)" % (self.type,self.value,self.lineno,self.lexpos)
+    def __repr__(self):
+        return str(self)
+
+# -----------------------------------------------------------------------------
+# FastLexer
+#
+# A lexer that produces the same tokens as Lexer, but looks up the rules that
+# can match at the current position by the character there.  The first
+# characters each rule can match are read from the parsed master regexes, and
+# the rules of each state are regrouped into a table from every ASCII character
+# to the rules, in their original order, that can start with it.  Since a
+# regex alternation takes its first alternative that matches, trying only
+# those rules gives the same match as trying them all.  Where every such rule
+# is a plain string without a function (operators and punctuation, mostly),
+# the table holds the strings themselves, and matching is a startswith() call
+# instead of a regex match.  Other characters (and all characters, for the
+# rules that cannot be analysed, such as case-insensitive ones) use the rules
+# that may start with a character outside ASCII.
+# -----------------------------------------------------------------------------
+
+class FastLexer(Lexer):
+    def __init__(self):
+        Lexer.__init__(self)
+        self.lexstatefirst = {}       # Dictionary mapping lexer states to first character tables
+
+    # Build the first character tables from the master regexes
+    def compile(self):
+        self.lexstatefirst = { }
+        for state, lre in self.lexstatere.items():
+            self.lexstatefirst[state] = _first_table(lre)
+        self.lexfirst = self.lexstatefirst.get(self.lexstate)
+
+    def clone(self,object=None):
+        c = Lexer.clone(self,object)
+        if object:
+            c.compile()               # The tables refer to the rebound rules
+        return c
+
+    def readtab(self,tabfile,fdict):
+        Lexer.readtab(self,tabfile,fdict)
+        self.compile()
+
+    def begin(self,state):
+        Lexer.begin(self,state)
+        self.lexfirst = self.lexstatefirst.get(state)
+
+    # ------------------------------------------------------------
+    # token() - Return the next token from the Lexer
+    #
+    # This is Lexer.token() with the rules to try taken from the
+    # first character table.
+    # ------------------------------------------------------------
+    def token(self):
+        # Make local copies of frequently referenced attributes
+        lexpos    = self.lexpos
+        lexlen    = self.lexlen
+        lexignore = self.lexignore
+        lexdata   = self.lexdata
+        table, other = self.lexfirst
+
+        while lexpos < lexlen:
+            # This code provides some short-circuit code for whitespace, tabs, and other ignored characters
+            c = lexdata[lexpos]
+            if c in lexignore:
+                lexpos += 1
+                continue
+
+            strings, regexes = table.get(c,other)
+            if strings is not None:
+                # Only rules for plain strings can match here
+                for s,toktype in strings:
+                    if lexdata.startswith(s,lexpos):
+                        break
+                else:
+                    s = None
+                if s is not None:
+                    end = lexpos + len(s)
+                    # If no token type was set, it's an ignored token
+                    if toktype:
+                        tok = LexToken()
+                        tok.value = lexdata[lexpos:end]
+                        tok.lineno = self.lineno
+                        tok.type = toktype
+                        tok.lexpos = lexpos
+                        self.lexpos = end
+                        return tok
+                    lexpos = end
+                    continue
+            else:
+                # Look for a regular expression match
+                for lexre,lexindexfunc in regexes:
+                    m = lexre.match(lexdata,lexpos)
+                    if m: break
+                else:
+                    m = None
+                if m:
+                    # Create a token for return
+                    tok = LexToken()
+                    tok.value = m.group()
+                    tok.lineno = self.lineno
+                    tok.lexpos = lexpos
+
+                    i = m.lastindex
+                    func,tok.type = lexindexfunc[i]
+
+                    if not func:
+                       # If no token type was set, it's an ignored token
+                       if tok.type:
+                          self.lexpos = m.end()
+                          return tok
+                       else:
+                          lexpos = m.end()
+                          continue
+
+                    lexpos = m.end()
+
+                    # If token is processed by a function, call it
+
+                    tok.lexer = self      # Set additional attributes useful in token rules
+                    self.lexmatch = m
+                    self.lexpos = lexpos
+
+                    newtok = func(tok)
+
+                    # Every function must return a token, if nothing, we just move to next token
+                    if not newtok:
+                        lexpos    = self.lexpos         # This is here in case user has updated lexpos.
+                        lexignore = self.lexignore      # This is here in case there was a state change
+                        table, other = self.lexfirst
+                        continue
+
+                    # Verify type of the token.  If not in the token map, raise an error
+                    if not self.lexoptimize:
+                        if not newtok.type in self.lextokens:
+                            raise LexError("%s:%d: Rule '%s' returned an unknown token type '%s'" % (
+                                func_code(func).co_filename, func_code(func).co_firstlineno,
+                                func.__name__, newtok.type),lexdata[lexpos:])
+
+                    return newtok
+
+            # No match, see if in literals
+            if c in self.lexliterals:
+                tok = LexToken()
+                tok.value = c
+                tok.lineno = self.lineno
+                tok.type = tok.value
+                tok.lexpos = lexpos
+                self.lexpos = lexpos + 1
+                return tok
+
+            # No match. Call t_error() if defined.
+            if self.lexerrorf:
+                tok = LexToken()
+                tok.value = self.lexdata[lexpos:]
+                tok.lineno = self.lineno
+                tok.type = "error"
+                tok.lexer = self
+                tok.lexpos = lexpos
+                self.lexpos = lexpos
+                newtok = self.lexerrorf(tok)
+                if lexpos == self.lexpos:
+                    # Error method didn't change text position at all. This is an error.
+                    raise LexError("Scanning error. Illegal character '%s'" % (lexdata[lexpos]), lexdata[lexpos:])
+                lexpos = self.lexpos
+                if not newtok:
+                    lexignore = self.lexignore
+                    table, other = self.lexfirst
+                    continue
+                return newtok
+
+            self.lexpos = lexpos
+            raise LexError("Illegal character '%s' at index %d" % (lexdata[lexpos],lexpos), lexdata[lexpos:])
+
+        self.lexpos = lexpos + 1
+        if self.lexdata is None:
+             raise RuntimeError("No input string given with input()")
+        return None
+
+# -----------------------------------------------------------------------------
+# _first_table()
+#
+# Given the master regexes of a state (a list of (re,findex) as in
+# Lexer.lexstatere), this returns its first character table: a pair (table,
+# other) where table maps each ASCII character to the entry of the rules that
+# can start with it, and other is the entry of the rules that may start with
+# any other character.  An entry is (strings,None), where strings is a tuple of
+# (string,tokentype) to try in order, or (None,regexes), where regexes is a
+# list of (re,findex) like the master regexes.
+# -----------------------------------------------------------------------------
+
+_ascii = frozenset(range(128))
+
+def _first_table(lre):
+    rules = []
+    for cre, findex in lre:
+        patterns = _rule_patterns(cre)
+        if patterns is None:
+            return ({}, (None, lre))   # Try every rule at every character
+        for text, name, group, items in patterns:
+            entry = findex[group]
+            if cre.flags & (re.IGNORECASE | re.LOCALE) or re.search(r'\\[1-9]|\(\?\(', text):
+                # Case folding and group references by number are not analysed
+                chars, other, fixed = _ascii, 1, None
+            else:
+                chars, other, nullable = _first_chars(items, cre.flags)
+                if nullable:
+                    chars, other = _ascii, 1
+                fixed = _fixed_string(items)
+            if not entry or entry[0]:
+                fixed = None           # Rules with functions need the match object
+            rules.append((text, name, entry, cre.flags, chars, other, fixed))
+
+    entries = { }
+    def entry_of(subset):
+        key = tuple(subset)
+        if key not in entries:
+            chosen = [rules[i] for i in subset]
+            if all([r[6] is not None for r in chosen]):
+                entries[key] = (tuple([(r[6], r[2][1]) for r in chosen]), None)
+            else:
+                entries[key] = (None, _subset_re(chosen))
+        return entries[key]
+
+    table = { }
+    for code in range(128):
+        table[chr(code)] = entry_of([i for i, r in enumerate(rules) if code in r[4]])
+    other = entry_of([i for i, r in enumerate(rules) if r[5]])
+    return (table, other)
+
+# -----------------------------------------------------------------------------
+# _rule_patterns()
+#
+# Splits a master regex into its rules: returns a list of (text, group name,
+# group number, parsed items) for each alternative, or None if the regex is not
+# an alternation of named groups.
+# -----------------------------------------------------------------------------
+
+def _rule_patterns(cre):
+    try:
+        items = list(sre_parse.parse(cre.pattern, cre.flags))
+    except Exception:
+        return None
+    if len(items) == 1 and items[0][0] == BRANCH:
+        alternatives = items[0][1][1]
+    else:
+        alternatives = [items]
+    names = dict([(group, name) for name, group in cre.groupindex.items()])
+    patterns = []
+    pos = 0
+    for alternative in alternatives:
+        alternative = list(alternative)
+        if len(alternative) != 1 or alternative[0][0] != SUBPATTERN:
+            return None
+        group = alternative[0][1][0]
+        name = names.get(group)
+        if name is None:
+            return None
+        start = cre.pattern.find("(?P<%s>" % name, pos)
+        if start < 0 or (patterns and cre.pattern[start-1] != "|"):
+            return None
+        patterns.append([start, name, group, list(alternative[0][1][-1])])
+        pos = start + 1
+    for i in range(len(patterns)):
+        if i + 1 < len(patterns):
+            end = patterns[i+1][0] - 1
+        else:
+            end = len(cre.pattern)
+        patterns[i][0] = cre.pattern[patterns[i][0]:end]
+    return patterns
+
+# -----------------------------------------------------------------------------
+# _first_chars()
+#
+# Given the parsed items of a regex, returns (chars, other, nullable): the
+# ASCII codes it can start with, whether it can start with another character,
+# and whether it can match without consuming a character before its last item.
+# Anything not understood may start with any character.
+# -----------------------------------------------------------------------------
+
+_categories = { 'category_digit' : r'\d', 'category_not_digit' : r'\D',
+                'category_space' : r'\s', 'category_not_space' : r'\S',
+                'category_word'  : r'\w', 'category_not_word'  : r'\W' }
+
+def _first_chars(items, flags):
+    chars = set()
+    other = 0
+    for op, av in items:
+        if op == LITERAL:
+            if av < 128:
+                chars.add(av)
+            else:
+                other = 1
+            return chars, other, 0
+        elif op == IN:
+            first, more = _class_chars(av, flags)
+            chars.update(first)
+            return chars, other or more, 0
+        elif op in (NOT_LITERAL, ANY):
+            return _ascii, 1, 0
+        elif op == BRANCH:
+            nullable = 0
+            for alternative in av[1]:
+                first, more, empty = _first_chars(alternative, flags)
+                chars.update(first)
+                other = other or more
+                nullable = nullable or empty
+            if not nullable:
+                return chars, other, 0
+        elif op == SUBPATTERN:
+            if len(av) > 2 and av[1] & (re.IGNORECASE | re.LOCALE):
+                return _ascii, 1, 1   # (?i:...)
+            first, more, nullable = _first_chars(av[-1], flags)
+            chars.update(first)
+            other = other or more
+            if not nullable:
+                return chars, other, 0
+        elif op in (MAX_REPEAT, MIN_REPEAT):
+            first, more, nullable = _first_chars(av[2], flags)
+            chars.update(first)
+            other = other or more
+            if av[0] > 0 and not nullable:
+                return chars, other, 0
+        elif op in (AT, ASSERT, ASSERT_NOT):
+            continue                  # Matches no character
+        else:
+            return _ascii, 1, 1
+    return chars, other, 1
+
+# The ASCII codes of a character class, and whether it has other characters
+def _class_chars(items, flags):
+    negate = items and items[0][0] == NEGATE
+    if negate:
+        items = items[1:]
+    chars = set()
+    other = 0
+    for op, av in items:
+        if op == LITERAL:
+            if av < 128:
+                chars.add(av)
+            else:
+                other = 1
+        elif op == RANGE:
+            chars.update(range(av[0], min(av[1], 127) + 1))
+            if av[1] >= 128:
+                other = 1
+        elif op == CATEGORY and str(av).lower() in _categories:
+            cre = re.compile(_categories[str(av).lower()], flags & re.UNICODE)
+            chars.update([code for code in range(128) if cre.match(chr(code))])
+            if flags & re.UNICODE or 'not' in str(av).lower():
+                other = 1
+        else:
+            return _ascii, 1
+    if negate:
+        return _ascii - chars, 1
+    return chars, other
+
+# The string a regex matches, if it is only literal characters, or None
+def _fixed_string(items):
+    if not items:
+        return None
+    for op, av in items:
+        if op != LITERAL:
+            return None
+        if av >= 128:
+            return None
+    return "".join([chr(av) for op, av in items])
+
+# -----------------------------------------------------------------------------
+# _subset_re()
+#
+# Builds the master regexes (a list of (re,findex)) of some of the rules of a
+# state, given as (text, group name, findex entry, flags, ...), splitting them
+# like _form_master_re() if they do not fit in one regex.
+# -----------------------------------------------------------------------------
+
+def _subset_re(rules):
+    if not rules: return []
+    try:
+        lexre = re.compile("|".join([r[0] for r in rules]), rules[0][3])
+        lexindexfunc = [ None ] * (max(lexre.groupindex.values())+1)
+        for text, name, entry, flags in [r[:4] for r in rules]:
+            lexindexfunc[lexre.groupindex[name]] = entry
+        return [(lexre,lexindexfunc)]
+    except Exception:
+        m = int(len(rules)/2)
+        if m == 0: m = 1
+        return _subset_re(rules[:m]) + _subset_re(rules[m:])
+
 # -----------------------------------------------------------------------------
 #                           ==== Lex Builder ===
 #
@@ -862,11 +1515,16 @@ class LexerReflect(object):
 #
 # Build all of the regular expression rules from definitions in the supplied module
 # -----------------------------------------------------------------------------
-def lex(module=None,object=None,debug=0,optimize=0,lextab="lextab",reflags=0,nowarn=0,outputdir="", debuglog=None, errorlog=None):
+def lex(module=None,object=None,debug=0,optimize=0,lextab="lextab",reflags=0,nowarn=0,outputdir="", debuglog=None, errorlog=None, fast=None):
     global lexer
     ldict = None
     stateinfo  = { 'INITIAL' : 'inclusive'}
-    lexobj = Lexer()
+    if fast is None:
+        fast = fast_lexer
+    if fast:
+        lexobj = FastLexer()
+    else:
+        lexobj = Lexer()
     lexobj.lexoptimize = optimize
     global token,input
 
@@ -994,6 +1652,9 @@ def lex(module=None,object=None,debug=0,optimize=0,lextab="lextab",reflags=0,now
               if not s in linfo.ignore:
                    linfo.ignore[s] = linfo.ignore.get("INITIAL","")
 
+    if fast:
+        lexobj.compile()
+
     # Create global versions of the token() and input() functions
     token = lexobj.token
     input = lexobj.input
@@ -61,6 +61,8 @@
 
 __version__    = "3.4"
 __tabversion__ = "3.2"       # Table version
+__combtabversion__ = "3.2c"  # Version of table files with compressed tables (a
+                             # version other PLYs reject instead of failing on)
 
 #-----------------------------------------------------------------------------
 #                     === User configurable parameters ===
@@ -84,7 +86,16 @@ resultlimit = 40               # Size limit of results when running in debug mod
 
 pickle_protocol = 0            # Protocol to use when writing pickle files
 
-import re, types, sys, os.path
+tab_cache_dir = None           # Default directory of binary table caches, one
+                               # per grammar (see tab_cache_file()), or None for none
+
+import re, types, sys, os.path, marshal, struct, threading, bisect, binascii
+from array import array
+
+try:
+    import mmap
+except ImportError:
+    mmap = None                # Table caches are then read as plain files
 
 # Compatibility function for python 2.6/3.0
 if sys.version_info[0] < 3:
@@ -229,6 +240,85 @@ class YaccProduction:
     def error(self):
        raise SyntaxError
 
+# The production object of LRParser.parsetokens().  There, the tokens of the
+# lex.TokenArray being parsed are on the symbol stack (and in .slice) as their
+# indexes in it, and their attributes are looked up in the array.
+
+class ArrayProduction(YaccProduction):
+    def __init__(self,tokens,s=None,stack=None):
+        YaccProduction.__init__(self,s,stack)
+        self.tokens = tokens
+
+    def __getitem__(self,n):
+        if n >= 0: s = self.slice[n]
+        else: s = self.stack[n]
+        if s.__class__ is int: return self.tokens.value(s)
+        return s.value
+
+    def __setitem__(self,n,v):
+        s = self.slice[n]
+        if s.__class__ is not int:
+            s.value = v
+        elif s in self.tokens.objects:
+            self.tokens.objects[s].value = v
+        else:
+            self.tokens.values[s] = v
+
+    def __getslice__(self,i,j):
+        return [self[n] for n in range(len(self.slice))[i:j]]
+
+    def lineno(self,n):
+        s = self.slice[n]
+        if s.__class__ is int: return self.tokens.lineno(s)
+        return getattr(s,"lineno",0)
+
+    def set_lineno(self,n,lineno):
+        s = self.slice[n]
+        if s.__class__ is not int:
+            s.lineno = lineno
+        elif s in self.tokens.objects:
+            self.tokens.objects[s].lineno = lineno
+        else:
+            self.tokens.linenos[s] = lineno
+
+    def linespan(self,n):
+        s = self.slice[n]
+        if s.__class__ is int:
+            startline = self.tokens.lineno(s)
+            return startline,startline
+        return YaccProduction.linespan(self,n)
+
+    def lexpos(self,n):
+        s = self.slice[n]
+        if s.__class__ is int: return self.tokens.lexpos(s)
+        return getattr(s,"lexpos",0)
+
+    def lexspan(self,n):
+        s = self.slice[n]
+        if s.__class__ is int:
+            startpos = self.tokens.lexpos(s)
+            return startpos,startpos
+        return YaccProduction.lexspan(self,n)
+
+# -----------------------------------------------------------------------------
+# errok(), token(), restart()
+#
+# Functions that p_error() may call during error recovery.  They act on the
+# parse that called p_error() in the current thread, so that parsers can be
+# used from many threads at once.
+# -----------------------------------------------------------------------------
+
+_recovery = threading.local()
+
+def _recovery_function(i):
+    functions = getattr(_recovery,"functions",None)
+    if functions is None:
+        raise YaccError("errok(), token() and restart() may only be called from p_error()")
+    return functions[i]
+
+def errok():   return _recovery_function(0)()
+def token():   return _recovery_function(1)()
+def restart(): return _recovery_function(2)()
 
 # -----------------------------------------------------------------------------
 #                               == LRParser ==
@@ -236,12 +326,29 @@ class YaccProduction:
 # The LR Parsing engine.
 # -----------------------------------------------------------------------------
 
-class LRParser:
+class LRParser(object):
     def __init__(self,lrtab,errorf):
         self.productions = lrtab.lr_productions
-        self.action      = lrtab.lr_action
-        self.goto        = lrtab.lr_goto
+        self.action_table, self.goto_table = lrtab.compact()
+        # The goto column of the nonterminal each production reduces to
+        self.goto_columns = [self.goto_table.index.get(p.name,-1) for p in self.productions]
         self.errorfunc   = errorf
+        self.rows        = None        # (action,goto) as rows, built on first use
+
+    # The tables as dictionaries of rows ({state: {symbol: value}}), for
+    # inspecting them.  The parser itself uses the compact tables.
+    @property
+    def action(self):
+        return self.table_rows()[0]
+
+    @property
+    def goto(self):
+        return self.table_rows()[1]
+
+    def table_rows(self):
+        if self.rows is None:
+            self.rows = (self.action_table.rows(),self.goto_table.rows())
+        return self.rows
 
     def errok(self):
         self.errorok     = 1
@@ -254,11 +361,33 @@ class LRParser:
         self.symstack.append(sym)
         self.statestack.append(0)
 
-    def parse(self,input=None,lexer=None,debug=0,tracking=0,tokenfunc=None):
+    # A ParseSession sharing the tables of this parser, for parsing from
+    # one thread while others parse with sessions of their own
+    def session(self,lexer=None):
+        return ParseSession(self,lexer)
+
+    # Parses each of the inputs in turn and returns the list of results
+    def parse_many(self,inputs,lexer=None,debug=0,tracking=0):
+        return self.session(lexer).parse_many(inputs,debug,tracking)
+
+    # An IncrementalParser reparsing edited versions of one input, as
+    # statements of the nonterminal statement
+    def incremental(self,statement,lexer=None):
+        return IncrementalParser(self,statement,lexer)
+
+    # Parses the input, or the tokens of a lex.TokenArray (see
+    # Lexer.tokenize_all()) if tokens is given.
+    def parse(self,input=None,lexer=None,debug=0,tracking=0,tokenfunc=None,tokens=None):
         if debug or yaccdevel:
+            if tokens is not None:
+                if lexer is None:
+                    lexer = tokens.lexer
+                tokenfunc = tokens.tokenfunc(tracking and lexer or None)
             if isinstance(debug,int):
                 debug = PlyLogger(sys.stderr)
             return self.parsedebug(input,lexer,debug,tracking,tokenfunc)
+        elif tokens is not None:
+            return self.parsetokens(tokens,lexer,tracking)
         elif tracking:
             return self.parseopt(input,lexer,debug,tracking,tokenfunc)
         else:
@@ -282,8 +411,13 @@ class LRParser:
     def parsedebug(self,input=None,lexer=None,debug=None,tracking=0,tokenfunc=None):
         lookahead = None                 # Current lookahead symbol
         lookaheadstack = [ ]             # Stack of lookahead symbols
-        actions = self.action            # Local reference to action table (to avoid lookup on self.)
-        goto    = self.goto              # Local reference to goto table (to avoid lookup on self.)
+        abase   = self.action_table.base   # Local references to the compact action table
+        acheck  = self.action_table.check
+        avalue  = self.action_table.value
+        acolumn = self.action_table.index.get
+        gbase   = self.goto_table.base     # Local references to the compact goto table
+        gvalue  = self.goto_table.value
+        gcolumn = self.goto_columns
         prod    = self.productions       # Local reference to production list (to avoid lookup on self.)
         pslice  = YaccProduction(None)   # Production object passed to grammar rules
         errorcount = 0                   # Used during error recovery 
@@ -354,7 +488,11 @@ class LRParser:
 
             # Check the action table
             ltype = lookahead.type
-            t = actions[state].get(ltype)
+            i = abase[state] + acolumn(ltype,-1)
+            if acheck[i] == state:
+                t = avalue[i]
+            else:
+                t = None
 
             if t is not None:
                 if t > 0:
@@ -423,7 +561,7 @@ class LRParser:
                             debug.info("Result : %s", format_result(pslice[0]))
                             # --! DEBUG
                             symstack.append(sym)
-                            state = goto[statestack[-1]][pname]
+                            state = gvalue[gbase[statestack[-1]] + gcolumn[-t]]
                             statestack.append(state)
                         except SyntaxError:
                             # If an error was set. Enter error recovery state
@@ -462,7 +600,7 @@ class LRParser:
                             debug.info("Result : %s", format_result(pslice[0]))
                             # --! DEBUG
                             symstack.append(sym)
-                            state = goto[statestack[-1]][pname]
+                            state = gvalue[gbase[statestack[-1]] + gcolumn[-t]]
                             statestack.append(state)
                         except SyntaxError:
                             # If an error was set. Enter error recovery state
@@ -510,14 +648,14 @@ class LRParser:
                     if errtoken.type == "$end":
                         errtoken = None               # End of file!
                     if self.errorfunc:
-                        global errok,token,restart
-                        errok = self.errok        # Set some special functions available in error recovery
-                        token = get_token
-                        restart = self.restart
+                        # Set some special functions available in error recovery
+                        _recovery.functions = (self.errok,get_token,self.restart)
                         if errtoken and not hasattr(errtoken,'lexer'):
                             errtoken.lexer = lexer
-                        tok = self.errorfunc(errtoken)
-                        del errok, token, restart   # Delete special functions
+                        try:
+                            tok = self.errorfunc(errtoken)
+                        finally:
+                            del _recovery.functions     # Delete special functions
 
                         if self.errorok:
                             # User must have done some kind of panic
@@ -597,8 +735,13 @@ class LRParser:
     def parseopt(self,input=None,lexer=None,debug=0,tracking=0,tokenfunc=None):
         lookahead = None                 # Current lookahead symbol
         lookaheadstack = [ ]             # Stack of lookahead symbols
-        actions = self.action            # Local reference to action table (to avoid lookup on self.)
-        goto    = self.goto              # Local reference to goto table (to avoid lookup on self.)
+        abase   = self.action_table.base   # Local references to the compact action table
+        acheck  = self.action_table.check
+        avalue  = self.action_table.value
+        acolumn = self.action_table.index.get
+        gbase   = self.goto_table.base     # Local references to the compact goto table
+        gvalue  = self.goto_table.value
+        gcolumn = self.goto_columns
         prod    = self.productions       # Local reference to production list (to avoid lookup on self.)
         pslice  = YaccProduction(None)   # Production object passed to grammar rules
         errorcount = 0                   # Used during error recovery 
@@ -655,7 +798,11 @@ class LRParser:
 
             # Check the action table
             ltype = lookahead.type
-            t = actions[state].get(ltype)
+            i = abase[state] + acolumn(ltype,-1)
+            if acheck[i] == state:
+                t = avalue[i]
+            else:
+                t = None
 
             if t is not None:
                 if t > 0:
@@ -709,7 +856,7 @@ class LRParser:
                             del statestack[-plen:]
                             p.callable(pslice)
                             symstack.append(sym)
-                            state = goto[statestack[-1]][pname]
+                            state = gvalue[gbase[statestack[-1]] + gcolumn[-t]]
                             statestack.append(state)
                         except SyntaxError:
                             # If an error was set. Enter error recovery state
@@ -745,7 +892,7 @@ class LRParser:
                             # Call the grammar rule with our special slice object
                             p.callable(pslice)
                             symstack.append(sym)
-                            state = goto[statestack[-1]][pname]
+                            state = gvalue[gbase[statestack[-1]] + gcolumn[-t]]
                             statestack.append(state)
                         except SyntaxError:
                             # If an error was set. Enter error recovery state
@@ -783,14 +930,14 @@ class LRParser:
                     if errtoken.type == '$end':
                         errtoken = None               # End of file!
                     if self.errorfunc:
-                        global errok,token,restart
-                        errok = self.errok        # Set some special functions available in error recovery
-                        token = get_token
-                        restart = self.restart
+                        # Set some special functions available in error recovery
+                        _recovery.functions = (self.errok,get_token,self.restart)
                         if errtoken and not hasattr(errtoken,'lexer'):
                             errtoken.lexer = lexer
-                        tok = self.errorfunc(errtoken)
-                        del errok, token, restart   # Delete special functions
+                        try:
+                            tok = self.errorfunc(errtoken)
+                        finally:
+                            del _recovery.functions     # Delete special functions
 
                         if self.errorok:
                             # User must have done some kind of panic
@@ -869,8 +1016,13 @@ class LRParser:
     def parseopt_notrack(self,input=None,lexer=None,debug=0,tracking=0,tokenfunc=None):
         lookahead = None                 # Current lookahead symbol
         lookaheadstack = [ ]             # Stack of lookahead symbols
-        actions = self.action            # Local reference to action table (to avoid lookup on self.)
-        goto    = self.goto              # Local reference to goto table (to avoid lookup on self.)
+        abase   = self.action_table.base   # Local references to the compact action table
+        acheck  = self.action_table.check
+        avalue  = self.action_table.value
+        acolumn = self.action_table.index.get
+        gbase   = self.goto_table.base     # Local references to the compact goto table
+        gvalue  = self.goto_table.value
+        gcolumn = self.goto_columns
         prod    = self.productions       # Local reference to production list (to avoid lookup on self.)
         pslice  = YaccProduction(None)   # Production object passed to grammar rules
         errorcount = 0                   # Used during error recovery 
@@ -927,7 +1079,11 @@ class LRParser:
 
             # Check the action table
             ltype = lookahead.type
-            t = actions[state].get(ltype)
+            i = abase[state] + acolumn(ltype,-1)
+            if acheck[i] == state:
+                t = avalue[i]
+            else:
+                t = None
 
             if t is not None:
                 if t > 0:
@@ -970,7 +1126,7 @@ class LRParser:
                             del statestack[-plen:]
                             p.callable(pslice)
                             symstack.append(sym)
-                            state = goto[statestack[-1]][pname]
+                            state = gvalue[gbase[statestack[-1]] + gcolumn[-t]]
                             statestack.append(state)
                         except SyntaxError:
                             # If an error was set. Enter error recovery state
@@ -1000,7 +1156,7 @@ class LRParser:
                             # Call the grammar rule with our special slice object
                             p.callable(pslice)
                             symstack.append(sym)
-                            state = goto[statestack[-1]][pname]
+                            state = gvalue[gbase[statestack[-1]] + gcolumn[-t]]
                             statestack.append(state)
                         except SyntaxError:
                             # If an error was set. Enter error recovery state
@@ -1038,14 +1194,706 @@ class LRParser:
                     if errtoken.type == '$end':
                         errtoken = None               # End of file!
                     if self.errorfunc:
-                        global errok,token,restart
-                        errok = self.errok        # Set some special functions available in error recovery
-                        token = get_token
-                        restart = self.restart
+                        # Set some special functions available in error recovery
+                        _recovery.functions = (self.errok,get_token,self.restart)
+                        if errtoken and not hasattr(errtoken,'lexer'):
+                            errtoken.lexer = lexer
+                        try:
+                            tok = self.errorfunc(errtoken)
+                        finally:
+                            del _recovery.functions     # Delete special functions
+
+                        if self.errorok:
+                            # User must have done some kind of panic
+                            # mode recovery on their own.  The
+                            # returned token is the next lookahead
+                            lookahead = tok
+                            errtoken = None
+                            continue
+                    else:
+                        if errtoken:
+                            if hasattr(errtoken,"lineno"): lineno = lookahead.lineno
+                            else: lineno = 0
+                            if lineno:
+                                sys.stderr.write("yacc: Syntax error at line %d, token=%s\n" % (lineno, errtoken.type))
+                            else:
+                                sys.stderr.write("yacc: Syntax error, token=%s" % errtoken.type)
+                        else:
+                            sys.stderr.write("yacc: Parse error in input. EOF\n")
+                            return
+
+                else:
+                    errorcount = error_count
+
+                # case 1:  the statestack only has 1 entry on it.  If we're in this state, the
+                # entire parse has been rolled back and we're completely hosed.   The token is
+                # discarded and we just keep going.
+
+                if len(statestack) <= 1 and lookahead.type != '$end':
+                    lookahead = None
+                    errtoken = None
+                    state = 0
+                    # Nuke the pushback stack
+                    del lookaheadstack[:]
+                    continue
+
+                # case 2: the statestack has a couple of entries on it, but we're
+                # at the end of the file. nuke the top entry and generate an error token
+
+                # Start nuking entries on the stack
+                if lookahead.type == '$end':
+                    # Whoa. We're really hosed here. Bail out
+                    return
+
+                if lookahead.type != 'error':
+                    sym = symstack[-1]
+                    if sym.type == 'error':
+                        # Hmmm. Error is on top of stack, we'll just nuke input
+                        # symbol and continue
+                        lookahead = None
+                        continue
+                    t = YaccSymbol()
+                    t.type = 'error'
+                    if hasattr(lookahead,"lineno"):
+                        t.lineno = lookahead.lineno
+                    t.value = lookahead
+                    lookaheadstack.append(lookahead)
+                    lookahead = t
+                else:
+                    symstack.pop()
+                    statestack.pop()
+                    state = statestack[-1]       # Potential bug fix
+
+                continue
+
+            # Call an error function here
+            raise RuntimeError("yacc: internal parser error!!!\n")
+
+    # !!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!
+    # parsetokens().
+    #
+    # Version of parseopt() that parses the tokens of a lex.TokenArray.  Rather
+    # than a token object, the lookahead (and what is shifted onto the symbol
+    # stack) is the index of a token in the array, and the action table column
+    # of every token is looked up before the parse starts.  Token objects are
+    # only made for error handling.  Keep this in step with parseopt().
+    # !!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!
+
+    def parsetokens(self,tokens,lexer=None,tracking=0):
+        lookahead = None                 # Current lookahead: a token index, a symbol or None
+        lookaheadstack = [ ]             # Stack of lookahead symbols
+        abase   = self.action_table.base   # Local references to the compact action table
+        acheck  = self.action_table.check
+        avalue  = self.action_table.value
+        acolumn = self.action_table.index.get
+        gbase   = self.goto_table.base     # Local references to the compact goto table
+        gvalue  = self.goto_table.value
+        gcolumn = self.goto_columns
+        prod    = self.productions       # Local reference to production list (to avoid lookup on self.)
+        pslice  = ArrayProduction(tokens) # Production object passed to grammar rules
+        errorcount = 0                   # Used during error recovery 
+
+        if not lexer:
+            lexer = tokens.lexer
+
+        # Set up the lexer and parser objects on pslice
+        pslice.lexer = lexer
+        pslice.parser = self
+
+        # The action table column of each token
+        typecolumns = [acolumn(name,-1) for name in tokens.typenames]
+        columns = list(map(typecolumns.__getitem__,tokens.types))
+        for i, tok in tokens.objects.items():
+            columns[i] = acolumn(tok.type,-1)
+        ntokens = len(columns)
+        pos = 0                         # Index of the next token to read
+
+        # Set up the state and symbol stacks
+
+        statestack = [ ]                # Stack of parsing states
+        self.statestack = statestack
+        symstack   = [ ]                # Stack of grammar symbols and token indexes
+        self.symstack = symstack
+
+        pslice.stack = symstack         # Put in the production
+        errtoken   = None               # Err token
+
+        # The start state is assumed to be (0,$end)
+
+        statestack.append(0)
+        sym = YaccSymbol()
+        sym.type = '$end'
+        symstack.append(sym)
+        state = 0
+        while 1:
+            # Get the next symbol on the input.  If a lookahead symbol
+            # is already set, we just use that. Otherwise, we'll pull
+            # the next token off of the lookaheadstack or from the array
+
+            if lookahead is None:
+                if lookaheadstack:
+                    lookahead = lookaheadstack.pop()
+                elif pos < ntokens:
+                    lookahead = pos
+                    pos += 1
+                else:
+                    lookahead = YaccSymbol()
+                    lookahead.type = '$end'
+                    pos = ntokens + 1
+
+            # Check the action table
+            if lookahead.__class__ is int:
+                i = abase[state] + columns[lookahead]
+            else:
+                i = abase[state] + acolumn(lookahead.type,-1)
+            if acheck[i] == state:
+                t = avalue[i]
+            else:
+                t = None
+
+            if t is not None:
+                if t > 0:
+                    # shift a symbol on the stack
+                    statestack.append(t)
+                    state = t
+
+                    symstack.append(lookahead)
+                    lookahead = None
+
+                    # Decrease error count on successful shift
+                    if errorcount: errorcount -=1
+                    continue
+
+                if t < 0:
+                    # reduce a symbol on the stack, emit a production
+                    p = prod[-t]
+                    plen  = p.len
+
+                    # Get production function
+                    sym = YaccSymbol()
+                    sym.type = p.name      # Production name
+                    sym.value = None
+
+                    if plen:
+                        targ = symstack[-plen-1:]
+                        targ[0] = sym
+
+                        if tracking:
+                           t1 = targ[1]
+                           if t1.__class__ is int:
+                               sym.lineno = tokens.lineno(t1)
+                               sym.lexpos = tokens.lexpos(t1)
+                           else:
+                               sym.lineno = t1.lineno
+                               sym.lexpos = t1.lexpos
+                           t1 = targ[-1]
+                           if t1.__class__ is int:
+                               sym.endlineno = tokens.lineno(t1)
+                               sym.endlexpos = tokens.lexpos(t1)
+                           else:
+                               sym.endlineno = getattr(t1,"endlineno",t1.lineno)
+                               sym.endlexpos = getattr(t1,"endlexpos",t1.lexpos)
+
+                        del symstack[-plen:]
+                        del statestack[-plen:]
+                    else:
+                        if tracking:
+                           # Where the lexer would be after reading the lookahead
+                           sym.lexpos, sym.lineno = tokens.after(pos - 1)
+
+                        targ = [ sym ]
+
+                    pslice.slice = targ
+
+                    try:
+                        # Call the grammar rule with our special slice object
+                        p.callable(pslice)
+                        symstack.append(sym)
+                        state = gvalue[gbase[statestack[-1]] + gcolumn[-t]]
+                        statestack.append(state)
+                    except SyntaxError:
+                        # If an error was set. Enter error recovery state
+                        lookaheadstack.append(lookahead)
+                        symstack.pop()
+                        statestack.pop()
+                        state = statestack[-1]
+                        sym.type = 'error'
+                        lookahead = sym
+                        errorcount = error_count
+                        self.errorok = 0
+                    continue
+
+                if t == 0:
+                    n = symstack[-1]
+                    return getattr(n,"value",None)
+
+            if t == None:
+
+                # We have some kind of parsing error here.  Error recovery
+                # works on token objects, so the lookahead becomes one, and
+                # the lexer is moved to where it would be after reading it.
+                if lookahead.__class__ is int:
+                    lookahead = tokens.token(lookahead)
+                lexer.lexpos, lexer.lineno = tokens.after(pos - 1)
+
+                if errorcount == 0 or self.errorok:
+                    errorcount = error_count
+                    self.errorok = 0
+                    errtoken = lookahead
+                    if errtoken.type == '$end':
+                        errtoken = None               # End of file!
+                    if self.errorfunc:
+                        taken = [pos]
+                        def get_token():
+                            i = taken[0]
+                            if i >= ntokens:
+                                return None
+                            taken[0] = i + 1
+                            lexer.lexpos, lexer.lineno = tokens.after(i)
+                            return tokens.token(i)
+                        # Set some special functions available in error recovery
+                        _recovery.functions = (self.errok,get_token,self.restart)
+                        if errtoken and not hasattr(errtoken,'lexer'):
+                            errtoken.lexer = lexer
+                        try:
+                            tok = self.errorfunc(errtoken)
+                        finally:
+                            del _recovery.functions     # Delete special functions
+                        pos = taken[0]
+
+                        if self.errorok:
+                            # User must have done some kind of panic
+                            # mode recovery on their own.  The
+                            # returned token is the next lookahead
+                            lookahead = tok
+                            errtoken = None
+                            continue
+                    else:
+                        if errtoken:
+                            if hasattr(errtoken,"lineno"): lineno = lookahead.lineno
+                            else: lineno = 0
+                            if lineno:
+                                sys.stderr.write("yacc: Syntax error at line %d, token=%s\n" % (lineno, errtoken.type))
+                            else:
+                                sys.stderr.write("yacc: Syntax error, token=%s" % errtoken.type)
+                        else:
+                            sys.stderr.write("yacc: Parse error in input. EOF\n")
+                            return
+
+                else:
+                    errorcount = error_count
+
+                # case 1:  the statestack only has 1 entry on it.  If we're in this state, the
+                # entire parse has been rolled back and we're completely hosed.   The token is
+                # discarded and we just keep going.
+
+                if len(statestack) <= 1 and lookahead.type != '$end':
+                    lookahead = None
+                    errtoken = None
+                    state = 0
+                    # Nuke the pushback stack
+                    del lookaheadstack[:]
+                    continue
+
+                # case 2: the statestack has a couple of entries on it, but we're
+                # at the end of the file. nuke the top entry and generate an error token
+
+                # Start nuking entries on the stack
+                if lookahead.type == '$end':
+                    # Whoa. We're really hosed here. Bail out
+                    return
+
+                if lookahead.type != 'error':
+                    sym = symstack[-1]
+                    if sym.__class__ is not int and sym.type == 'error':
+                        # Hmmm. Error is on top of stack, we'll just nuke input
+                        # symbol and continue
+                        lookahead = None
+                        continue
+                    t = YaccSymbol()
+                    t.type = 'error'
+                    if hasattr(lookahead,"lineno"):
+                        t.lineno = lookahead.lineno
+                    t.value = lookahead
+                    lookaheadstack.append(lookahead)
+                    lookahead = t
+                else:
+                    symstack.pop()
+                    statestack.pop()
+                    state = statestack[-1]       # Potential bug fix
+
+                continue
+
+            # Call an error function here
+            raise RuntimeError("yacc: internal parser error!!!\n")
+
+# -----------------------------------------------------------------------------
+# ParseSession
+#
+# The state of one parse at a time.  An LRParser keeps the state of the parse
+# it is running (its stacks and error recovery flag) on itself, and parses
+# with the lexer it is given, or the one lex built last.  A session has the
+# tables, productions and error function of its parser, which are shared and
+# never modified, but stacks, and a clone of the lexer, of its own.  Every
+# parse starts it afresh: the lexer goes back to the state and line number it
+# was cloned with.  Sessions of one parser can parse in as many threads as
+# there are sessions; one session only parses in one thread at a time.
+# -----------------------------------------------------------------------------
+
+class ParseSession(LRParser):
+    def __init__(self,parser,lexer=None):
+        self.parser       = parser
+        self.productions  = parser.productions
+        self.action_table = parser.action_table
+        self.goto_table   = parser.goto_table
+        self.goto_columns = parser.goto_columns
+        self.errorfunc    = parser.errorfunc
+        self.rows         = None
+        if lexer is None:
+            lexer = load_ply_lex().lexer
+        self.lexer        = lexer.clone()
+        self.lexstart     = (self.lexer.lexstate,self.lexer.lineno)
+        self.reset()
+
+    # Clear the state of the last parse
+    def reset(self):
+        self.statestack = [ ]
+        self.symstack   = [ ]
+        self.errorok    = 0
+        lexstate, lineno = self.lexstart
+        self.lexer.begin(lexstate)
+        self.lexer.lexstatestack = [ ]
+        self.lexer.lineno = lineno
+
+    def parse(self,input=None,lexer=None,debug=0,tracking=0,tokenfunc=None,tokens=None):
+        self.reset()
+        try:
+            return LRParser.parse(self,input,lexer or self.lexer,debug,tracking,tokenfunc,tokens)
+        finally:
+            # Release the symbols of the parse
+            self.statestack = [ ]
+            self.symstack   = [ ]
+
+    def parse_many(self,inputs,debug=0,tracking=0):
+        return [self.parse(input,debug=debug,tracking=tracking) for input in inputs]
+
+# -----------------------------------------------------------------------------
+# IncrementalParser
+#
+# A session for parsing one text again and again as it is edited, such as a
+# program in an editor.  The grammar needs a nonterminal (statement) for the
+# statements of a program, whose values depend on nothing but their own text.
+#
+# Every parse keeps a checkpoint after each statement it reduces: the parser
+# stacks, and the state of the lexer after the statement's last token.  It
+# also keeps the symbol of the statement, and the parser state it started in.
+# The next parse compares its text with the last one.  It restores the last
+# checkpoint that ends before the first changed character, and lexes and
+# parses from there.  When it is about to shift the first token of an old
+# statement that lies in the unchanged end of the text, in the state the old
+# parse shifted it in, it does not.  Instead it pushes the old statement
+# symbol, as the goto after a reduction would, and moves the lexer past the
+# statement.  So only the edited region is lexed and parsed.  The statements
+# before it are not visited at all, and those after it cost a few lookups
+# each.
+#
+# A parse with syntax errors keeps no checkpoints or statements from the
+# first error on, so the next parse goes through (and reports) them again.
+#
+# Tokens are assumed to depend on no more than one character on either side
+# of their text.  A reused statement keeps the value of the old parse, so the
+# positions recorded in its value (not those of its symbol, which are moved)
+# are the old ones.  Rules run for a statement are not run again when it is
+# reused.
+# -----------------------------------------------------------------------------
+
+class IncrementalParser(ParseSession):
+    def __init__(self,parser,statement,lexer=None):
+        ParseSession.__init__(self,parser,lexer)
+        self.statement = statement
+        self.forget()
+
+    # Forget the last parse, so that the next one parses all of its input
+    def forget(self):
+        self.text        = None
+        self.ends        = [ ]      # Lexer position after each checkpoint, in order
+        self.checkpoints = [ ]      # Lexer state and parser stacks after each statement
+        self.statements  = { }      # Offset of the first token of each statement -> its record
+        self.resumed     = 0        # Offset the last parse started lexing at
+        self.reused      = 0        # Number of statements the last parse reused
+
+    def parse(self,input):
+        try:
+            return self.parseincremental(input)
+        except:
+            self.forget()
+            raise
+        finally:
+            self.statestack = [ ]
+            self.symstack   = [ ]
+
+    # Debugging and tracking are not options here: positions are always
+    # tracked, and there is no debug version of parseincremental()
+    def parse_many(self,inputs):
+        return [self.parse(input) for input in inputs]
+
+    # !!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!
+    # parseincremental().
+    #
+    # Version of parseopt() that starts from a checkpoint, keeps checkpoints,
+    # and reuses statements.  Keep this in step with parseopt().
+    # !!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!
+
+    def parseincremental(self,input):
+        lookahead = None                 # Current lookahead symbol
+        lookaheadstack = [ ]             # Stack of lookahead symbols
+        abase   = self.action_table.base   # Local references to the compact action table
+        acheck  = self.action_table.check
+        avalue  = self.action_table.value
+        acolumn = self.action_table.index.get
+        gbase   = self.goto_table.base     # Local references to the compact goto table
+        gvalue  = self.goto_table.value
+        gcolumn = self.goto_columns
+        prod    = self.productions       # Local reference to production list (to avoid lookup on self.)
+        pslice  = YaccProduction(None)   # Production object passed to grammar rules
+        errorcount = 0                   # Used during error recovery 
+        statement = self.statement
+        gstatement = self.goto_table.index.get(statement,-1)
+
+        self.reset()
+        lexer = self.lexer
+        pslice.lexer = lexer
+        pslice.parser = self
+        lexer.input(input)
+        get_token = lexer.token
+
+        # Compare the input with the last one
+        old = self.text
+        if old is None:
+            prefix = suffix = delta = 0
+        else:
+            prefix = _common_prefix(old,input)
+            suffix = min(_common_suffix(old,input),min(len(old),len(input)) - prefix)
+            delta  = len(input) - len(old)
+        reusefrom = old is not None and len(old) - suffix + 1 or 0  # Old statements from here on may be reused
+
+        # The last checkpoint a character or more before the first change
+        k = bisect.bisect_right(self.ends,prefix - 1) - 1
+        if k >= 0:
+            (lexpos,lineno,lexstate,lexstack), statestack, symstack = self.checkpoints[k]
+            lexer.lexpos = lexpos
+            lexer.lineno = lineno
+            lexer.begin(lexstate)
+            lexer.lexstatestack = list(lexstack)
+            statestack = list(statestack)
+            symstack   = list(symstack)
+        else:
+            lexpos = 0
+            statestack = [ 0 ]
+            sym = YaccSymbol()
+            sym.type = '$end'
+            symstack = [ sym ]
+        state = statestack[-1]
+
+        # The checkpoints and statements of this parse; those before the
+        # resumed checkpoint stay as they are
+        reusable   = self.statements
+        ends       = self.ends[:k+1]
+        checkpoints = self.checkpoints[:k+1]
+        statements = { }
+        for start, record in reusable.items():
+            if start < lexpos:
+                statements[start] = record
+        self.resumed = lexpos
+        self.reused  = 0
+        after      = { }                # Offset of each token read -> lexer state after it, and its type
+        errorat    = None               # Number of checkpoints kept before the first syntax error
+
+        self.statestack = statestack
+        self.symstack = symstack
+        pslice.stack = symstack         # Put in the production
+        errtoken   = None               # Err token
+
+        while 1:
+            # Get the next symbol on the input.  If a lookahead symbol
+            # is already set, we just use that. Otherwise, we'll pull
+            # the next token off of the lookaheadstack or from the lexer
+
+            if not lookahead:
+                if not lookaheadstack:
+                    lookahead = get_token()     # Get the next token
+                    if lookahead:
+                        after[lookahead.lexpos] = (lexer.lexpos,lexer.lineno,lexer.lexstate,
+                                                   tuple(lexer.lexstatestack),lookahead.type)
+                else:
+                    lookahead = lookaheadstack.pop()
+                if not lookahead:
+                    lookahead = YaccSymbol()
+                    lookahead.type = '$end'
+
+            # Check the action table
+            ltype = lookahead.type
+            i = abase[state] + acolumn(ltype,-1)
+            if acheck[i] == state:
+                t = avalue[i]
+            else:
+                t = None
+
+            if t is not None:
+                if t > 0:
+                    # Reuse the old statement starting with this token, if
+                    # it is unchanged and the parse is where it was then
+                    start = getattr(lookahead,"lexpos",-1) - delta
+                    if start >= reusefrom and start in reusable and not lookaheadstack:
+                        first, firstlex, oldstate, oldsym, end = reusable[start]
+                        if oldstate == state and first == ltype and \
+                           firstlex == (lexer.lexstate,tuple(lexer.lexstatestack)):
+                            lines = lookahead.lineno - oldsym.lineno
+                            sym = YaccSymbol()
+                            sym.type = statement
+                            sym.value = oldsym.value
+                            sym.lineno = oldsym.lineno + lines
+                            sym.lexpos = oldsym.lexpos + delta
+                            sym.endlineno = oldsym.endlineno + lines
+                            sym.endlexpos = oldsym.endlexpos + delta
+                            lexpos, lineno, lexstate, lexstack = end
+                            end = (lexpos + delta,lineno + lines,lexstate,lexstack)
+                            lexer.lexpos = end[0]
+                            lexer.lineno = end[1]
+                            if lexer.lexstate != lexstate:
+                                lexer.begin(lexstate)
+                            lexer.lexstatestack = list(lexstack)
+                            lookahead = None
+
+                            symstack.append(sym)
+                            state = gvalue[gbase[state] + gstatement]
+                            statestack.append(state)
+                            ends.append(end[0])
+                            checkpoints.append((end,statestack[:],symstack[:]))
+                            statements[sym.lexpos] = (first,firstlex,oldstate,sym,end)
+                            self.reused += 1
+                            if errorcount: errorcount -=1
+                            continue
+
+                    # shift a symbol on the stack
+                    statestack.append(t)
+                    state = t
+
+                    symstack.append(lookahead)
+                    lookahead = None
+
+                    # Decrease error count on successful shift
+                    if errorcount: errorcount -=1
+                    continue
+
+                if t < 0:
+                    # reduce a symbol on the stack, emit a production
+                    p = prod[-t]
+                    pname = p.name
+                    plen  = p.len
+
+                    # Get production function
+                    sym = YaccSymbol()
+                    sym.type = pname       # Production name
+                    sym.value = None
+
+                    if plen:
+                        targ = symstack[-plen-1:]
+                        targ[0] = sym
+
+                        # (error symbols may have no position)
+                        t1 = targ[1]
+                        sym.lineno = getattr(t1,"lineno",0)
+                        sym.lexpos = getattr(t1,"lexpos",0)
+                        t1 = targ[-1]
+                        sym.endlineno = getattr(t1,"endlineno",getattr(t1,"lineno",0))
+                        sym.endlexpos = getattr(t1,"endlexpos",getattr(t1,"lexpos",0))
+
+                        del symstack[-plen:]
+                        del statestack[-plen:]
+                    else:
+                        sym.lineno = lexer.lineno
+                        sym.lexpos = lexer.lexpos
+                        targ = [ sym ]
+
+                    pslice.slice = targ
+
+                    try:
+                        # Call the grammar rule with our special slice object
+                        p.callable(pslice)
+                        symstack.append(sym)
+                        state = gvalue[gbase[statestack[-1]] + gcolumn[-t]]
+                        statestack.append(state)
+                    except SyntaxError:
+                        # If an error was set. Enter error recovery state
+                        lookaheadstack.append(lookahead)
+                        symstack.pop()
+                        statestack.pop()
+                        state = statestack[-1]
+                        sym.type = 'error'
+                        lookahead = sym
+                        errorcount = error_count
+                        self.errorok = 0
+                        continue
+
+                    # Keep a checkpoint after each statement, and the
+                    # statement, for the next parse
+                    if pname == statement and plen:
+                        end = after.get(sym.endlexpos)
+                        if end is not None:
+                            end = end[:4]
+                            ends.append(end[0])
+                            checkpoints.append((end,statestack[:],symstack[:]))
+                            first = after.get(sym.lexpos)
+                            if first is not None:
+                                statements[sym.lexpos] = (first[4],first[2:4],statestack[-2],sym,end)
+                    continue
+
+                if t == 0:
+                    n = symstack[-1]
+                    if errorat is not None:
+                        # Keep nothing from the first error on
+                        lastend = errorat and ends[errorat-1] or -1
+                        del ends[errorat:]
+                        del checkpoints[errorat:]
+                        for start, record in list(statements.items()):
+                            if record[4][0] > lastend:
+                                del statements[start]
+                    self.text = input
+                    self.ends = ends
+                    self.checkpoints = checkpoints
+                    self.statements = statements
+                    return getattr(n,"value",None)
+
+            if t == None:
+                if errorat is None:
+                    errorat = len(ends)
+
+                # We have some kind of parsing error here.  To handle
+                # this, we are going to push the current token onto
+                # the tokenstack and replace it with an 'error' token.
+                # If there are any synchronization rules, they may
+                # catch it.
+                #
+                # In addition to pushing the error token, we call call
+                # the user defined p_error() function if this is the
+                # first syntax error.  This function is only called if
+                # errorcount == 0.
+                if errorcount == 0 or self.errorok:
+                    errorcount = error_count
+                    self.errorok = 0
+                    errtoken = lookahead
+                    if errtoken.type == '$end':
+                        errtoken = None               # End of file!
+                    if self.errorfunc:
+                        # Set some special functions available in error recovery
+                        _recovery.functions = (self.errok,get_token,self.restart)
                         if errtoken and not hasattr(errtoken,'lexer'):
                             errtoken.lexer = lexer
-                        tok = self.errorfunc(errtoken)
-                        del errok, token, restart   # Delete special functions
+                        try:
+                            tok = self.errorfunc(errtoken)
+                        finally:
+                            del _recovery.functions     # Delete special functions
 
                         if self.errorok:
                             # User must have done some kind of panic
@@ -1064,6 +1912,7 @@ class LRParser:
                                 sys.stderr.write("yacc: Syntax error, token=%s" % errtoken.type)
                         else:
                             sys.stderr.write("yacc: Parse error in input. EOF\n")
+                            self.forget()
                             return
 
                 else:
@@ -1087,6 +1936,7 @@ class LRParser:
                 # Start nuking entries on the stack
                 if lookahead.type == '$end':
                     # Whoa. We're really hosed here. Bail out
+                    self.forget()
                     return
 
                 if lookahead.type != 'error':
@@ -1113,6 +1963,28 @@ class LRParser:
             # Call an error function here
             raise RuntimeError("yacc: internal parser error!!!\n")
 
+# The length of the longest common prefix (or suffix) of two strings, found by
+# comparing slices rather than characters
+def _common_prefix(a,b):
+    lo, hi = 0, min(len(a),len(b))
+    while lo < hi:
+        mid = (lo + hi + 1)//2
+        if a[:mid] == b[:mid]:
+            lo = mid
+        else:
+            hi = mid - 1
+    return lo
+
+def _common_suffix(a,b):
+    lo, hi = 0, min(len(a),len(b))
+    while lo < hi:
+        mid = (lo + hi + 1)//2
+        if a[len(a)-mid:] == b[len(b)-mid:]:
+            lo = mid
+        else:
+            hi = mid - 1
+    return lo
+
 # -----------------------------------------------------------------------------
 #                          === Grammar Representation ===
 #
@@ -1811,12 +2683,147 @@ class Grammar(object):
 
 class VersionError(YaccError): pass
 
+# -----------------------------------------------------------------------------
+# CombTable
+#
+# An action or goto table compressed by row displacement (a "comb"): the
+# symbols are numbered, and the rows of all states are overlaid in one list
+# of values, each row shifted by its own base so that no two rows claim the
+# same slot.  The value for (state,symbol) is value[base[state]+column] if
+# check of that slot is state; otherwise the table has no entry for it.
+# Bases are at least 1, so that a symbol the table does not know (column -1)
+# lands in a slot no state owns.  Entries that are None (errors forced by
+# nonassoc precedence) are left out, which the parser treats the same way.
+# -----------------------------------------------------------------------------
+
+class CombTable(object):
+    def __init__(self,symbols,base,check,value):
+        self.symbols = list(symbols)           # column -> symbol
+        self.index = { }                       # symbol -> column
+        for i,sym in enumerate(self.symbols):
+            self.index[sym] = i
+        self.base = list(base)
+        self.check = list(check)
+        self.value = list(value)
+
+    # Compress a table given as {state: {symbol: value}}
+    def from_rows(cls,rows,symbols=None):
+        if symbols is None:
+            # The most common symbols get the first columns: rows then tend to
+            # start at the same column and leave fewer gaps between them
+            counts = { }
+            for row in rows.values():
+                for sym in row:
+                    counts[sym] = counts.get(sym,0) + 1
+            symbols = sorted(counts,key=lambda sym: (-counts[sym],sym))
+        index = { }
+        for i,sym in enumerate(symbols):
+            index[sym] = i
+        nstates = rows and max(rows) + 1 or 0
+        base = [1] * nstates
+        check = [-1]
+        value = [0]
+
+        # Place the fullest rows first, each at the lowest base that fits
+        columns = [ ]
+        for state,row in rows.items():
+            cols = [(index[sym],v) for sym,v in row.items() if v is not None]
+            if cols:
+                cols.sort()
+                columns.append((-len(cols),state,cols))
+        columns.sort()
+        lowest = 1                             # No free slot before this one
+        for n,state,cols in columns:
+            first = cols[0][0]
+            b = max(1,lowest - first)
+            while 1:
+                for c,v in cols:
+                    if b + c < len(check) and check[b+c] != -1: break
+                else:
+                    break
+                b += 1
+            top = b + cols[-1][0] + 1
+            if top > len(check):
+                check.extend([-1] * (top - len(check)))
+                value.extend([0] * (top - len(value)))
+            for c,v in cols:
+                check[b+c] = state
+                value[b+c] = v
+            base[state] = b
+            while lowest < len(check) and check[lowest] != -1:
+                lowest += 1
+
+        # Every base plus every column must be a slot
+        top = max(base or [0]) + len(symbols)
+        if top > len(check):
+            check.extend([-1] * (top - len(check)))
+            value.extend([0] * (top - len(value)))
+        return cls(symbols,base,check,value)
+    from_rows = classmethod(from_rows)
+
+    def get(self,state,symbol,default=None):
+        i = self.base[state] + self.index.get(symbol,-1)
+        if self.check[i] == state:
+            return self.value[i]
+        return default
+
+    # The table as {state: {symbol: value}}
+    def rows(self):
+        rows = { }
+        for state in range(len(self.base)):
+            rows[state] = { }
+        for i,state in enumerate(self.check):
+            if state >= 0:
+                rows[state][self.symbols[i - self.base[state]]] = self.value[i]
+        return rows
+
+    # The table as a tuple of the symbols and packed little-endian integer
+    # arrays, for the binary table cache
+    def pack(self):
+        packed = [tuple(self.symbols)]
+        for values in (self.base,self.check,self.value):
+            values = array('i',values)
+            if sys.byteorder != 'little':
+                values.byteswap()
+            packed.append(values.tostring())
+        return tuple(packed)
+
+    def unpack(cls,packed):
+        symbols = packed[0]
+        lists = [ ]
+        for data in packed[1:]:
+            values = array('i')
+            values.fromstring(data)
+            if sys.byteorder != 'little':
+                values.byteswap()
+            lists.append(values.tolist())
+        return cls(symbols,*lists)
+    unpack = classmethod(unpack)
+
 class LRTable(object):
     def __init__(self):
         self.lr_action = None
         self.lr_goto = None
         self.lr_productions = None
         self.lr_method = None
+        self.lr_comb = None           # The (action,goto) CombTables (see compact())
+
+    # The action and goto tables as CombTables, compressed once from lr_action
+    # and lr_goto unless they were read that way
+    def compact(self):
+        if self.lr_comb is None:
+            self.lr_comb = (CombTable.from_rows(self.lr_action),
+                            CombTable.from_rows(self.lr_goto))
+        return self.lr_comb
+
+    # The action and goto tables as dictionaries, rebuilt from the CombTables
+    # if they were read that way (without the entries compact() leaves out)
+    def expand(self):
+        if self.lr_action is None:
+            action, goto = self.lr_comb
+            self.lr_action = action.rows()
+            self.lr_goto = goto.rows()
+        return self.lr_action, self.lr_goto
 
     def read_table(self,module):
         if isinstance(module,types.ModuleType):
@@ -1829,11 +2836,17 @@ class LRTable(object):
                 exec("import %s as parsetab" % module, env, env)
                 parsetab = env['parsetab']
 
-        if parsetab._tabversion != __tabversion__:
+        comb = hasattr(parsetab,'_lr_action_comb')
+        if parsetab._tabversion != (comb and __combtabversion__ or __tabversion__):
             raise VersionError("yacc table file version is out of date")
 
-        self.lr_action = parsetab._lr_action
-        self.lr_goto = parsetab._lr_goto
+        if comb:
+            self.lr_comb = (CombTable(*parsetab._lr_action_comb),
+                            CombTable(*parsetab._lr_goto_comb))
+            self.lr_action = self.lr_goto = None
+        else:
+            self.lr_action = parsetab._lr_action
+            self.lr_goto = parsetab._lr_goto
 
         self.lr_productions = []
         for p in parsetab._lr_productions:
@@ -1866,11 +2879,326 @@ class LRTable(object):
         in_f.close()
         return signature
 
+    # -----------------------------------------------------------------------------
+    # read_binary_table()
+    #
+    # Reads the tables from a binary table cache written by write_binary_table().
+    # The file is mapped into memory and its header (the table version, the
+    # Python version it was written by, the method and the signature) is checked
+    # before anything else is decoded, so a stale cache costs only a page read.
+    # If signature is given and the cache was written for another one, the
+    # tables are not decoded and the cache's signature is returned.  Decoded
+    # tables are kept for the life of the process and shared by every parser
+    # that loads the same (unchanged) file: the parsers never modify them.
+    # -----------------------------------------------------------------------------
+
+    def read_binary_table(self,filename,signature=None):
+        st = os.stat(filename)
+        key = (os.path.abspath(filename), st.st_ino, st.st_mtime, st.st_size)
+        _binary_tables_lock.acquire()
+        try:
+            tables = _binary_tables.get(key)
+        finally:
+            _binary_tables_lock.release()
+
+        if tables is None:
+            in_f = open(filename,"rb")
+            try:
+                data = None
+                if mmap is not None and st.st_size:
+                    try:
+                        data = mmap.mmap(in_f.fileno(),0,access=mmap.ACCESS_READ)
+                    except (EnvironmentError,ValueError):
+                        pass
+                if data is None:
+                    data = in_f.read()
+                try:
+                    header, body = _read_tab_header(data)
+                    tabversion, pyversion, method, read_signature = header
+                    if tabversion != __tabversion__ or pyversion != tuple(sys.version_info[:2]):
+                        raise VersionError("yacc table cache version is out of date")
+                    if signature is not None and read_signature != signature:
+                        return read_signature
+                    action, goto, productions = marshal.loads(data[body:])
+                    comb = (CombTable.unpack(action),CombTable.unpack(goto))
+                finally:
+                    if mmap is not None and isinstance(data,mmap.mmap):
+                        data.close()
+            finally:
+                in_f.close()
+            tables = (method, read_signature, comb, productions)
+            _binary_tables_lock.acquire()
+            try:
+                _binary_tables[key] = tables
+            finally:
+                _binary_tables_lock.release()
+
+        self.lr_method, read_signature, self.lr_comb, productions = tables
+        self.lr_action = self.lr_goto = None
+        if signature is not None and read_signature != signature:
+            return read_signature
+        self.lr_productions = []
+        for p in productions:
+            self.lr_productions.append(MiniProduction(*p))
+        return read_signature
+
+    # -----------------------------------------------------------------------------
+    # write_binary_table()
+    #
+    # Writes the tables to a binary table cache: the magic string, the cache
+    # format version and the length of the header, then the header and the
+    # tables, marshalled.  The action and goto tables are stored compressed
+    # (see CombTable), as packed arrays, so reading them back is a few calls
+    # into C.  The cache is
+    # written to a temporary file next to filename and renamed over it, so
+    # that a parser that loads it concurrently sees either the old tables or
+    # the new ones, never part of a file.
+    # -----------------------------------------------------------------------------
+
+    def write_binary_table(self,filename,signature=""):
+        header = marshal.dumps((__tabversion__,tuple(sys.version_info[:2]),
+                                self.lr_method,signature),2)
+        action, goto = self.compact()
+        body = marshal.dumps((action.pack(),goto.pack(),
+                              _production_tuples(self.lr_productions)),2)
+        outputdir = os.path.dirname(os.path.abspath(filename))
+        tmpname = os.path.join(outputdir,".%s.%d.%d.tmp" % (os.path.basename(filename),
+                                                           os.getpid(),_thread_id()))
+        try:
+            outf = open(tmpname,"wb")
+            try:
+                outf.write(_tab_magic)
+                outf.write(_tab_header.pack(_tab_cache_version,len(header)))
+                outf.write(header)
+                outf.write(body)
+            finally:
+                outf.close()
+            try:
+                os.rename(tmpname,filename)
+            except OSError:
+                # Windows does not rename over an existing file
+                if not os.path.exists(filename):
+                    raise
+                os.remove(filename)
+                os.rename(tmpname,filename)
+        except EnvironmentError:
+            e = sys.exc_info()[1]
+            sys.stderr.write("Unable to create '%s'\n" % filename)
+            sys.stderr.write(str(e)+"\n")
+            try:
+                os.remove(tmpname)
+            except OSError:
+                pass
+
+    # -----------------------------------------------------------------------------
+    # write()
+    #
+    # This function writes the LR parsing tables to a file
+    # -----------------------------------------------------------------------------
+
+    def write_table(self,modulename,outputdir='',signature=""):
+        self.expand()
+        basemodulename = modulename.split(".")[-1]
+        filename = os.path.join(outputdir,basemodulename) + ".py"
+        try:
+            f = open(filename,"w")
+
+            # Change comb to 0 to write the action and goto tables as dictionaries
+            # (as versions of PLY without CombTable read them).  Compressed, they
+            # are tuples of constants, which Python loads from the compiled module
+            # as they are instead of building them when the module is imported.
+            # They are written with their own table version.
+            comb = 1
+
+            f.write("""
+# %s
+# This file is automatically generated. Do not edit.
+_tabversion = %r
+
+_lr_method = %r
+
+_lr_signature = %r
+    """ % (filename, comb and __combtabversion__ or __tabversion__, self.lr_method, signature))
+
+            if comb:
+                for name,table in zip(("action","goto"),self.compact()):
+                    f.write("\n_lr_%s_comb = (%r,\n" % (name,tuple(table.symbols)))
+                    for values in (table.base,table.check,table.value):
+                        f.write("  (%s,),\n" % ",".join(map(str,values)))
+                    f.write(")\n")
+                f.write("\n")
+            else:
+                # Change smaller to 0 to go back to original tables
+                smaller = 1
+
+                # Factor out names to try and make smaller
+                if smaller:
+                    items = { }
+
+                    for s,nd in self.lr_action.items():
+                       for name,v in nd.items():
+                          i = items.get(name)
+                          if not i:
+                             i = ([],[])
+                             items[name] = i
+                          i[0].append(s)
+                          i[1].append(v)
+
+                    f.write("\n_lr_action_items = {")
+                    for k,v in items.items():
+                        f.write("%r:([" % k)
+                        for i in v[0]:
+                            f.write("%r," % i)
+                        f.write("],[")
+                        for i in v[1]:
+                            f.write("%r," % i)
+
+                        f.write("]),")
+                    f.write("}\n")
+
+                    f.write("""
+_lr_action = { }
+for _k, _v in _lr_action_items.items():
+   for _x,_y in zip(_v[0],_v[1]):
+      if not _x in _lr_action:  _lr_action[_x] = { }
+      _lr_action[_x][_k] = _y
+del _lr_action_items
+""")
+
+                else:
+                    f.write("\n_lr_action = { ");
+                    for k,v in self.lr_action.items():
+                        f.write("(%r,%r):%r," % (k[0],k[1],v))
+                    f.write("}\n");
+
+                if smaller:
+                    # Factor out names to try and make smaller
+                    items = { }
+
+                    for s,nd in self.lr_goto.items():
+                       for name,v in nd.items():
+                          i = items.get(name)
+                          if not i:
+                             i = ([],[])
+                             items[name] = i
+                          i[0].append(s)
+                          i[1].append(v)
+
+                    f.write("\n_lr_goto_items = {")
+                    for k,v in items.items():
+                        f.write("%r:([" % k)
+                        for i in v[0]:
+                            f.write("%r," % i)
+                        f.write("],[")
+                        for i in v[1]:
+                            f.write("%r," % i)
+
+                        f.write("]),")
+                    f.write("}\n")
+
+                    f.write("""
+_lr_goto = { }
+for _k, _v in _lr_goto_items.items():
+   for _x,_y in zip(_v[0],_v[1]):
+       if not _x in _lr_goto: _lr_goto[_x] = { }
+       _lr_goto[_x][_k] = _y
+del _lr_goto_items
+""")
+                else:
+                    f.write("\n_lr_goto = { ");
+                    for k,v in self.lr_goto.items():
+                        f.write("(%r,%r):%r," % (k[0],k[1],v))
+                    f.write("}\n");
+
+            # Write production table
+            f.write("_lr_productions = [\n")
+            for p in self.lr_productions:
+                if p.func:
+                    f.write("  (%r,%r,%d,%r,%r,%d),\n" % (p.str,p.name, p.len, p.func,p.file,p.line))
+                else:
+                    f.write("  (%r,%r,%d,None,None,None),\n" % (str(p),p.name, p.len))
+            f.write("]\n")
+            f.close()
+
+        except IOError:
+            e = sys.exc_info()[1]
+            sys.stderr.write("Unable to create '%s'\n" % filename)
+            sys.stderr.write(str(e)+"\n")
+            return
+
+
+    # -----------------------------------------------------------------------------
+    # pickle_table()
+    #
+    # This function pickles the LR parsing tables to a supplied file object
+    # -----------------------------------------------------------------------------
+
+    def pickle_table(self,filename,signature=""):
+        try:
+            import cPickle as pickle
+        except ImportError:
+            import pickle
+        self.expand()
+        outf = open(filename,"wb")
+        pickle.dump(__tabversion__,outf,pickle_protocol)
+        pickle.dump(self.lr_method,outf,pickle_protocol)
+        pickle.dump(signature,outf,pickle_protocol)
+        pickle.dump(self.lr_action,outf,pickle_protocol)
+        pickle.dump(self.lr_goto,outf,pickle_protocol)
+        pickle.dump(_production_tuples(self.lr_productions),outf,pickle_protocol)
+        outf.close()
+
     # Bind all production function names to callable objects in pdict
     def bind_callables(self,pdict):
         for p in self.lr_productions:
             p.bind(pdict)
     
+# -----------------------------------------------------------------------------
+#                        === Binary table caches ===
+#
+# A binary table cache starts with _tab_magic and _tab_header: the version of
+# the cache format and the length of the marshalled header that follows it.
+# -----------------------------------------------------------------------------
+
+_tab_magic = "PLYLRTAB".encode('latin-1')
+_tab_header = struct.Struct("<II")
+_tab_cache_version = 2
+
+# Decoded table caches: (path, inode, mtime, size) -> tables
+_binary_tables = { }
+_binary_tables_lock = threading.Lock()
+
+# The file in directory of the binary table cache of the grammar with the given
+# signature.  Grammars have caches of their own, so that parsers built in the
+# same process do not overwrite each other's tables.
+def tab_cache_file(directory,signature):
+    return os.path.join(directory,"%s.lrtab" % binascii.hexlify(signature).decode('ascii'))
+
+def _read_tab_header(data):
+    start = len(_tab_magic)
+    if data[:start] != _tab_magic:
+        raise VersionError("not a yacc table cache")
+    version, length = _tab_header.unpack(data[start:start+_tab_header.size])
+    if version != _tab_cache_version:
+        raise VersionError("yacc table cache format is out of date")
+    start += _tab_header.size
+    return marshal.loads(data[start:start+length]), start+length
+
+def _production_tuples(productions):
+    outp = []
+    for p in productions:
+        if p.func:
+            outp.append((p.str,p.name, p.len, p.func,p.file,p.line))
+        else:
+            outp.append((str(p),p.name,p.len,None,None,None))
+    return outp
+
+def _thread_id():
+    try:
+        return threading.current_thread().ident or 0
+    except AttributeError:
+        return 0
+
 # -----------------------------------------------------------------------------
 #                           === LR Generator ===
 #
@@ -1927,6 +3255,43 @@ def traverse(x,N,stack,F,X,R,FP):
            F[stack[-1]] = F[x]
            element = stack.pop()
 
+# -----------------------------------------------------------------------------
+# _digraph_bits()
+#
+# The same algorithm as digraph(), for relations between numbered elements
+# 0..n-1 whose sets are bitsets, held in the list sets.  R[x] lists the
+# elements x is related to, in the order digraph() would visit them, and
+# FP[x] is the index in sets of F'(x).  Returns F, where F[x] is the index in
+# sets of F(x).  As in digraph(), the elements of a strongly connected
+# component end up sharing one set, and a set shared before the call is
+# shared by every element that starts with it; the results are the same as
+# digraph()'s even where that sharing matters.
+# -----------------------------------------------------------------------------
+
+def _digraph_bits(R,FP,sets):
+    N = [0] * len(FP)
+    F = list(FP)
+    stack = []
+    def traverse(x):
+        stack.append(x)
+        d = len(stack)
+        N[x] = d
+        for y in R[x]:
+            if N[y] == 0:
+                traverse(y)
+            if N[y] < N[x]:
+                N[x] = N[y]
+            sets[F[x]] |= sets[F[y]]
+        if N[x] == d:
+            while 1:
+                element = stack.pop()
+                N[element] = MAXINT
+                F[element] = F[x]
+                if element == x: break
+    for x in range(len(FP)):
+        if N[x] == 0: traverse(x)
+    return F
+
 class LALRError(YaccError): pass
 
 # -----------------------------------------------------------------------------
@@ -1937,12 +3302,13 @@ class LALRError(YaccError): pass
 # -----------------------------------------------------------------------------
 
 class LRGeneratedTable(LRTable):
-    def __init__(self,grammar,method='LALR',log=None):
+    def __init__(self,grammar,method='LALR',log=None,fast=1):
         if method not in ['SLR','LALR']:
             raise LALRError("Unsupported method %s" % method)
 
         self.grammar = grammar
         self.lr_method = method
+        self.fast = fast               # Use the indexed construction (see lr0_items_fast())
 
         # Set up the logger
         if not log:
@@ -1953,8 +3319,11 @@ class LRGeneratedTable(LRTable):
         self.lr_action     = {}        # Action table
         self.lr_goto       = {}        # Goto table
         self.lr_productions  = grammar.Productions    # Copy of grammar Production array
+        self.lr_comb       = None      # Compressed tables (see compact())
         self.lr_goto_cache = {}        # Cache of computed gotos
         self.lr0_cidhash   = {}        # Cache of closures
+        self.lr0_transitions = None    # state -> {symbol: state} (indexed construction only)
+        self.lr0_numbered  = None      # item number -> LRItem (indexed construction only)
 
         self._add_count    = 0         # Internal counter used to detect cycles
 
@@ -2062,6 +3431,101 @@ class LRGeneratedTable(LRTable):
 
         return C
 
+    # -----------------------------------------------------------------------------
+    # lr0_items_fast()
+    #
+    # Computes the same LR(0) sets of items as lr0_items(), in the same order, but
+    # works on integer item numbers instead of LRItem objects: every item of the
+    # grammar is numbered once, and the symbol after its dot, the item that
+    # follows it and the productions it adds to a closure are looked up in lists.
+    # The kernel of each set (the items a goto moves to) is interned as a tuple,
+    # so finding whether a goto leads to a new state is a single dictionary
+    # lookup.  The gotos are kept in self.lr0_transitions and the items in
+    # self.lr0_numbered, and the sets are returned as lists of item numbers.
+    # -----------------------------------------------------------------------------
+
+    def lr0_items_fast(self):
+        Productions = self.grammar.Productions
+
+        # Number the items and productions
+        items = []                    # item -> LRItem
+        first = []                    # production -> its first item
+        for p in Productions:
+            first.append(len(items))
+            items.extend(p.lr_items)
+        item_number = { }
+        for i,p in enumerate(items):
+            item_number[id(p)] = i
+        nextsym = [ ]                 # item -> symbol after the dot (or None)
+        nextitem = [ ]                # item -> item with the dot moved past it
+        after = [ ]                   # item -> productions its closure adds
+        for p in items:
+            if p.lr_index < p.len - 1:
+                nextsym.append(p.prod[p.lr_index+1])
+                nextitem.append(item_number[id(p.lr_next)])
+            else:
+                nextsym.append(None)
+                nextitem.append(None)
+            after.append([x.number for x in p.lr_after])
+        prodnum = [p.number for p in items]
+        usyms = [p.usyms for p in Productions]
+
+        added = [0] * len(Productions)
+        count = [0]
+        def closure(kernel):
+            count[0] += 1
+            n = count[0]
+            J = list(kernel)
+            for j in J:
+                for x in after[j]:
+                    if added[x] != n:
+                        added[x] = n
+                        J.append(first[x])
+            return J
+
+        states = [ closure([first[0]]) ]
+        kernels = { }
+        transitions = [ ]
+        i = 0
+        while i < len(states):
+            I = states[i]
+            i += 1
+
+            # Collect the symbols in the same order as lr0_items() does, so
+            # that the states are numbered the same
+            asyms = { }
+            seen = { }
+            gotos = { }
+            for ii in I:
+                number = prodnum[ii]
+                if number not in seen:
+                    seen[number] = 1
+                    for x in usyms[number]:
+                        asyms[x] = None
+                x = nextsym[ii]
+                if x is not None:
+                    kernel = gotos.get(x)
+                    if kernel is None:
+                        gotos[x] = [nextitem[ii]]
+                    else:
+                        kernel.append(nextitem[ii])
+
+            trans = { }
+            for x in asyms:
+                kernel = gotos.get(x)
+                if not kernel: continue
+                kernel = tuple(kernel)
+                j = kernels.get(kernel)
+                if j is None:
+                    j = kernels[kernel] = len(states)
+                    states.append(closure(kernel))
+                trans[x] = j
+            transitions.append(trans)
+
+        self.lr0_transitions = transitions
+        self.lr0_numbered = items
+        return states
+
     # -----------------------------------------------------------------------------
     #                       ==== LALR(1) Parsing ====
     #
@@ -2354,6 +3818,125 @@ class LRGeneratedTable(LRTable):
         # Add all of the lookaheads
         self.add_lookaheads(lookd,followsets)
 
+    # -----------------------------------------------------------------------------
+    # add_lalr_lookaheads_fast()
+    #
+    # Computes the same lookaheads as add_lalr_lookaheads(), for the states of
+    # lr0_items_fast() (lists of item numbers).  Nonterminal transitions are
+    # numbered, the relations between them are lists of transition numbers, and
+    # the read, follow and lookahead sets are bitsets of terminals (Python
+    # integers), so that taking the union of two sets is a single operation.
+    # -----------------------------------------------------------------------------
+
+    def add_lalr_lookaheads_fast(self,states):
+        Terminals = self.grammar.Terminals
+        Nonterminals = self.grammar.Nonterminals
+        transitions = self.lr0_transitions
+        items = self.lr0_numbered
+        nullable = self.compute_nullable_nonterminals()
+        nextsym = [p.lr_index < p.len - 1 and p.prod[p.lr_index+1] or None for p in items]
+
+        # Number the terminals, and find the terminals each state can shift
+        terminals = sorted(Terminals)
+        if '$end' not in Terminals:
+            terminals.append('$end')
+        bit = { }
+        for i,a in enumerate(terminals):
+            bit[a] = 1 << i
+        shifts = [ ]
+        for trans in transitions:
+            bits = 0
+            for x in trans:
+                if x in Terminals:
+                    bits |= bit[x]
+            shifts.append(bits)
+
+        # Number the nonterminal transitions, in the order of
+        # find_nonterminal_transitions()
+        ntrans = [ ]                 # transition -> (state,N)
+        tnumber = { }                # (state,N) -> transition
+        nonterminals = [ ]           # state -> nonterminals after its dots
+        for state,I in enumerate(states):
+            names = [ ]
+            for ii in I:
+                x = nextsym[ii]
+                if x in Nonterminals and (state,x) not in tnumber:
+                    tnumber[(state,x)] = len(ntrans)
+                    ntrans.append((state,x))
+                    names.append(x)
+            nonterminals.append(names)
+
+        # Direct reads and the READS relation
+        start = self.grammar.Productions[0].prod[0]
+        sets = [ ]
+        readrel = [ ]
+        for state,N in ntrans:
+            g = transitions[state][N]
+            bits = shifts[g]
+            if state == 0 and N == start:
+                bits |= bit['$end']
+            sets.append(bits)
+            readrel.append([tnumber[(g,x)] for x in nonterminals[g] if x in nullable])
+        readsets = _digraph_bits(readrel,range(len(ntrans)),sets)
+
+        # The LOOKBACK and INCLUDES relations, found as compute_lookback_includes()
+        # finds them
+        bynames = { }                # state -> {name: its items}
+        def byname(state):
+            names = bynames.get(state)
+            if names is None:
+                names = bynames[state] = { }
+                for r in states[state]:
+                    names.setdefault(items[r].name,[]).append(r)
+            return names
+
+        lookback = [ ]
+        includes = [[] for t in ntrans]
+        for t,(state,N) in enumerate(ntrans):
+            lookb = [ ]
+            for ii in byname(state).get(N,()):
+                p = items[ii]
+                prod = p.prod
+                plen = p.len
+                lr_index = p.lr_index
+                j = state
+                while lr_index < plen - 1:
+                    lr_index = lr_index + 1
+                    x = prod[lr_index]
+                    i = tnumber.get((j,x))
+                    if i is not None:
+                        li = lr_index + 1
+                        while li < plen:
+                            if prod[li] in Terminals: break
+                            if not prod[li] in nullable: break
+                            li = li + 1
+                        else:
+                            includes[i].append(t)
+                    j = transitions[j][x]
+
+                for r in byname(j).get(N,()):
+                    item = items[r]
+                    if item.len != plen: continue
+                    if item.prod[:item.lr_index] == prod[1:item.lr_index+1]:
+                        lookb.append((j,r))
+            lookback.append(lookb)
+
+        # LALR follow sets (these extend the read sets in place, as
+        # compute_follow_sets() does)
+        followsets = _digraph_bits(includes,readsets,sets)
+
+        # Attach the lookaheads to the items
+        lookaheads = { }
+        for t,lookb in enumerate(lookback):
+            for key in lookb:
+                lookaheads[key] = lookaheads.get(key,0) | sets[followsets[t]]
+        names = { }                  # bitset -> its terminals
+        for (state,r),bits in lookaheads.items():
+            laheads = names.get(bits)
+            if laheads is None:
+                laheads = names[bits] = [a for a in terminals if bits & bit[a]]
+            items[r].lookaheads.setdefault(state,[]).extend(laheads)
+
     # -----------------------------------------------------------------------------
     # lr_parse_table()
     #
@@ -2373,10 +3956,20 @@ class LRGeneratedTable(LRTable):
         # Step 1: Construct C = { I0, I1, ... IN}, collection of LR(0) items
         # This determines the number of states
 
-        C = self.lr0_items()
+        if self.fast:
+            states = self.lr0_items_fast()
+            if self.lr_method == 'LALR':
+                self.add_lalr_lookaheads_fast(states)
+            items = self.lr0_numbered
+            C = [[items[i] for i in I] for I in states]
+        else:
+            C = self.lr0_items()
+            if self.lr_method == 'LALR':
+                self.add_lalr_lookaheads(C)
+        transitions = self.lr0_transitions
 
-        if self.lr_method == 'LALR':
-            self.add_lalr_lookaheads(C)
+        # Describing the actions is skipped when nothing is logged
+        logging = not isinstance(log,NullLogger)
 
         # Build the parser table, state by state
         st = 0
@@ -2386,12 +3979,13 @@ class LRGeneratedTable(LRTable):
             st_action  = { }
             st_actionp = { }
             st_goto    = { }
-            log.info("")
-            log.info("state %d", st)
-            log.info("")
-            for p in I:
-                log.info("    (%d) %s", p.number, str(p))
-            log.info("")
+            if logging:
+                log.info("")
+                log.info("state %d", st)
+                log.info("")
+                for p in I:
+                    log.info("    (%d) %s", p.number, str(p))
+                log.info("")
 
             for p in I:
                     if p.len == p.lr_index + 1:
@@ -2406,7 +4000,8 @@ class LRGeneratedTable(LRTable):
                             else:
                                 laheads = self.grammar.Follow[p.name]
                             for a in laheads:
-                                actlist.append((a,p,"reduce using rule %d (%s)" % (p.number,p)))
+                                if logging:
+                                    actlist.append((a,p,"reduce using rule %d (%s)" % (p.number,p)))
                                 r = st_action.get(a,None)
                                 if r is not None:
                                     # Whoa. Have a shift/reduce or reduce/reduce conflict
@@ -2456,11 +4051,15 @@ class LRGeneratedTable(LRTable):
                         i = p.lr_index
                         a = p.prod[i+1]       # Get symbol right after the "."
                         if a in self.grammar.Terminals:
-                            g = self.lr0_goto(I,a)
-                            j = self.lr0_cidhash.get(id(g),-1)
+                            if transitions is not None:
+                                j = transitions[st].get(a,-1)
+                            else:
+                                g = self.lr0_goto(I,a)
+                                j = self.lr0_cidhash.get(id(g),-1)
                             if j >= 0:
                                 # We are in a shift state
-                                actlist.append((a,p,"shift and go to state %d" % j))
+                                if logging:
+                                    actlist.append((a,p,"shift and go to state %d" % j))
                                 r = st_action.get(a,None)
                                 if r is not None:
                                     # Whoa have a shift/reduce or shift/shift conflict
@@ -2518,17 +4117,23 @@ class LRGeneratedTable(LRTable):
 
             # Construct the goto table for this state
 
-            nkeys = { }
-            for ii in I:
-                for s in ii.usyms:
-                    if s in self.grammar.Nonterminals:
-                        nkeys[s] = None
-            for n in nkeys:
-                g = self.lr0_goto(I,n)
-                j = self.lr0_cidhash.get(id(g),-1)
-                if j >= 0:
-                    st_goto[n] = j
-                    log.info("    %-30s shift and go to state %d",n,j)
+            if transitions is not None:
+                for n,j in transitions[st].items():
+                    if n in self.grammar.Nonterminals:
+                        st_goto[n] = j
+                        log.info("    %-30s shift and go to state %d",n,j)
+            else:
+                nkeys = { }
+                for ii in I:
+                    for s in ii.usyms:
+                        if s in self.grammar.Nonterminals:
+                            nkeys[s] = None
+                for n in nkeys:
+                    g = self.lr0_goto(I,n)
+                    j = self.lr0_cidhash.get(id(g),-1)
+                    if j >= 0:
+                        st_goto[n] = j
+                        log.info("    %-30s shift and go to state %d",n,j)
 
             action[st] = st_action
             actionp[st] = st_actionp
@@ -2536,154 +4141,6 @@ class LRGeneratedTable(LRTable):
             st += 1
 
 
-    # -----------------------------------------------------------------------------
-    # write()
-    #
-    # This function writes the LR parsing tables to a file
-    # -----------------------------------------------------------------------------
-
-    def write_table(self,modulename,outputdir='',signature=""):
-        basemodulename = modulename.split(".")[-1]
-        filename = os.path.join(outputdir,basemodulename) + ".py"
-        try:
-            f = open(filename,"w")
-
-            f.write("""
-# %s
-# This file is automatically generated. Do not edit.
-_tabversion = %r
-
-_lr_method = %r
-
-_lr_signature = %r
-    """ % (filename, __tabversion__, self.lr_method, signature))
-
-            # Change smaller to 0 to go back to original tables
-            smaller = 1
-
-            # Factor out names to try and make smaller
-            if smaller:
-                items = { }
-
-                for s,nd in self.lr_action.items():
-                   for name,v in nd.items():
-                      i = items.get(name)
-                      if not i:
-                         i = ([],[])
-                         items[name] = i
-                      i[0].append(s)
-                      i[1].append(v)
-
-                f.write("\n_lr_action_items = {")
-                for k,v in items.items():
-                    f.write("%r:([" % k)
-                    for i in v[0]:
-                        f.write("%r," % i)
-                    f.write("],[")
-                    for i in v[1]:
-                        f.write("%r," % i)
-
-                    f.write("]),")
-                f.write("}\n")
-
-                f.write("""
-_lr_action = { }
-for _k, _v in _lr_action_items.items():
-   for _x,_y in zip(_v[0],_v[1]):
-      if not _x in _lr_action:  _lr_action[_x] = { }
-      _lr_action[_x][_k] = _y
-del _lr_action_items
-""")
-
-            else:
-                f.write("\n_lr_action = { ");
-                for k,v in self.lr_action.items():
-                    f.write("(%r,%r):%r," % (k[0],k[1],v))
-                f.write("}\n");
-
-            if smaller:
-                # Factor out names to try and make smaller
-                items = { }
-
-                for s,nd in self.lr_goto.items():
-                   for name,v in nd.items():
-                      i = items.get(name)
-                      if not i:
-                         i = ([],[])
-                         items[name] = i
-                      i[0].append(s)
-                      i[1].append(v)
-
-                f.write("\n_lr_goto_items = {")
-                for k,v in items.items():
-                    f.write("%r:([" % k)
-                    for i in v[0]:
-                        f.write("%r," % i)
-                    f.write("],[")
-                    for i in v[1]:
-                        f.write("%r," % i)
-
-                    f.write("]),")
-                f.write("}\n")
-
-                f.write("""
-_lr_goto = { }
-for _k, _v in _lr_goto_items.items():
-   for _x,_y in zip(_v[0],_v[1]):
-       if not _x in _lr_goto: _lr_goto[_x] = { }
-       _lr_goto[_x][_k] = _y
-del _lr_goto_items
-""")
-            else:
-                f.write("\n_lr_goto = { ");
-                for k,v in self.lr_goto.items():
-                    f.write("(%r,%r):%r," % (k[0],k[1],v))
-                f.write("}\n");
-
-            # Write production table
-            f.write("_lr_productions = [\n")
-            for p in self.lr_productions:
-                if p.func:
-                    f.write("  (%r,%r,%d,%r,%r,%d),\n" % (p.str,p.name, p.len, p.func,p.file,p.line))
-                else:
-                    f.write("  (%r,%r,%d,None,None,None),\n" % (str(p),p.name, p.len))
-            f.write("]\n")
-            f.close()
-
-        except IOError:
-            e = sys.exc_info()[1]
-            sys.stderr.write("Unable to create '%s'\n" % filename)
-            sys.stderr.write(str(e)+"\n")
-            return
-
-
-    # -----------------------------------------------------------------------------
-    # pickle_table()
-    #
-    # This function pickles the LR parsing tables to a supplied file object
-    # -----------------------------------------------------------------------------
-
-    def pickle_table(self,filename,signature=""):
-        try:
-            import cPickle as pickle
-        except ImportError:
-            import pickle
-        outf = open(filename,"wb")
-        pickle.dump(__tabversion__,outf,pickle_protocol)
-        pickle.dump(self.lr_method,outf,pickle_protocol)
-        pickle.dump(signature,outf,pickle_protocol)
-        pickle.dump(self.lr_action,outf,pickle_protocol)
-        pickle.dump(self.lr_goto,outf,pickle_protocol)
-
-        outp = []
-        for p in self.lr_productions:
-            if p.func:
-                outp.append((p.str,p.name, p.len, p.func,p.file,p.line))
-            else:
-                outp.append((str(p),p.name,p.len,None,None,None))
-        pickle.dump(outp,outf,pickle_protocol)
-        outf.close()
-
 # -----------------------------------------------------------------------------
 #                            === INTROSPECTION ===
 #
@@ -3035,12 +4492,14 @@ class ParserReflect(object):
 
 def yacc(method='LALR', debug=yaccdebug, module=None, tabmodule=tab_module, start=None, 
          check_recursion=1, optimize=0, write_tables=1, debugfile=debug_file,outputdir='',
-         debuglog=None, errorlog = None, picklefile=None):
+         debuglog=None, errorlog = None, picklefile=None, tabcache=None):
 
     global parse                 # Reference to the parsing method of the last built parser
 
-    # If pickling is enabled, table files are not created
+    # If pickling is enabled, table files are not created (the binary table
+    # cache still is, unless write_tables was 0)
 
+    write_cache = write_tables
     if picklefile:
         write_tables = 0
 
@@ -3064,7 +4523,23 @@ def yacc(method='LALR', debug=yaccdebug, module=None, tabmodule=tab_module, star
     # Check signature against table files (if any)
     signature = pinfo.signature()
 
-    # Read the tables
+    if tabcache is None and tab_cache_dir:
+        tabcache = tab_cache_file(tab_cache_dir,signature)
+
+    # Read the tables, from the binary table cache first.  A cache that is
+    # missing, stale or unreadable is regenerated below.
+    if tabcache:
+        try:
+            lr = LRTable()
+            read_signature = lr.read_binary_table(tabcache,None if optimize else signature)
+            if optimize or (read_signature == signature):
+                lr.bind_callables(pinfo.pdict)
+                parser = LRParser(lr,pinfo.error_func)
+                parse = parser.parse
+                return parser
+        except Exception:
+            pass
+
     try:
         lr = LRTable()
         if picklefile:
@@ -3072,6 +4547,8 @@ def yacc(method='LALR', debug=yaccdebug, module=None, tabmodule=tab_module, star
         else:
             read_signature = lr.read_table(tabmodule)
         if optimize or (read_signature == signature):
+            if tabcache and write_cache and read_signature == signature:
+                lr.write_binary_table(tabcache,signature)
             try:
                 lr.bind_callables(pinfo.pdict)
                 parser = LRParser(lr,pinfo.error_func)
@@ -3268,6 +4745,10 @@ def yacc(method='LALR', debug=yaccdebug, module=None, tabmodule=tab_module, star
     if picklefile:
         lr.pickle_table(picklefile,signature)
 
+    # Write the binary table cache
+    if tabcache and write_cache:
+        lr.write_binary_table(tabcache,signature)
+
     # Build the parser
     lr.bind_callables(pinfo.pdict)
     parser = LRParser(lr,pinfo.error_func)
@@ -0,0 +1,229 @@
+"""Where the time of a query went: the time each operator spent in its own
+code, the chain of operators and fragments that decided when the query
+finished, the workers that finished late and the time spent waiting for
+tuples from other workers.
+
+A FragmentAnalysis is built in a single pass over the operator intervals of
+a fragment's log, as they are paired (see IntervalPairing): an interval
+closes after the calls nested in it, so the time of each call minus the
+time of the calls made from it (its self time) is known as soon as it
+closes. The analyses of the fragments are then joined with the query plan,
+which says which fragments consume the output of which.
+"""
+from profiling.intervals import IntervalPairing
+
+# Operators of these types (by suffix) wait for tuples from other workers
+CONSUMER_SUFFIX = 'Consumer'
+# How many stragglers are listed for a query
+MAX_STRAGGLERS = 10
+
+
+class OperatorStats(object):
+    """The calls of one operator, on every worker of a fragment."""
+
+    def __init__(self):
+        self.calls = 0
+        self.total_time = 0
+        self.self_time = 0
+        self.num_tuples = 0
+        self.children = {}  # op -> time in calls made from this operator
+
+    def to_json(self):
+        return {'calls': self.calls, 'totalTime': self.total_time,
+                'selfTime': self.self_time, 'numTuples': self.num_tuples}
+
+
+class WorkerStats(object):
+    """What one worker did in a fragment."""
+
+    def __init__(self, start):
+        self.start = start
+        self.end = start
+        self.busy_time = 0  # in calls of the root operator
+        self.self_times = {}  # op -> self time
+
+
+class FragmentAnalysis(object):
+    """The operators and workers of one fragment, from its EventLog."""
+
+    def __init__(self, log=None):
+        self.ops = {}
+        self.workers = {}
+        self.roots = {}  # op at depth 0 -> time in its calls
+        self._pairing = IntervalPairing()
+        self._child_time = {}  # (worker, depth) -> time in calls at depth
+        if log is not None:
+            self.add(log)
+            self.finish()
+
+    def add(self, log):
+        """Add the events of an EventLog (see IntervalPairing.feed)."""
+        for interval in self._pairing.feed(log):
+            self._add_interval(*interval)
+
+    def finish(self):
+        """End the calls that never returned."""
+        for interval in self._pairing.close():
+            self._add_interval(*interval)
+
+    def _add_interval(self, worker, depth, op, start, end, num_tuples):
+        total = end - start
+        # The calls made from this one have all closed before it
+        self_time = total - self._child_time.pop((worker, depth + 1), 0)
+
+        stats = self.ops.get(op)
+        if stats is None:
+            stats = self.ops[op] = OperatorStats()
+        stats.calls += 1
+        stats.total_time += total
+        stats.self_time += self_time
+        if num_tuples > 0:
+            stats.num_tuples += num_tuples
+
+        if depth:
+            key = (worker, depth)
+            self._child_time[key] = self._child_time.get(key, 0) + total
+            # The calling operator is still open on the worker's stack
+            parent = self._pairing.stacks[worker][depth - 1][0]
+            children = self.ops.setdefault(parent, OperatorStats()).children
+            children[op] = children.get(op, 0) + total
+        else:
+            self.roots[op] = self.roots.get(op, 0) + total
+
+        stats = self.workers.get(worker)
+        if stats is None:
+            stats = self.workers[worker] = WorkerStats(start)
+        stats.start = min(stats.start, start)
+        stats.end = max(stats.end, end)
+        if not depth:
+            stats.busy_time += total
+        stats.self_times[op] = stats.self_times.get(op, 0) + self_time
+
+    @property
+    def time_range(self):
+        if not self.workers:
+            return None
+        return (min(w.start for w in self.workers.values()),
+                max(w.end for w in self.workers.values()))
+
+    def critical_path(self):
+        """The chain of operators, from the root down, that took the most
+        time: at each step the operator whose calls took longest."""
+        path = []
+        calls = self.roots
+        while calls:
+            op = max(sorted(calls), key=calls.get)
+            if op in path:
+                break
+            path.append(op)
+            calls = self.ops[op].children
+        return path
+
+    def stragglers(self):
+        """The workers, latest to finish first, with how long after the
+        median worker they finished (their lag)."""
+        if not self.workers:
+            return []
+        ends = sorted(w.end for w in self.workers.values())
+        median = ends[len(ends) // 2]
+        return sorted(((worker, stats.end - median)
+                       for worker, stats in self.workers.items()),
+                      key=lambda worker_lag: (-worker_lag[1], worker_lag[0]))
+
+
+class PlanIndex(object):
+    """The operators of a subquery's plan (as returned by get_query_plan):
+    their types, and which fragments consume the output of which."""
+
+    def __init__(self, fragments):
+        self.types = {}  # (fragment, opId or opName) -> opType
+        self.producers = {}  # opId -> fragment
+        self.consumed = {}  # fragment -> opIds of the producers it reads
+        for fragment in fragments or []:
+            index = fragment['fragmentIndex']
+            for op in fragment.get('operators', []):
+                for key in ('opId', 'opName'):
+                    if op.get(key) is not None:
+                        self.types[(index, str(op[key]))] = op.get('opType')
+                self.producers[str(op.get('opId'))] = index
+                if 'argOperatorId' in op:
+                    self.consumed.setdefault(index, []).append(
+                        str(op['argOperatorId']))
+
+    def op_type(self, fragment, op):
+        return self.types.get((fragment, op))
+
+    def waits(self, fragment, op):
+        """Whether the operator waits for tuples from other workers."""
+        return (self.op_type(fragment, op) or '').endswith(CONSUMER_SUFFIX)
+
+    def upstream(self, fragment):
+        """The fragments whose output the fragment consumes."""
+        return sorted(set(self.producers[op]
+                          for op in self.consumed.get(fragment, [])
+                          if op in self.producers))
+
+
+def fragment_report(fragment_id, analysis, plan):
+    """The analysis of one fragment, as a dict for JSON."""
+    time_range = analysis.time_range or (0, 0)
+    operators = []
+    for op, stats in sorted(analysis.ops.items(),
+                            key=lambda item: -item[1].self_time):
+        operator = stats.to_json()
+        operator.update(opId=op, opType=plan.op_type(fragment_id, op),
+                        waits=plan.waits(fragment_id, op))
+        operators.append(operator)
+    workers = []
+    for worker, lag in analysis.stragglers():
+        stats = analysis.workers[worker]
+        workers.append({
+            'workerId': worker, 'start': stats.start, 'end': stats.end,
+            'lag': lag, 'busyTime': stats.busy_time,
+            'shuffleWait': sum(t for op, t in stats.self_times.items()
+                               if plan.waits(fragment_id, op))})
+    return {'fragmentId': fragment_id,
+            'start': time_range[0], 'end': time_range[1],
+            'duration': time_range[1] - time_range[0],
+            'operators': operators,
+            'workers': workers,
+            'criticalPath': analysis.critical_path(),
+            'shuffleWait': sum(w['shuffleWait'] for w in workers),
+            'upstream': plan.upstream(fragment_id)}
+
+
+def query_report(analyses, plan_fragments=None,
+                 max_stragglers=MAX_STRAGGLERS):
+    """The analysis of a subquery from the analyses of its fragments (a
+    dict from fragment id to FragmentAnalysis) and its plan, as a dict for
+    JSON. The critical path of fragments is found from the fragment that
+    finished last, going up to the fragment it consumes that finished last,
+    and so on; it is listed from the first fragment down."""
+    plan = PlanIndex(plan_fragments)
+    fragments = dict((fragment_id, fragment_report(fragment_id, analysis,
+                                                   plan))
+                     for fragment_id, analysis in analyses.items())
+
+    path = []
+    current = max(sorted(fragments), key=lambda f: fragments[f]['end']) \
+        if fragments else None
+    while current is not None and current not in path:
+        path.append(current)
+        upstream = [f for f in fragments[current]['upstream']
+                    if f in fragments]
+        current = max(upstream, key=lambda f: fragments[f]['end']) \
+            if upstream else None
+
+    stragglers = sorted(
+        (dict(worker, fragmentId=fragment_id)
+         for fragment_id, report in fragments.items()
+         for worker in report['workers'] if worker['lag'] > 0),
+        key=lambda w: -w['lag'])[:max_stragglers]
+    return {'fragments': [fragments[f] for f in sorted(fragments)],
+            'criticalPath': [{'fragmentId': f,
+                              'start': fragments[f]['start'],
+                              'end': fragments[f]['end'],
+                              'operators': fragments[f]['criticalPath']}
+                             for f in reversed(path)],
+            'stragglers': stragglers,
+            'shuffleWait': sum(f['shuffleWait'] for f in fragments.values())}
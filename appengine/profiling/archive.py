@@ -0,0 +1,77 @@
+import mmap
+import os
+import tempfile
+
+# Memcache values must be smaller than 1MB, so larger blobs are split
+MEMCACHE_CHUNK_SIZE = 1000 * 1000
+ARCHIVE_PREFIX = 'profiling/v1/'
+
+
+def archive_key(kind, query_id, subquery_id, fragment_id):
+    return '{}_{}_{}_{}'.format(kind, query_id, subquery_id, fragment_id)
+
+
+class MemcacheArchive(object):
+    """Keeps packed logs in App Engine's memcache, shared by every instance
+    of the application. Blobs are split into chunks small enough for
+    memcache; a blob missing any chunk is missing."""
+
+    def __init__(self, client=None, prefix=ARCHIVE_PREFIX,
+                 chunk_size=MEMCACHE_CHUNK_SIZE):
+        if client is None:
+            from google.appengine.api import memcache
+            client = memcache.Client()
+        self.client = client
+        self.prefix = prefix
+        self.chunk_size = chunk_size
+
+    def get(self, key):
+        key = self.prefix + key
+        chunks = self.client.get(key)
+        if chunks is None:
+            return None
+        names = ['{}/{}'.format(key, i) for i in xrange(chunks)]
+        found = self.client.get_multi(names)
+        if len(found) != chunks:
+            return None
+        return ''.join(found[name] for name in names)
+
+    def put(self, key, data):
+        key = self.prefix + key
+        chunks = dict(('{}/{}'.format(key, i), data[start:start +
+                                                    self.chunk_size])
+                      for i, start in enumerate(xrange(
+                          0, len(data), self.chunk_size)))
+        # Store the chunks before the count that makes them visible
+        if not self.client.set_multi(chunks):
+            self.client.set(key, len(chunks))
+
+
+class DirectoryArchive(object):
+    """Keeps packed logs as files in a directory. Files are written
+    atomically and read through mmap, so columns are decompressed straight
+    from the page cache without reading the file into memory first."""
+
+    def __init__(self, path):
+        self.path = path
+        if not os.path.isdir(path):
+            os.makedirs(path)
+
+    def get(self, key):
+        try:
+            with open(os.path.join(self.path, key), 'rb') as f:
+                if not os.fstat(f.fileno()).st_size:
+                    return None
+                return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (IOError, OSError):
+            return None
+
+    def put(self, key, data):
+        fd, temp = tempfile.mkstemp(dir=self.path, prefix='.' + key)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.rename(temp, os.path.join(self.path, key))
+        except:
+            os.remove(temp)
+            raise
@@ -0,0 +1,261 @@
+"""A compact binary format for tables of typed columns.
+
+A packed table is::
+
+    MAGIC, header length (uint32, little-endian), header (JSON), columns
+
+The header names the table's kind and number of rows and, for each column,
+its typecode, item size, encoding and where its bytes are. Columns are
+little-endian arrays, compressed separately with zlib so that one column
+can be read without decompressing the others. Sorted or slowly changing
+integer columns (like times) are stored as differences between consecutive
+values, which compress far better than the values themselves. String
+columns are dictionary-encoded: the column holds codes into a list of
+strings kept in the header.
+
+Tables sent to browsers are laid out as frames instead::
+
+    FRAME_MAGIC, header length (uint32, little-endian), header (JSON),
+    padding, columns
+
+Frame columns are not compressed, and each starts at a multiple of 8 bytes
+from the start of the frame, so that the browser can view it in place as a
+typed array (the header names the type of each column and where it is)
+without parsing anything. Runs of similar numbers still compress well if
+the response is gzipped, and a client can fetch the header and then only
+the columns it needs with range requests.
+"""
+from array import array
+from collections import OrderedDict
+import json
+import struct
+import sys
+import zlib
+
+MAGIC = 'MYRIACOL'
+FORMAT_VERSION = 1
+# Column encodings
+RAW = 'raw'
+DELTA = 'delta'
+COMPRESSION_LEVEL = 6
+
+_LENGTH = struct.Struct('<I')
+
+FRAME_MAGIC = 'MYRIAFRM'
+FRAME_ALIGNMENT = 8
+# The JavaScript typed array each array typecode is viewed as
+JS_TYPES = {'b': 'Int8', 'B': 'Uint8', 'h': 'Int16', 'H': 'Uint16',
+            'i': 'Int32', 'I': 'Uint32', 'f': 'Float32', 'd': 'Float64'}
+_INT32 = (-(1 << 31), (1 << 31) - 1)
+
+
+class FormatError(ValueError):
+    pass
+
+
+def delta_encode(values):
+    """The differences between consecutive values (the first value is kept
+    as it is)."""
+    deltas = array(values.typecode, values)
+    for i in xrange(len(deltas) - 1, 0, -1):
+        deltas[i] -= deltas[i - 1]
+    return deltas
+
+
+def delta_decode(deltas):
+    values = array(deltas.typecode, deltas)
+    for i in xrange(1, len(values)):
+        values[i] += values[i - 1]
+    return values
+
+
+def _to_bytes(values):
+    if sys.byteorder != 'little':
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tostring()
+
+
+def _from_bytes(typecode, data):
+    values = array(typecode)
+    values.fromstring(data)
+    if sys.byteorder != 'little':
+        values.byteswap()
+    return values
+
+
+def pack(kind, columns, dictionaries=None, encodings=None,
+         level=COMPRESSION_LEVEL):
+    """Pack a table into a string. columns is a list of (name, array),
+    dictionaries maps the names of dictionary-encoded columns to their
+    strings, and encodings maps column names to DELTA or RAW (the
+    default)."""
+    dictionaries = dictionaries or {}
+    encodings = encodings or {}
+    rows = len(columns[0][1]) if columns else 0
+    header = {'version': FORMAT_VERSION, 'kind': kind, 'rows': rows,
+              'columns': []}
+    chunks = []
+    offset = 0
+    for name, values in columns:
+        if len(values) != rows:
+            raise ValueError("column {} has {} rows, not {}".format(
+                name, len(values), rows))
+        encoding = encodings.get(name, RAW)
+        if encoding == DELTA:
+            values = delta_encode(values)
+        data = zlib.compress(_to_bytes(values), level)
+        column = {'name': name, 'typecode': values.typecode,
+                  'itemsize': values.itemsize, 'encoding': encoding,
+                  'offset': offset, 'length': len(data)}
+        if name in dictionaries:
+            column['dictionary'] = list(dictionaries[name])
+        header['columns'].append(column)
+        chunks.append(data)
+        offset += len(data)
+    header = json.dumps(header, separators=(',', ':'))
+    return ''.join([MAGIC, _LENGTH.pack(len(header)), header] + chunks)
+
+
+class PackedTable(object):
+    """A table read from a packed string (or any buffer, like an mmap).
+    Columns are decompressed on first use, straight from the buffer."""
+
+    def __init__(self, data):
+        if data[:len(MAGIC)] != MAGIC:
+            raise FormatError("not a packed table")
+        start = len(MAGIC) + _LENGTH.size
+        length, = _LENGTH.unpack(data[len(MAGIC):start])
+        header = json.loads(data[start:start + length])
+        if header['version'] != FORMAT_VERSION:
+            raise FormatError("unsupported version {}".format(
+                header['version']))
+        self.data = data
+        self.kind = header['kind']
+        self.rows = header['rows']
+        self.columns = OrderedDict((c['name'], c) for c in header['columns'])
+        self._base = start + length
+        self._decoded = {}
+
+    def column(self, name):
+        """The values of a column, as an array."""
+        values = self._decoded.get(name)
+        if values is None:
+            column = self.columns[name]
+            if array(column['typecode']).itemsize != column['itemsize']:
+                raise FormatError("column {} has {}-byte items".format(
+                    name, column['itemsize']))
+            start = self._base + column['offset']
+            data = zlib.decompress(
+                buffer(self.data, start, column['length']))
+            values = _from_bytes(column['typecode'], data)
+            if column['encoding'] == DELTA:
+                values = delta_decode(values)
+            self._decoded[name] = values
+        return values
+
+    def dictionary(self, name):
+        return self.columns[name].get('dictionary')
+
+
+def unpack(data):
+    return PackedTable(data)
+
+
+def _for_js(values):
+    """The values in an array JavaScript has a typed array for: integers
+    that do not fit in 32 bits become doubles, which hold integers (like
+    nanosecond times) exactly up to 2**53."""
+    if values.typecode in JS_TYPES:
+        return values
+    if values and (min(values) < _INT32[0] or max(values) > _INT32[1]):
+        return array('d', values)
+    return array('i', values)
+
+
+def frame(kind, columns, dictionaries=None):
+    """Lay out a table as a frame (see above). columns is a list of (name,
+    array) and dictionaries maps the names of dictionary-encoded columns to
+    their strings."""
+    dictionaries = dictionaries or {}
+    rows = len(columns[0][1]) if columns else 0
+    columns = [(name, _for_js(values)) for name, values in columns]
+    header = {'version': FORMAT_VERSION, 'kind': kind, 'rows': rows,
+              'columns': []}
+    for name, values in columns:
+        column = {'name': name, 'type': JS_TYPES[values.typecode],
+                  'length': len(values)}
+        if name in dictionaries:
+            column['dictionary'] = list(dictionaries[name])
+        header['columns'].append(column)
+
+    # The offsets are written in the header, whose length depends on them:
+    # leave room for the longest offsets the columns could need
+    base = len(FRAME_MAGIC) + _LENGTH.size
+    size = sum(len(values) * values.itemsize + FRAME_ALIGNMENT
+               for _, values in columns)
+    for column in header['columns']:
+        column['offset'] = base + size
+    start = _aligned(base + len(json.dumps(header, separators=(',', ':'))))
+
+    chunks = []
+    offset = start
+    for column, (_, values) in zip(header['columns'], columns):
+        column['offset'] = offset
+        data = _to_bytes(values)
+        padding = _aligned(len(data)) - len(data)
+        chunks.append(data + '\0' * padding)
+        offset += len(data) + padding
+    header = json.dumps(header, separators=(',', ':'))
+    padding = '\0' * (start - base - len(header))
+    return ''.join([FRAME_MAGIC, _LENGTH.pack(len(header)), header,
+                    padding] + chunks)
+
+
+def _aligned(offset):
+    return -(-offset // FRAME_ALIGNMENT) * FRAME_ALIGNMENT
+
+
+def rows_frame(kind, names, rows):
+    """A frame of rows of numbers and strings, as written to CSV: numeric
+    columns become arrays and string columns are dictionary-encoded."""
+    rows = list(rows)
+    columns = []
+    dictionaries = {}
+    for i, name in enumerate(names):
+        values = [row[i] for row in rows]
+        if any(isinstance(v, basestring) for v in values):
+            codes = {}
+            dictionaries[name] = []
+            for value in values:
+                if value not in codes:
+                    codes[value] = len(codes)
+                    dictionaries[name].append(value)
+            columns.append((name, array('i', (codes[v] for v in values))))
+        elif any(isinstance(v, float) for v in values):
+            columns.append((name, array('d', values)))
+        else:
+            columns.append((name, array('l', values)))
+    return frame(kind, columns, dictionaries)
+
+
+def read_frame(data):
+    """The kind and columns of a frame, as (kind, {name: list}), with
+    dictionary-encoded columns decoded (for tests and tools; browsers view
+    the columns in place)."""
+    if data[:len(FRAME_MAGIC)] != FRAME_MAGIC:
+        raise FormatError("not a frame")
+    base = len(FRAME_MAGIC) + _LENGTH.size
+    length, = _LENGTH.unpack(data[len(FRAME_MAGIC):base])
+    header = json.loads(data[base:base + length])
+    typecodes = dict((name, code) for code, name in JS_TYPES.items())
+    columns = OrderedDict()
+    for column in header['columns']:
+        typecode = typecodes[column['type']]
+        start = column['offset']
+        end = start + column['length'] * array(typecode).itemsize
+        values = list(_from_bytes(typecode, data[start:end]))
+        if 'dictionary' in column:
+            values = [column['dictionary'][v] for v in values]
+        columns[column['name']] = values
+    return header['kind'], columns
@@ -0,0 +1,270 @@
+"""An index of the intervals during which each operator ran on each worker.
+
+Pairing the call and return events of a worker gives properly nested
+intervals, so the intervals at one nesting depth of one worker (a lane)
+never overlap, and sorting them by start also sorts them by end. Each lane
+keeps its intervals in sorted arrays, and a tree of the longest interval
+under each node of a binary tree over them. The intervals overlapping
+[start, end] are then found with two binary searches, and those at least
+minLength long by descending only into the nodes that hold one, in time
+logarithmic in the size of the lane plus the size of the answer.
+
+Intervals too short to see at the requested minLength can instead be merged
+into blocks: a node of the tree whose intervals all fit within minLength is
+returned as one interval, without looking at them one by one.
+"""
+from array import array
+from bisect import bisect_left, bisect_right
+
+from profiling.logs import CALL, RETURN, TIME_TYPECODE
+
+
+class IntervalPairing(object):
+    """Pairs the call and return events of each worker, given in one or
+    more batches, into intervals. A return closes every call made since
+    the call it matches, and a call of an operator that is still running on
+    the worker first ends the earlier call. Each batch must only hold
+    events that come after those of the previous batches on the same
+    worker."""
+
+    def __init__(self):
+        # worker id -> (op name, start) of the calls open on it
+        self.stacks = {}
+        self.last_times = {}
+
+    def feed(self, log):
+        """The intervals closed by the events of an EventLog, as (worker
+        id, depth, op name, start, end, num tuples) tuples, where depth is
+        0 for a fragment's root operator."""
+        worker = None
+        stack = None
+        for i in log.by_worker():
+            if log.worker_ids[i] != worker:
+                worker = log.worker_ids[i]
+                stack = self.stacks.setdefault(worker, [])
+            time = log.times[i]
+            self.last_times[worker] = time
+            event_type = log.event_types[i]
+            if event_type not in (CALL, RETURN):
+                continue
+            op = log.op_names[log.op_codes[i]]
+
+            open_ops = [o for o, _ in stack]
+            if op in open_ops:
+                # Close everything down to (and including) the open call
+                target = len(open_ops) - 1 - open_ops[::-1].index(op)
+                while len(stack) > target:
+                    depth = len(stack) - 1
+                    open_op, start = stack.pop()
+                    num_tuples = -1
+                    if event_type == RETURN and depth == target:
+                        num_tuples = log.num_tuples[i]
+                    yield worker, depth, open_op, start, time, num_tuples
+            if event_type == CALL:
+                stack.append((op, time))
+
+    def close(self):
+        """End the calls that never returned at the last event of their
+        worker, as intervals like those of feed."""
+        for worker, stack in sorted(self.stacks.items()):
+            for depth in xrange(len(stack) - 1, -1, -1):
+                op, start = stack[depth]
+                yield (worker, depth, op, start, self.last_times[worker],
+                       -1)
+        self.stacks = {}
+
+
+def operator_intervals(log):
+    """Pair the call and return events of each worker in an EventLog. Yields
+    (worker id, depth, op name, start, end, num tuples) tuples, where depth
+    is 0 for a fragment's root operator (see IntervalPairing). Calls that
+    never return end at the worker's last event."""
+    pairing = IntervalPairing()
+    for interval in pairing.feed(log):
+        yield interval
+    for interval in pairing.close():
+        yield interval
+
+
+class Lane(object):
+    """The intervals at one depth of one worker, in order."""
+
+    def __init__(self, worker_id, depth):
+        self.worker_id = worker_id
+        self.depth = depth
+        self.starts = array(TIME_TYPECODE)
+        self.ends = array(TIME_TYPECODE)
+        self.op_codes = array('l')
+        self.num_tuples = array('l')
+        self.longest = None
+
+    def __len__(self):
+        return len(self.starts)
+
+    def append(self, code, start, end, num_tuples):
+        self.starts.append(start)
+        self.ends.append(end)
+        self.op_codes.append(code)
+        self.num_tuples.append(num_tuples)
+
+    def build(self):
+        """Sort the intervals and build the tree of longest intervals."""
+        order = sorted(xrange(len(self.starts)), key=self.starts.__getitem__)
+        for name in ('starts', 'ends', 'op_codes', 'num_tuples'):
+            column = getattr(self, name)
+            setattr(self, name, array(column.typecode,
+                                      (column[i] for i in order)))
+        size = 1
+        while size < len(self.starts):
+            size *= 2
+        self.size = size
+        self.longest = array(TIME_TYPECODE, [-1]) * (2 * size)
+        for i in xrange(len(self.starts)):
+            self.longest[size + i] = self.ends[i] - self.starts[i]
+        for node in xrange(size - 1, 0, -1):
+            self.longest[node] = max(self.longest[2 * node],
+                                     self.longest[2 * node + 1])
+
+    def add(self, code, start, end, num_tuples):
+        """Add an interval to a built lane, in place, if it starts after
+        the others and the tree has room for it. Readers only see it once
+        it is complete. Returns whether it was added."""
+        n = len(self.starts)
+        if n >= self.size or (n and start < self.starts[-1]):
+            return False
+        self.op_codes.append(code)
+        self.num_tuples.append(num_tuples)
+        self.ends.append(end)
+        node = self.size + n
+        self.longest[node] = end - start
+        while node > 1:
+            node //= 2
+            self.longest[node] = max(self.longest[2 * node],
+                                     self.longest[2 * node + 1])
+        self.starts.append(start)
+        return True
+
+    def overlapping(self, start, end):
+        """The index range [lo, hi) of the intervals overlapping
+        [start, end]."""
+        return (bisect_left(self.ends, start),
+                bisect_right(self.starts, end))
+
+    def query(self, start, end, min_length=0, merge=False):
+        """The intervals overlapping [start, end] that are at least
+        min_length long, as (first, last) index ranges of the lane: single
+        intervals have first == last. With merge, runs of shorter intervals
+        are returned as ranges too, each spanning less than min_length."""
+        lo, hi = self.overlapping(start, end)
+        found = []
+        if lo < hi:
+            self._visit(1, 0, self.size, lo, hi, min_length, merge, found)
+        return found
+
+    def _visit(self, node, node_lo, node_hi, lo, hi, min_length, merge,
+               found):
+        first = max(lo, node_lo)
+        last = min(hi, node_hi, len(self.starts)) - 1
+        if first > last:
+            return
+        if node_hi - node_lo == 1:
+            if self.ends[first] - self.starts[first] >= min_length:
+                found.append((first, first))
+            elif merge:
+                self._merge(found, first, first, min_length)
+            return
+        if self.longest[node] < min_length:
+            if not merge:
+                return
+            if self.ends[last] - self.starts[first] < min_length:
+                self._merge(found, first, last, min_length)
+                return
+        middle = (node_lo + node_hi) // 2
+        self._visit(2 * node, node_lo, middle, lo, hi, min_length, merge,
+                    found)
+        self._visit(2 * node + 1, middle, node_hi, lo, hi, min_length,
+                    merge, found)
+
+    def _merge(self, found, first, last, min_length):
+        """Add a run of short intervals, joining it to the previous run if
+        nothing lies between them and the two still span less than
+        min_length."""
+        if found:
+            previous_first, previous_last = found[-1]
+            if (previous_last + 1 == first and
+                    self.ends[last] - self.starts[previous_first] <
+                    min_length):
+                found[-1] = (previous_first, last)
+                return
+        found.append((first, last))
+
+
+class IntervalIndex(object):
+    """The operator intervals of a fragment, by worker and depth. More
+    intervals can be added as a running query's events arrive (see
+    extend)."""
+
+    def __init__(self, log=None):
+        self.op_names = []
+        self._op_codes = {}
+        self.lanes = {}
+        if log is not None:
+            self.extend(operator_intervals(log))
+
+    def op_code(self, op_name):
+        code = self._op_codes.get(op_name)
+        if code is None:
+            code = self._op_codes[op_name] = len(self.op_names)
+            self.op_names.append(op_name)
+        return code
+
+    def extend(self, intervals):
+        """Add intervals, as yielded by IntervalPairing. Lanes are extended
+        in place where the new intervals come after the others and fit in
+        their trees, and otherwise rebuilt and swapped in, so that queries
+        running meanwhile see either the old or the new lane."""
+        added = {}
+        for worker, depth, op, start, end, num_tuples in intervals:
+            added.setdefault((worker, depth), []).append(
+                (self.op_code(op), start, end, num_tuples))
+        for (worker, depth), rows in added.items():
+            lane = self.lanes.get((worker, depth))
+            if lane is not None:
+                while rows and lane.add(*rows[0]):
+                    rows.pop(0)
+                if not rows:
+                    continue
+            new_lane = Lane(worker, depth)
+            if lane is not None:
+                for i in xrange(len(lane)):
+                    new_lane.append(lane.op_codes[i], lane.starts[i],
+                                    lane.ends[i], lane.num_tuples[i])
+            for row in rows:
+                new_lane.append(*row)
+            new_lane.build()
+            self.lanes[(worker, depth)] = new_lane
+
+    def __len__(self):
+        return sum(len(lane) for lane in self.lanes.values())
+
+    def query(self, start, end, min_length=0, only_root=False, merge=False):
+        """The operator intervals overlapping [start, end] that are at
+        least min_length long, as (workerId, opName, startTime, endTime,
+        numTuples, depth, count) tuples, where count is the number of
+        intervals (more than one for merged runs of short intervals, which
+        take the operator of their first interval and the total number of
+        tuples)."""
+        result = []
+        for (worker, depth), lane in sorted(self.lanes.items()):
+            if only_root and depth > 0:
+                continue
+            for first, last in lane.query(start, end, min_length, merge):
+                if first == last:
+                    num_tuples = lane.num_tuples[first]
+                else:
+                    num_tuples = sum(n for n in lane.num_tuples[first:last + 1]
+                                     if n > 0)
+                result.append((worker, self.op_names[lane.op_codes[first]],
+                               lane.starts[first], lane.ends[last],
+                               num_tuples, depth, last - first + 1))
+        return result
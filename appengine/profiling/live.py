@@ -0,0 +1,199 @@
+"""Profiles of running queries, updated as their events arrive.
+
+The profiling log of a running fragment grows while it is watched. A
+LiveProfile remembers, for each worker, the time of the last event it has
+seen (its high-water mark), so that each time the log is fetched again only
+the newer events are ingested: their intervals are added to the fragment's
+IntervalIndex and their changes in activity to its pyramids, in place.
+
+The log only grows while the query runs, so when its lines up to those
+already read are unchanged, only the lines after them are read at all.
+
+Workers log their events independently, so a worker may still log events
+earlier than the last one seen from another worker. Changes in activity are
+held back until every worker in a call has logged past them (the frontier)
+so that the pyramids usually grow at their end. Every ingestion is a new
+version of the profile, and clients that poll it are sent what changed
+since the version they have.
+"""
+from collections import deque
+import threading
+
+from profiling.intervals import IntervalIndex, IntervalPairing
+from profiling.logs import EventLog, read_events
+from profiling.pyramid import ActivityTracker, BASE_BUCKETS, FragmentActivity
+
+# How many versions of a live profile clients can catch up from
+LIVE_DELTAS = 32
+
+
+class LiveProfile(object):
+    """The profile of a fragment of a running query: its activity pyramids
+    (activity) and operator intervals (intervals), extended by ingest."""
+
+    def __init__(self, base_buckets=BASE_BUCKETS):
+        self.lock = threading.Lock()
+        # worker id -> (time of its last event, number of events then)
+        self.marks = {}
+        self.tracker = ActivityTracker()
+        self.pairing = IntervalPairing()
+        self.pending = {}  # op -> changes after the frontier
+        self.activity = FragmentActivity(EventLog(), base_buckets)
+        self.intervals = IntervalIndex()
+        self.version = 0
+        self.deltas = deque(maxlen=LIVE_DELTAS)
+        self.finished = False
+        # how many lines of the log in CSV form were read, and the last one
+        self.lines_read = 0
+        self.last_line = None
+
+    @property
+    def high_water_mark(self):
+        """The time of the last event seen from any worker."""
+        if not self.marks:
+            return None
+        return max(time for time, _ in self.marks.values())
+
+    def frontier(self):
+        """The time before which no more changes in activity are expected:
+        the earliest high-water mark of the workers in a call."""
+        active = self.tracker.active_workers()
+        if active:
+            return min(self.marks[worker][0] for worker in active)
+        return self.high_water_mark
+
+    def ingest(self, log, finished=False):
+        """Add the events of the fragment's whole log (an EventLog) that are
+        newer than the high-water marks. If the query has finished, calls
+        that never returned are ended and the profile is complete. Returns
+        the new version."""
+        with self.lock:
+            if self.finished:
+                return self.version
+            return self._ingest(self._new_events(log), finished)
+
+    def ingest_lines(self, lines, finished=False):
+        """Like ingest, for the fragment's whole log as a list of CSV lines.
+        If the lines read last time are still the first ones (as far as the
+        last of them tells), only the lines after them are read."""
+        with self.lock:
+            if self.finished:
+                return self.version
+            read = self.lines_read
+            if (read and len(lines) >= read and
+                    lines[read - 1] == self.last_line):
+                new = self._appended(read_events(lines[:1] + lines[read:]))
+            else:
+                new = self._new_events(read_events(lines))
+            if lines:
+                self.lines_read = len(lines)
+                self.last_line = lines[-1]
+            return self._ingest(new, finished)
+
+    def _ingest(self, new, finished):
+        """Add the new events (an EventLog), with the lock held."""
+        if not len(new) and not finished:
+            return self.version
+        intervals = list(self.pairing.feed(new))
+        changes = self.tracker.feed(new)
+        if finished:
+            intervals.extend(self.pairing.close())
+            for op, closing in self.tracker.close().items():
+                changes.setdefault(op, []).extend(closing)
+        for op, op_changes in changes.items():
+            self.pending.setdefault(op, []).extend(op_changes)
+        ready = self._release(None if finished else self.frontier())
+
+        self.intervals.extend(intervals)
+        self.activity.extend(ready)
+        time_range = new.time_range
+        if self.activity.time_range is not None and time_range:
+            time_range = (min(time_range[0],
+                              self.activity.time_range[0]),
+                          max(time_range[1],
+                              self.activity.time_range[1]))
+        self.activity.time_range = (time_range or
+                                    self.activity.time_range)
+        self.version += 1
+        self.deltas.append((self.version, intervals,
+                            sorted(ready.get(None, []))))
+        self.finished = finished
+        return self.version
+
+    def _new_events(self, log):
+        """The events of log after each worker's high-water mark, and move
+        the marks to the last events of log."""
+        new = EventLog()
+        worker = mark = last = None
+        seen = at_last = 0
+        for i in log.by_worker():
+            if log.worker_ids[i] != worker:
+                if worker is not None:
+                    self.marks[worker] = (last, at_last)
+                worker = log.worker_ids[i]
+                mark, seen = self.marks.get(worker, (None, 0))
+                last, at_last = None, 0
+            time = log.times[i]
+            if time == last:
+                at_last += 1
+            else:
+                last, at_last = time, 1
+            if mark is not None and (time < mark or
+                                     (time == mark and at_last <= seen)):
+                continue
+            new.append(worker, log.op_names[log.op_codes[i]], time,
+                       log.num_tuples[i], log.event_types[i])
+        if worker is not None:
+            self.marks[worker] = (last, at_last)
+        return new
+
+    def _appended(self, log):
+        """The events of log, which were appended to the log already seen,
+        that are not before their worker's high-water mark, and move the
+        marks past them (as _new_events would over the whole log)."""
+        new = EventLog()
+        for i in xrange(len(log)):
+            worker = log.worker_ids[i]
+            time = log.times[i]
+            mark, seen = self.marks.get(worker, (None, 0))
+            if mark is not None and time < mark:
+                continue
+            self.marks[worker] = (time, seen + 1 if time == mark else 1)
+            new.append(worker, log.op_names[log.op_codes[i]], time,
+                       log.num_tuples[i], log.event_types[i])
+        return new
+
+    def _release(self, frontier):
+        """Take the pending changes before frontier (or all of them, if it
+        is None)."""
+        ready = {}
+        for op, changes in self.pending.items():
+            if frontier is None:
+                ready[op] = changes
+                kept = []
+            else:
+                ready[op] = [c for c in changes if c[0] < frontier]
+                kept = [c for c in changes if c[0] >= frontier]
+            if kept:
+                self.pending[op] = kept
+            else:
+                del self.pending[op]
+        return ready
+
+    def delta(self, since):
+        """What changed after version since, as (version, intervals, changes
+        in the activity of the fragment as a whole), or None if the changes
+        since then are no longer kept."""
+        with self.lock:
+            if since == self.version:
+                return self.version, [], []
+            if (since > self.version or not self.deltas or
+                    since < self.deltas[0][0] - 1):
+                return None
+            intervals = []
+            changes = []
+            for version, new_intervals, new_changes in self.deltas:
+                if version > since:
+                    intervals.extend(new_intervals)
+                    changes.extend(new_changes)
+            return self.version, intervals, changes
@@ -0,0 +1,253 @@
+"""Reading the profiling logs Myria records for each query fragment.
+
+The profiling log of a fragment lists, for every worker, when each operator
+was called and when it returned::
+
+    workerId,opName,nanoTime,numTuples,eventType
+    5,SendResult,1749153,-1,call
+    5,Join,1797900,-1,call
+    5,Join,2097704,-1,return
+
+Logs are read into an EventLog, which holds each column in a typed array
+(operator names are dictionary-encoded), so that a fragment with millions
+of events takes a few bytes per event instead of a few hundred. The logs of
+a finished query never change, and are archived in the packed columnar
+format of profiling.columns.
+"""
+from array import array
+import csv
+import os
+
+import requests
+
+from profiling.columns import DELTA, pack, unpack
+
+# Event types, as stored in EventLog.event_types
+CALL = 0
+RETURN = 1
+EOS = 2
+EVENT_TYPES = {'call': CALL, 'return': RETURN, 'eos': EOS}
+EVENT_NAMES = dict((code, name) for name, code in EVENT_TYPES.items())
+
+# A typecode for nanosecond times: Python 2 arrays have no 'q', but 'l' is
+# 64 bits wide on the platforms we deploy to
+TIME_TYPECODE = 'l' if array('l').itemsize >= 8 else 'd'
+
+
+class EventLog(object):
+    """The events of one fragment's profiling log, one typed array per
+    column. Operators are stored as codes into op_names."""
+
+    def __init__(self):
+        self.worker_ids = array('l')
+        self.op_codes = array('l')
+        self.times = array(TIME_TYPECODE)
+        self.num_tuples = array('l')
+        self.event_types = array('b')
+        self.op_names = []
+        self._op_codes = {}
+
+    def __len__(self):
+        return len(self.times)
+
+    def op_code(self, op_name):
+        """The code of an operator, assigning it one if it is new."""
+        code = self._op_codes.get(op_name)
+        if code is None:
+            code = self._op_codes[op_name] = len(self.op_names)
+            self.op_names.append(op_name)
+        return code
+
+    def append(self, worker_id, op_name, time, num_tuples, event_type):
+        self.worker_ids.append(worker_id)
+        self.op_codes.append(self.op_code(op_name))
+        self.times.append(time)
+        self.num_tuples.append(num_tuples)
+        self.event_types.append(event_type)
+
+    def extend(self, other):
+        """Append the events of another log."""
+        codes = [self.op_code(name) for name in other.op_names]
+        self.worker_ids.extend(other.worker_ids)
+        self.op_codes.extend(array('l', (codes[c] for c in other.op_codes)))
+        self.times.extend(other.times)
+        self.num_tuples.extend(other.num_tuples)
+        self.event_types.extend(other.event_types)
+
+    def rows(self):
+        """The events as (workerId, opName, nanoTime, numTuples, eventType)
+        tuples, in the order they were read."""
+        for i in xrange(len(self.times)):
+            yield (self.worker_ids[i], self.op_names[self.op_codes[i]],
+                   self.times[i], self.num_tuples[i],
+                   EVENT_NAMES[self.event_types[i]])
+
+    def by_worker(self):
+        """The indexes of the events ordered by worker, then time. Events of
+        a worker that happen at the same time keep their order."""
+        return sorted(xrange(len(self.times)),
+                      key=lambda i: (self.worker_ids[i], self.times[i]))
+
+    @property
+    def time_range(self):
+        if not self.times:
+            return None
+        return min(self.times), max(self.times)
+
+    def pack(self):
+        """The log in the packed columnar format."""
+        return pack('profiling',
+                    [('workerId', self.worker_ids),
+                     ('opName', self.op_codes),
+                     ('nanoTime', self.times),
+                     ('numTuples', self.num_tuples),
+                     ('eventType', self.event_types)],
+                    dictionaries={'opName': self.op_names},
+                    encodings={'nanoTime': DELTA})
+
+    @classmethod
+    def unpack(cls, data):
+        table = unpack(data)
+        log = cls()
+        log.worker_ids = table.column('workerId')
+        log.op_codes = table.column('opName')
+        log.times = table.column('nanoTime')
+        log.num_tuples = table.column('numTuples')
+        log.event_types = table.column('eventType')
+        for name in table.dictionary('opName'):
+            log.op_code(name)
+        return log
+
+
+class SentLog(object):
+    """The tuples each worker of a fragment sent, and to which worker, as
+    typed arrays."""
+
+    def __init__(self):
+        self.worker_ids = array('l')
+        self.times = array(TIME_TYPECODE)
+        self.num_tuples = array('l')
+        self.dest_worker_ids = array('l')
+
+    def __len__(self):
+        return len(self.times)
+
+    def append(self, worker_id, time, num_tuples, dest_worker_id):
+        self.worker_ids.append(worker_id)
+        self.times.append(time)
+        self.num_tuples.append(num_tuples)
+        self.dest_worker_ids.append(dest_worker_id)
+
+    def rows(self):
+        for i in xrange(len(self.times)):
+            yield (self.worker_ids[i], self.times[i], self.num_tuples[i],
+                   self.dest_worker_ids[i])
+
+    def pack(self):
+        return pack('sent',
+                    [('workerId', self.worker_ids),
+                     ('nanoTime', self.times),
+                     ('numTuples', self.num_tuples),
+                     ('destWorkerId', self.dest_worker_ids)],
+                    encodings={'nanoTime': DELTA})
+
+    @classmethod
+    def unpack(cls, data):
+        table = unpack(data)
+        log = cls()
+        log.worker_ids = table.column('workerId')
+        log.times = table.column('nanoTime')
+        log.num_tuples = table.column('numTuples')
+        log.dest_worker_ids = table.column('destWorkerId')
+        return log
+
+
+def read_events(lines, log=None):
+    """Read a profiling log in CSV form into an EventLog (or append it to
+    log). Logs of operator intervals, as the coordinator returns when asked
+    for a time range (workerId,opId,startTime,endTime,numTuples), are read
+    as a call and a return event per interval."""
+    if log is None:
+        log = EventLog()
+    reader = csv.reader(lines)
+    try:
+        header = next(reader)
+    except StopIteration:
+        return log
+    columns = dict((name.strip(), i) for i, name in enumerate(header))
+
+    if 'eventType' in columns:
+        worker, op, time, tuples, kind = [columns[c] for c in (
+            'workerId', 'opName' if 'opName' in columns else 'opId',
+            'nanoTime', 'numTuples', 'eventType')]
+        for row in reader:
+            if not row:
+                continue
+            event_type = EVENT_TYPES.get(row[kind].strip())
+            if event_type is None:
+                continue
+            log.append(int(row[worker]), row[op], int(row[time]),
+                       int(row[tuples]), event_type)
+    else:
+        worker, op, start, end, tuples = [columns[c] for c in (
+            'workerId', 'opName' if 'opName' in columns else 'opId',
+            'startTime', 'endTime', 'numTuples')]
+        for row in reader:
+            if not row:
+                continue
+            log.append(int(row[worker]), row[op], int(row[start]), -1, CALL)
+            log.append(int(row[worker]), row[op], int(row[end]),
+                       int(row[tuples]), RETURN)
+    return log
+
+
+def read_sent(lines, log=None):
+    """Read a sent log (workerId,nanoTime,numTuples,destWorkerId) in CSV
+    form into a SentLog (or append it to log)."""
+    if log is None:
+        log = SentLog()
+    reader = csv.reader(lines)
+    try:
+        header = next(reader)
+    except StopIteration:
+        return log
+    columns = dict((name.strip(), i) for i, name in enumerate(header))
+    worker, time, tuples, dest = [columns[c] for c in (
+        'workerId', 'nanoTime', 'numTuples', 'destWorkerId')]
+    for row in reader:
+        if row:
+            log.append(int(row[worker]), int(row[time]), int(row[tuples]),
+                       int(row[dest]))
+    return log
+
+
+class CoordinatorLogs(object):
+    """Fetches the raw logs of a query fragment from the Myria coordinator
+    at base_url (e.g. http://localhost:8753)."""
+
+    def __init__(self, base_url, timeout=60):
+        self.base_url = base_url
+        self.timeout = timeout
+
+    def fetch(self, kind, query_id, subquery_id, fragment_id):
+        """The lines of one log ('profiling', 'sent' or 'histogram')."""
+        response = requests.get(
+            '{}/logs/{}'.format(self.base_url, kind),
+            params={'queryId': query_id, 'subqueryId': subquery_id,
+                    'fragmentId': fragment_id},
+            timeout=self.timeout)
+        response.raise_for_status()
+        return response.text.encode('utf-8').splitlines()
+
+
+class DirectoryLogs(object):
+    """Reads logs saved as <kind>_<queryId>_<fragmentId>.csv files in a
+    directory, like the samples in data/."""
+
+    def __init__(self, path):
+        self.path = path
+
+    def fetch(self, kind, query_id, subquery_id, fragment_id):
+        name = '{}_{}_{}.csv'.format(kind, query_id, fragment_id)
+        with open(os.path.join(self.path, name)) as f:
+            return f.read().splitlines()
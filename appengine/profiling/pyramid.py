@@ -0,0 +1,353 @@
+"""How many workers are active over time, at every zoom level.
+
+A worker is active in a fragment while its root operator has been called
+and has not yet returned; it is active in an operator while a call to that
+operator is open. Activity is kept both as the exact step function (the
+times at which the count changes) and as a pyramid of histograms: the
+finest level has at most BASE_BUCKETS buckets and every level above halves
+the number of buckets. A histogram for a zoomed view is read from the
+coarsest level whose buckets are no wider than the view's step, so it costs
+time proportional to the number of pixels rather than the number of events.
+"""
+from array import array
+from bisect import bisect_right
+
+from profiling.logs import CALL, RETURN, TIME_TYPECODE
+
+# The finest level of a pyramid has at most this many buckets
+BASE_BUCKETS = 1 << 14
+# How to summarize the workers active in a bucket
+STATS = ('max', 'mean')
+
+
+class ActivityTracker(object):
+    """Follows the calls open on each worker through the events of a log,
+    given in one or more batches, so that the activity of a running query
+    can be updated as its events arrive. Each batch must only hold events
+    that come after those of the previous batches on the same worker."""
+
+    def __init__(self):
+        # worker id -> [depth, open calls by operator name, last time]
+        self.workers = {}
+
+    def active_workers(self):
+        """The workers in a call of their root operator."""
+        return [worker for worker, (depth, _, _) in self.workers.items()
+                if depth]
+
+    def feed(self, log):
+        """The changes in activity caused by the events of an EventLog, as
+        a dictionary from operator name (or None, for the fragment as a
+        whole) to a list of (time, change in the number of active
+        workers). Returns without a call are ignored."""
+        changes = {None: []}
+        worker = None
+        state = None
+
+        for i in log.by_worker():
+            if log.worker_ids[i] != worker:
+                worker = log.worker_ids[i]
+                state = self.workers.setdefault(worker, [0, {}, None])
+            time = log.times[i]
+            op = log.op_names[log.op_codes[i]]
+            event_type = log.event_types[i]
+            state[2] = time
+            open_calls = state[1]
+
+            if event_type == CALL:
+                if state[0] == 0:
+                    changes[None].append((time, 1))
+                state[0] += 1
+                calls = open_calls.get(op, 0)
+                if calls == 0:
+                    changes.setdefault(op, []).append((time, 1))
+                open_calls[op] = calls + 1
+            elif event_type == RETURN and state[0]:
+                state[0] -= 1
+                if state[0] == 0:
+                    changes[None].append((time, -1))
+                calls = open_calls.get(op, 0)
+                if calls == 1:
+                    changes.setdefault(op, []).append((time, -1))
+                if calls:
+                    open_calls[op] = calls - 1
+        return changes
+
+    def close(self):
+        """End the calls that never returned at the last event of their
+        worker, as changes like those of feed."""
+        changes = {None: []}
+        for depth, open_calls, last_time in self.workers.values():
+            if depth:
+                changes[None].append((last_time, -1))
+            for op, calls in open_calls.items():
+                if calls:
+                    changes.setdefault(op, []).append((last_time, -1))
+        self.workers = {}
+        return changes
+
+
+def activity_changes(log):
+    """The changes in activity in an EventLog, in a single pass over each
+    worker's events. Returns a dictionary from operator name (or None, for
+    the fragment as a whole) to a list of (time, change in the number of
+    active workers). Calls that never return end at the last event of their
+    worker, and returns without a call are ignored."""
+    tracker = ActivityTracker()
+    changes = tracker.feed(log)
+    for op, closing in tracker.close().items():
+        changes.setdefault(op, []).extend(closing)
+    return changes
+
+
+def step_function(changes, count=0):
+    """Turn a list of (time, change) into parallel arrays of the times at
+    which the count changes and the count from each time on, starting from
+    count."""
+    times = array(TIME_TYPECODE)
+    counts = array('l')
+    for time, change in sorted(changes):
+        count += change
+        if times and times[-1] == time:
+            counts[-1] = count
+        else:
+            times.append(time)
+            counts.append(count)
+    return times, counts
+
+
+class ActivityPyramid(object):
+    """The number of active workers over time (a step function), with a
+    pyramid of histograms of it. Each level of the pyramid holds, for every
+    bucket, the time-weighted sum of the count (its integral) and the
+    highest count reached.
+
+    The activity of a running query grows at its end: changes after the
+    end are added in place, so that readers see either the old or the new
+    activity, and the pyramid is only rebuilt (see extended) when a change
+    comes earlier or the finest level has grown to twice its size."""
+
+    def __init__(self, times, counts, base_buckets=BASE_BUCKETS):
+        self.times = times
+        self.counts = counts
+        self.base_buckets = base_buckets
+        self.levels = []  # (bucket width, sums, maxes), finest first
+        if not times:
+            return
+        self.start = times[0]
+        self.end = times[-1]
+        span = max(1, self.end - self.start)
+        width = max(1, -(-span // base_buckets))
+        self._build_base(width, -(-span // width))
+        while len(self.levels[-1][1]) > 1:
+            self._build_parent()
+
+    def _build_base(self, width, num_buckets):
+        sums = array('d', [0.0]) * num_buckets
+        maxes = array('l', [0]) * num_buckets
+        times, counts = self.times, self.counts
+        for i in xrange(len(times) - 1):
+            self._integrate(sums, maxes, width, times[i] - self.start,
+                            times[i + 1] - self.start, counts[i])
+        self.levels.append((width, sums, maxes))
+
+    @staticmethod
+    def _integrate(sums, maxes, width, a, b, count):
+        """Add count over [a, b), measured from the start, to the buckets
+        of the finest level."""
+        if not count:
+            return
+        bucket = a // width
+        while a < b:
+            bucket_end = min(b, (bucket + 1) * width)
+            sums[bucket] += count * (bucket_end - a)
+            if count > maxes[bucket]:
+                maxes[bucket] = count
+            a = bucket_end
+            bucket += 1
+
+    def _build_parent(self):
+        width, sums, maxes = self.levels[-1]
+        n = len(sums)
+        parent_sums = array('d', (sums[i] + (sums[i + 1] if i + 1 < n else 0)
+                                  for i in xrange(0, n, 2)))
+        parent_maxes = array('l', (max(maxes[i:i + 2])
+                                   for i in xrange(0, n, 2)))
+        self.levels.append((2 * width, parent_sums, parent_maxes))
+
+    def extended(self, changes):
+        """The activity with more (time, change) pairs added: this pyramid,
+        extended in place, if they all come at or after its end, or else a
+        new pyramid."""
+        if not changes:
+            return self
+        changes = sorted(changes)
+        if not self.times or changes[0][0] < self.end:
+            return self._rebuilt(changes)
+        width, sums, maxes = self.levels[0]
+        if -(-(changes[-1][0] - self.start) // width) > 2 * self.base_buckets:
+            return self._rebuilt(changes)
+
+        times, counts = step_function(changes, self.counts[-1])
+        num_buckets = -(-(times[-1] - self.start) // width)
+        if num_buckets > len(sums):
+            maxes.extend(array('l', [0]) * (num_buckets - len(maxes)))
+            sums.extend(array('d', [0.0]) * (num_buckets - len(sums)))
+        first = (self.end - self.start) // width
+        previous_time, previous_count = self.end, self.counts[-1]
+        for time, count in zip(times, counts):
+            self._integrate(sums, maxes, width, previous_time - self.start,
+                            time - self.start, previous_count)
+            previous_time, previous_count = time, count
+        self._update_parents(first)
+
+        if times[0] == self.end:
+            self.counts[-1] = counts[0]
+            times, counts = times[1:], counts[1:]
+        self.counts.extend(counts)
+        self.times.extend(times)
+        self.end = self.times[-1]
+        return self
+
+    def _update_parents(self, first):
+        """Recompute the buckets of the levels above the finest one from
+        its bucket first on, adding levels if it has grown."""
+        for level in xrange(1, len(self.levels)):
+            _, sums, maxes = self.levels[level - 1]
+            _, parent_sums, parent_maxes = self.levels[level]
+            n = len(sums)
+            size = -(-n // 2)
+            if size > len(parent_sums):
+                parent_maxes.extend(
+                    array('l', [0]) * (size - len(parent_maxes)))
+                parent_sums.extend(
+                    array('d', [0.0]) * (size - len(parent_sums)))
+            first //= 2
+            for i in xrange(first, size):
+                parent_sums[i] = sums[2 * i] + (
+                    sums[2 * i + 1] if 2 * i + 1 < n else 0)
+                parent_maxes[i] = max(maxes[2 * i:2 * i + 2])
+        while len(self.levels[-1][1]) > 1:
+            self._build_parent()
+
+    def _rebuilt(self, changes):
+        """A new pyramid of this activity and the given changes."""
+        previous = 0
+        for time, count in zip(self.times, self.counts):
+            changes.append((time, count - previous))
+            previous = count
+        return ActivityPyramid(*step_function(changes),
+                               base_buckets=self.base_buckets)
+
+    def level_for(self, step):
+        """The index of the coarsest level whose buckets are no wider than
+        step, or None if even the finest level is too coarse."""
+        chosen = None
+        for i, (width, _, _) in enumerate(self.levels):
+            if width > step:
+                break
+            chosen = i
+        return chosen
+
+    def histogram(self, start, end, step, stat='max'):
+        """The active workers in each bucket [t, t + step) for t in
+        range(start, end, step), as (t, value) pairs for the buckets in
+        which some worker is active. The value is the highest number of
+        workers active at once in the bucket ('max'), or the average number
+        ('mean').
+
+        Each bucket is covered by buckets of the coarsest level that fits,
+        descending to finer levels (and finally to the exact activity) only
+        where a bucket of that level is partly outside it."""
+        assert stat in STATS
+        step = max(1, int(step))
+        if not self.times or end <= start:
+            return []
+        level = self.level_for(step)
+        result = []
+        first = start + max(0, (self.start - start) // step) * step
+        for t in xrange(first, min(end, self.end), step):
+            a = t - self.start
+            b = min(t + step, self.end) - self.start
+            if level is None:
+                total, highest = self._exact(t, t + step)
+            else:
+                total, highest = self._covered(level, a, b)
+            if highest:
+                result.append((t, highest if stat == 'max'
+                               else total / float(step)))
+        return result
+
+    def _covered(self, level, a, b):
+        """The integral and maximum of the activity over [a, b), measured
+        from the start, from the buckets of a level."""
+        width = self.levels[level][0]
+        total = 0.0
+        highest = 0
+        for bucket in xrange(max(0, a) // width, -(-b // width)):
+            bucket_total, bucket_highest = self._bucket(level, bucket, a, b)
+            total += bucket_total
+            highest = max(highest, bucket_highest)
+        return total, highest
+
+    def _bucket(self, level, bucket, a, b):
+        width, sums, maxes = self.levels[level]
+        if bucket >= len(sums) or not maxes[bucket]:
+            return 0.0, 0
+        bucket_start = bucket * width
+        a = max(a, bucket_start)
+        b = min(b, bucket_start + width)
+        if a >= b:
+            return 0.0, 0
+        if a == bucket_start and b == bucket_start + width:
+            return sums[bucket], maxes[bucket]
+        if level == 0:
+            return self._exact(a + self.start, b + self.start)
+        return self._covered(level - 1, a, b)
+
+    def _exact(self, a, b):
+        """The integral and maximum of the activity over [a, b), from the
+        times at which it changes."""
+        times, counts = self.times, self.counts
+        i = max(0, bisect_right(times, a) - 1)
+        total = 0.0
+        highest = 0
+        while i < len(times) and times[i] < b:
+            segment_end = times[i + 1] if i + 1 < len(times) else b
+            overlap = min(b, segment_end) - max(a, times[i])
+            if overlap > 0 and counts[i]:
+                total += counts[i] * overlap
+                highest = max(highest, counts[i])
+            i += 1
+        return total, highest
+
+
+class FragmentActivity(object):
+    """The activity pyramids of one fragment: the fragment as a whole (its
+    root operators) and each operator in it."""
+
+    def __init__(self, log, base_buckets=BASE_BUCKETS):
+        self.time_range = log.time_range
+        self.base_buckets = base_buckets
+        self.ops = {}
+        self.root = None
+        for op, changes in activity_changes(log).items():
+            pyramid = ActivityPyramid(*step_function(changes),
+                                      base_buckets=base_buckets)
+            if op is None:
+                self.root = pyramid
+            else:
+                self.ops[op] = pyramid
+
+    def extend(self, changes):
+        """Add changes, as returned by ActivityTracker.feed, to the
+        pyramids."""
+        for op, op_changes in changes.items():
+            if op is None:
+                self.root = self.root.extended(op_changes)
+                continue
+            pyramid = self.ops.get(op)
+            if pyramid is None:
+                pyramid = ActivityPyramid(array(TIME_TYPECODE), array('l'),
+                                          base_buckets=self.base_buckets)
+            self.ops[op] = pyramid.extended(op_changes)
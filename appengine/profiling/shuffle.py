@@ -0,0 +1,134 @@
+"""Aggregates of the sent logs: how many tuples each worker sent to each
+other worker.
+
+A fragment's sent log has a row per batch of tuples a worker sent, which
+runs to megabytes for large clusters, while the visualizations only show
+sums of it: the worker-by-worker matrix, the totals of each source and
+destination (and how skewed they are), and the tuples sent over time.
+"""
+from array import array
+from itertools import izip
+import math
+
+# How many time buckets the sends of a fragment are counted in
+SHUFFLE_TIME_BUCKETS = 100
+
+
+def skew(values):
+    """Statistics of how evenly values (one per worker) are spread: their
+    minimum, maximum, mean and standard deviation, the ratio of the maximum
+    to the mean and the coefficient of variation (both 1 and 0 when the
+    values are even)."""
+    if not values:
+        return None
+    mean = float(sum(values)) / len(values)
+    stddev = math.sqrt(sum((v - mean) ** 2 for v in values) / len(values))
+    return {'min': min(values), 'max': max(values), 'mean': mean,
+            'stddev': stddev,
+            'maxOverMean': max(values) / mean if mean else None,
+            'cv': stddev / mean if mean else None}
+
+
+class ShuffleMatrix(object):
+    """The tuples sent between each pair of workers. counts is a flat,
+    row-major array: counts[i * len(workers) + j] tuples went from
+    workers[i] to workers[j]."""
+
+    def __init__(self, workers=()):
+        self.workers = sorted(workers)
+        self.counts = array('l', [0]) * (len(self.workers) ** 2)
+        self.duration = 0
+        self.buckets = None  # (start, step, array of tuples per bucket)
+
+    @classmethod
+    def from_log(cls, log, time_buckets=SHUFFLE_TIME_BUCKETS):
+        """Sum a SentLog: each row is added to the cell of its pair of
+        workers, and to the bucket of its time."""
+        matrix = cls(set(log.worker_ids) | set(log.dest_worker_ids))
+        if not len(log):
+            return matrix
+        n = len(matrix.workers)
+        index = dict((worker, i) for i, worker in enumerate(matrix.workers))
+        counts = matrix.counts
+        rows = array('l', (index[w] * n for w in log.worker_ids))
+        columns = array('l', (index[w] for w in log.dest_worker_ids))
+        for row, column, num_tuples in izip(rows, columns, log.num_tuples):
+            counts[row + column] += num_tuples
+
+        start, end = min(log.times), max(log.times)
+        matrix.duration = end - start
+        step = max(1, int(math.ceil((end - start + 1) / float(time_buckets))))
+        buckets = array('l', [0]) * time_buckets
+        for time, num_tuples in izip(log.times, log.num_tuples):
+            buckets[int(time - start) // step] += num_tuples
+        matrix.buckets = (start, step, buckets)
+        return matrix
+
+    @classmethod
+    def merge(cls, matrices):
+        """The sum of several matrices (like those of a query's fragments).
+        Time buckets are not merged: fragments bucket different times."""
+        total = cls(set(w for m in matrices for w in m.workers))
+        n = len(total.workers)
+        index = dict((worker, i) for i, worker in enumerate(total.workers))
+        for matrix in matrices:
+            positions = [index[w] for w in matrix.workers]
+            m = len(positions)
+            for i, row in enumerate(positions):
+                for j, column in enumerate(positions):
+                    total.counts[row * n + column] += matrix.counts[i * m + j]
+            total.duration = max(total.duration, matrix.duration)
+        return total
+
+    def __len__(self):
+        return len(self.workers)
+
+    def rows(self):
+        """The matrix as a list of lists."""
+        n = len(self.workers)
+        return [list(self.counts[i * n:(i + 1) * n]) for i in xrange(n)]
+
+    def cells(self):
+        """The non-empty cells, as (src, dest, numTuples) tuples."""
+        n = len(self.workers)
+        for i, src in enumerate(self.workers):
+            for j, dest in enumerate(self.workers):
+                if self.counts[i * n + j]:
+                    yield src, dest, self.counts[i * n + j]
+
+    @property
+    def sources(self):
+        """The number of tuples each worker sent, in worker order."""
+        return [sum(row) for row in self.rows()]
+
+    @property
+    def destinations(self):
+        """The number of tuples each worker received, in worker order."""
+        return [sum(column) for column in zip(*self.rows())]
+
+    @property
+    def num_tuples(self):
+        return sum(self.counts)
+
+    @property
+    def local_tuples(self):
+        """The number of tuples workers sent to themselves."""
+        n = len(self.workers)
+        return sum(self.counts[i * n + i] for i in xrange(n))
+
+    def summary(self):
+        """The matrix and its statistics, as a dict for JSON."""
+        summary = {'workers': self.workers,
+                   'matrix': self.rows(),
+                   'sources': self.sources,
+                   'destinations': self.destinations,
+                   'sourceSkew': skew(self.sources),
+                   'destinationSkew': skew(self.destinations),
+                   'numTuples': self.num_tuples,
+                   'localTuples': self.local_tuples,
+                   'duration': self.duration}
+        if self.buckets is not None:
+            start, step, buckets = self.buckets
+            summary['timeBuckets'] = {'start': start, 'step': step,
+                                      'numTuples': list(buckets)}
+        return summary
@@ -0,0 +1,148 @@
+import time
+
+from cache import LRUCache
+from profiling.analysis import FragmentAnalysis
+from profiling.archive import archive_key
+from profiling.intervals import IntervalIndex
+from profiling.live import LiveProfile
+from profiling.logs import EventLog, SentLog, read_events, read_sent
+from profiling.pyramid import FragmentActivity
+from profiling.shuffle import ShuffleMatrix
+
+# How many fragments' logs (and what is derived from them) to keep
+PROFILE_CACHE_SIZE = 64
+PROFILE_TTL = 10 * 60  # seconds
+
+# How each kind of log is read from CSV, and the class that packs it
+LOG_FORMATS = {
+    'profiling': (read_events, EventLog),
+    'sent': (read_sent, SentLog),
+}
+
+
+class ProfileStore(object):
+    """Downloads the logs of a query fragment once and keeps them, along
+    with everything derived from them, so that each zoom or brush in the
+    profile charts is answered without going back to the coordinator.
+    Concurrent requests for the same fragment share one download.
+
+    The logs of finished queries never change. If is_finished(query_id)
+    says a query has finished, its logs (and only its logs) are cached and
+    kept, packed, in the (optional) archive, which can outlive this process
+    and be shared between instances. The profiles of running queries are
+    kept as LiveProfiles, which tail refreshes."""
+
+    def __init__(self, source, archive=None, is_finished=None,
+                 max_size=PROFILE_CACHE_SIZE, ttl=PROFILE_TTL,
+                 clock=time.time):
+        self.source = source
+        self.archive = archive
+        self.is_finished = is_finished or (lambda query_id: True)
+        self.cache = LRUCache(max_size=max_size, ttl=ttl, clock=clock)
+        self.live = LRUCache(max_size=max_size, ttl=ttl, clock=clock)
+        self.downloads = 0
+        self.archive_hits = 0
+
+    @staticmethod
+    def key(kind, query_id, subquery_id, fragment_id):
+        return (kind, int(query_id), int(subquery_id), int(fragment_id))
+
+    def _cached(self, key, compute):
+        if self.is_finished(key[1]):
+            return self.cache.get_or_compute(key, compute)
+        return compute()
+
+    def log(self, kind, query_id, subquery_id, fragment_id):
+        """A log ('profiling' or 'sent') of the fragment, from the cache,
+        the archive or the coordinator."""
+        key = self.key(kind, query_id, subquery_id, fragment_id)
+        return self._cached(key, lambda: self._load(*key))
+
+    def _load(self, kind, query_id, subquery_id, fragment_id):
+        read, log_class = LOG_FORMATS[kind]
+        name = archive_key(kind, query_id, subquery_id, fragment_id)
+        finished = self.is_finished(query_id)
+        if finished and self.archive is not None:
+            data = self.archive.get(name)
+            if data is not None:
+                self.archive_hits += 1
+                return log_class.unpack(data)
+
+        self.downloads += 1
+        log = read(self.source.fetch(kind, query_id, subquery_id,
+                                     fragment_id))
+        if finished and self.archive is not None:
+            self.archive.put(name, log.pack())
+        return log
+
+    def events(self, query_id, subquery_id, fragment_id):
+        """The fragment's profiling log, as an EventLog."""
+        return self.log('profiling', query_id, subquery_id, fragment_id)
+
+    def sent(self, query_id, subquery_id, fragment_id):
+        """The fragment's sent log, as a SentLog."""
+        return self.log('sent', query_id, subquery_id, fragment_id)
+
+    def tail(self, query_id, subquery_id, fragment_id):
+        """The fragment's LiveProfile, updated with the events logged since
+        it was last updated (reading only the lines the log grew by)."""
+        live = self.live.get_or_compute(
+            self.key('live', query_id, subquery_id, fragment_id),
+            LiveProfile)
+        if not live.finished:
+            finished = self.is_finished(query_id)
+            self.downloads += 1
+            live.ingest_lines(self.source.fetch('profiling', query_id,
+                                                subquery_id, fragment_id),
+                              finished=finished)
+        return live
+
+    def _live(self, query_id, subquery_id, fragment_id):
+        """The fragment's LiveProfile if its query is running, as last
+        updated by tail (or updated now, if it never was)."""
+        if self.is_finished(query_id):
+            return None
+        live = self.live.get(
+            self.key('live', query_id, subquery_id, fragment_id))
+        return live or self.tail(query_id, subquery_id, fragment_id)
+
+    def activity(self, query_id, subquery_id, fragment_id):
+        """The fragment's FragmentActivity (its histogram pyramids)."""
+        live = self._live(query_id, subquery_id, fragment_id)
+        if live is not None:
+            return live.activity
+        return self._cached(
+            self.key('activity', query_id, subquery_id, fragment_id),
+            lambda: FragmentActivity(
+                self.events(query_id, subquery_id, fragment_id)))
+
+    def intervals(self, query_id, subquery_id, fragment_id):
+        """The fragment's IntervalIndex (its operator intervals)."""
+        live = self._live(query_id, subquery_id, fragment_id)
+        if live is not None:
+            return live.intervals
+        return self._cached(
+            self.key('intervals', query_id, subquery_id, fragment_id),
+            lambda: IntervalIndex(
+                self.events(query_id, subquery_id, fragment_id)))
+
+    def analysis(self, query_id, subquery_id, fragment_id):
+        """The fragment's FragmentAnalysis (where its time went)."""
+        return self._cached(
+            self.key('analysis', query_id, subquery_id, fragment_id),
+            lambda: FragmentAnalysis(
+                self.events(query_id, subquery_id, fragment_id)))
+
+    def shuffle(self, query_id, subquery_id, fragment_id):
+        """The fragment's ShuffleMatrix (the sums of its sent log)."""
+        return self._cached(
+            self.key('shuffle', query_id, subquery_id, fragment_id),
+            lambda: ShuffleMatrix.from_log(
+                self.sent(query_id, subquery_id, fragment_id)))
+
+    @property
+    def stats(self):
+        stats = dict(self.cache.stats)
+        stats.update(downloads=self.downloads, archive_hits=self.archive_hits,
+                     live=len(self.live))
+        return stats
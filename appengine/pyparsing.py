@@ -69,6 +69,8 @@ import sys
 import warnings
 import re
 import sre_constants
+import collections
+import threading
 #~ sys.stderr.write( "testing pyparsing module, version %s, %s\n" % (__version__,__versionTime__ ) )
 
 __all__ = [
@@ -667,6 +669,37 @@ def nullDebugAction(*args):
     """'Do-nothing' debug action, to suppress debugging output during parsing."""
     pass
 
+class _PackratCache(object):
+    """Memo of the parse attempts made during one parse of instring, keyed by
+       (id of element, location, doActions, callPreParse).  Keeps the results
+       of at most size attempts, evicting the oldest first."""
+    def __init__( self, instring, size ):
+        self.instring = instring
+        self.size = size
+        self.results = {}
+        self.keys = collections.deque()
+
+    def add( self, key, value ):
+        self.results[key] = value
+        self.keys.append(key)
+        if len(self.keys) > self.size:
+            del self.results[self.keys.popleft()]
+
+    def clear( self ):
+        self.results.clear()
+        self.keys.clear()
+
+class _PackratState(threading.local):
+    cache = None        # the packrat memo of the parse running in this thread
+
+_packratState = _PackratState()
+
+def _usePackratCache( cache ):
+    """Make cache the memo of this thread's parse, returning the one it replaces."""
+    previous = _packratState.cache
+    _packratState.cache = cache
+    return previous
+
 class ParserElement(object):
     """Abstract base level parser element class."""
     DEFAULT_WHITE_CHARS = " \n\t\r"
@@ -1009,52 +1042,69 @@ class ParserElement(object):
     # this method gets repeatedly called during backtracking with the same arguments -
     # we can cache these arguments and save ourselves the trouble of re-parsing the contained expression
     def _parseCache( self, instring, loc, doActions=True, callPreParse=True ):
-        lookup = (self,instring,loc,callPreParse,doActions)
-        if lookup in ParserElement._exprArgCache:
-            value = ParserElement._exprArgCache[ lookup ]
+        cache = _packratState.cache
+        if cache is None or cache.instring is not instring:
+            # not called from parseString or scanString, or on another string
+            return self._parseNoCache( instring, loc, doActions, callPreParse )
+        lookup = (id(self),loc,doActions,callPreParse)
+        value = cache.results.get(lookup)
+        if value is not None:
             if isinstance(value,Exception):
                 raise value
-            return value
-        else:
-            try:
-                value = self._parseNoCache( instring, loc, doActions, callPreParse )
-                ParserElement._exprArgCache[ lookup ] = (value[0],value[1].copy())
-                return value
-            except ParseBaseException:
-                pe = sys.exc_info()[1]
-                ParserElement._exprArgCache[ lookup ] = pe
-                raise
+            return (value[0],value[1].copy())
+        try:
+            value = self._parseNoCache( instring, loc, doActions, callPreParse )
+        except ParseBaseException:
+            pe = sys.exc_info()[1]
+            cache.add( lookup, pe )
+            raise
+        cache.add( lookup, (value[0],value[1].copy()) )
+        return value
+
+    _parse = _parseCache
 
-    _parse = _parseNoCache
+    def _newCache( self, instring ):
+        if ParserElement._packratEnabled:
+            return _PackratCache( instring, ParserElement._packratCacheSize )
+        return None
 
-    # argument cache for optimizing repeated calls when backtracking through recursive expressions
-    _exprArgCache = {}
     def resetCache():
-        ParserElement._exprArgCache.clear()
+        """Clears the packrat memo of the parse running in this thread."""
+        cache = _packratState.cache
+        if cache is not None:
+            cache.clear()
     resetCache = staticmethod(resetCache)
 
-    _packratEnabled = False
-    def enablePackrat():
+    _packratEnabled = True
+    _packratCacheSize = 10000
+    def enablePackrat( cacheSize=None ):
         """Enables "packrat" parsing, which adds memoizing to the parsing logic.
            Repeated parse attempts at the same string location (which happens
            often in many complex grammars) can immediately return a cached value,
            instead of re-executing parsing/validating code.  Memoizing is done of
            both valid results and parsing exceptions.
 
+           Packrat parsing is enabled when you first import pyparsing.  Each call
+           to C{parseString} or C{scanString} memoizes in a memo of its own, which
+           holds at most C{cacheSize} results (10000 by default), evicting the
+           oldest first, so parses in different threads do not share results.
+
            This speedup may break existing programs that use parse actions that
-           have side-effects.  For this reason, packrat parsing is disabled when
-           you first import pyparsing.  To activate the packrat feature, your
-           program must call the class method C{ParserElement.enablePackrat()}.  If
-           your program uses C{psyco} to "compile as you go", you must call
-           C{enablePackrat} before calling C{psyco.full()}.  If you do not do this,
-           Python will crash.  For best results, call C{enablePackrat()} immediately
-           after importing pyparsing.
+           have side-effects, since a memoized result does not run them again.
+           Such programs can call C{ParserElement.disablePackrat()}.
         """
-        if not ParserElement._packratEnabled:
-            ParserElement._packratEnabled = True
-            ParserElement._parse = ParserElement._parseCache
+        ParserElement._packratEnabled = True
+        ParserElement._parse = ParserElement._parseCache
+        if cacheSize is not None:
+            ParserElement._packratCacheSize = cacheSize
     enablePackrat = staticmethod(enablePackrat)
 
+    def disablePackrat():
+        """Disables "packrat" parsing (see L{I{enablePackrat}<enablePackrat>})."""
+        ParserElement._packratEnabled = False
+        ParserElement._parse = ParserElement._parseNoCache
+    disablePackrat = staticmethod(disablePackrat)
+
     def parseString( self, instring, parseAll=False ):
         """Execute the parse expression with the given string.
            This is the main interface to the client code, once the complete
@@ -1077,7 +1127,6 @@ class ParserElement(object):
             - explictly expand the tabs in your input string before calling
               C{parseString}
         """
-        ParserElement.resetCache()
         if not self.streamlined:
             self.streamline()
             #~ self.saveAsList = True
@@ -1085,6 +1134,7 @@ class ParserElement(object):
             e.streamline()
         if not self.keepTabs:
             instring = instring.expandtabs()
+        previousCache = _usePackratCache( self._newCache( instring ) )
         try:
             loc, tokens = self._parse( instring, 0 )
             if parseAll:
@@ -1100,6 +1150,8 @@ class ParserElement(object):
                 raise exc
         else:
             return tokens
+        finally:
+            _usePackratCache( previousCache )
 
     def scanString( self, instring, maxMatches=_MAX_INT ):
         """Scan the input string for expression matches.  Each match will return the
@@ -1120,13 +1172,19 @@ class ParserElement(object):
         loc = 0
         preparseFn = self.preParse
         parseFn = self._parse
-        ParserElement.resetCache()
+        cache = self._newCache( instring )
         matches = 0
         try:
             while loc <= instrlen and matches < maxMatches:
+                # the memo is only this scan's while it parses, not while
+                # the caller has a match
+                previousCache = _usePackratCache( cache )
                 try:
-                    preloc = preparseFn( instring, loc )
-                    nextLoc,tokens = parseFn( instring, preloc, callPreParse=False )
+                    try:
+                        preloc = preparseFn( instring, loc )
+                        nextLoc,tokens = parseFn( instring, preloc, callPreParse=False )
+                    finally:
+                        _usePackratCache( previousCache )
                 except ParseException:
                     loc = preloc+1
                 else:
@@ -0,0 +1,79 @@
+import calendar
+from datetime import datetime
+import re
+
+from status_poller import is_active
+
+# How the query log shows each status
+BOOTSTRAP_STATUS = {
+    'ERROR': 'danger',
+    'KILLED': 'danger',
+    'SUCCESS': 'success',
+    'RUNNING': 'warning',
+}
+# The times at which a query changes
+QUERY_TIMES = ('submitTime', 'startTime', 'finishTime')
+
+# e.g. 2014-02-26T15:10:37.718-08:00, as Myria formats times
+TIMESTAMP = re.compile(r'^(\d{4})-(\d\d)-(\d\d)T(\d\d):(\d\d):(\d\d)'
+                       r'(?:\.(\d+))?(Z|[+-]\d\d:?\d\d)?$')
+
+
+def nano_to_str(elapsed):
+    if elapsed is None:
+        return None
+    s = elapsed / 1000000000.0
+    m, s = divmod(s, 60)
+    h, m = divmod(m, 60)
+    d, h = divmod(h, 24)
+    elapsed_str = ' %fs' % s
+    if m:
+        elapsed_str = '%dm ' % m + elapsed_str
+    if h:
+        elapsed_str = '%dh ' % h + elapsed_str
+    if d:
+        elapsed_str = '%dd ' % d + elapsed_str
+    return elapsed_str
+
+
+def annotate(query):
+    """Add the fields the query log shows to a query's status."""
+    query['elapsedStr'] = nano_to_str(query.get('elapsedNanos'))
+    query['bootstrapStatus'] = BOOTSTRAP_STATUS.get(query['status'], '')
+    return query
+
+
+def parse_timestamp(timestamp):
+    """Seconds since the epoch of an ISO 8601 time, as Myria formats them,
+    or None if the time cannot be parsed. Times without a zone are UTC."""
+    match = TIMESTAMP.match(timestamp or '')
+    if match is None:
+        return None
+    (year, month, day, hour, minute, second,
+     fraction, zone) = match.groups()
+    try:
+        seconds = calendar.timegm(datetime(
+            int(year), int(month), int(day),
+            int(hour), int(minute), int(second)).timetuple())
+    except ValueError:
+        return None
+    if fraction:
+        seconds += float('0.' + fraction)
+    if zone and zone != 'Z':
+        zone = zone.replace(':', '')
+        offset = int(zone[1:3]) * 3600 + int(zone[3:5]) * 60
+        seconds -= offset if zone[0] == '+' else -offset
+    return seconds
+
+
+def last_changed(query):
+    """When the query last changed, in seconds since the epoch."""
+    times = [parse_timestamp(query.get(t)) for t in QUERY_TIMES]
+    return max([t for t in times if t is not None] or [None])
+
+
+def changed_since(queries, since):
+    """The queries that changed at or after since (seconds since the
+    epoch). Queries that are still running may change at any time."""
+    return [q for q in queries
+            if is_active(q) or (last_changed(q) or 0) >= since]
@@ -0,0 +1,208 @@
+from threading import Condition
+import time
+
+# Queries in these states may still change
+ACTIVE_STATES = frozenset(['ACCEPTED', 'RUNNING', 'PAUSED', 'KILLING'])
+# A query's status is re-fetched after max(MIN, min(MAX, BACKOFF * age))
+# seconds, where age is how long it has been watched
+MIN_POLL_INTERVAL = 1.0
+MAX_POLL_INTERVAL = 30.0
+POLL_BACKOFF = 0.1
+# The longest a client is held waiting for a status change
+LONG_POLL_TIMEOUT = 25.0
+# Watched queries whose ids are this close are fetched with one listing
+BATCH_SPAN = 100
+# Unwatched queries are forgotten after this many seconds
+WATCH_EXPIRY = 10 * 60
+
+
+def is_active(status):
+    return status is None or status.get('status') in ACTIVE_STATES
+
+
+class _Watch(object):
+    """The latest known status of one query, and who is waiting on it."""
+
+    def __init__(self, now):
+        self.status = None
+        self.error = None
+        self.first_seen = now
+        self.fetched_at = None
+        self.last_used = now
+        self.watchers = 0
+
+    def stale_at(self):
+        """When the snapshot should be re-fetched, or None if never."""
+        if self.fetched_at is None:
+            return 0
+        if not is_active(self.status):
+            return None
+        age = self.fetched_at - self.first_seen
+        interval = min(MAX_POLL_INTERVAL,
+                       max(MIN_POLL_INTERVAL, POLL_BACKOFF * age))
+        return self.fetched_at + interval
+
+
+class QueryStatusPoller(object):
+    """Shares query status lookups between every client watching a query.
+
+    Each watched query has one snapshot of its status. Whichever waiting
+    request first finds snapshots stale fetches all of them (batching nearby
+    query ids into a single listing) while the other requests wait for the
+    result, so the coordinator sees at most one status request per query per
+    poll interval no matter how many browsers are watching. Poll intervals
+    grow with the age of a query, and finished queries are never polled
+    again."""
+
+    def __init__(self, connection, on_success=None, clock=time.time):
+        self.connection = connection
+        self.on_success = on_success
+        self.clock = clock
+        self.fetches = 0
+        self._watches = {}
+        self._polling = False
+        self._changed = Condition()
+
+    def status(self, query_id):
+        """The status of one query, fetched unless the last snapshot is
+        still fresh."""
+        query_id = int(query_id)
+        snapshot = self.wait({query_id: None}, timeout=0)
+        if query_id in snapshot:
+            return snapshot[query_id]
+        with self._changed:
+            raise self._watches[query_id].error
+
+    def submitted(self, status):
+        """Record the status the coordinator returned for a query this
+        instance just submitted. Its first poll then compares against it, so
+        a query that finished before then still counts as a success."""
+        query_id = int(status['queryId'])
+        with self._changed:
+            watch = self._watch(query_id, self.clock())
+            if watch.status is None:
+                watch.status = status
+        if status.get('status') == 'SUCCESS' and self.on_success is not None:
+            self.on_success()
+
+    def wait(self, known, timeout=LONG_POLL_TIMEOUT):
+        """Wait until the status of one of the queries differs from what the
+        client knows, or until the timeout expires. known maps query ids to
+        the status strings (e.g. 'RUNNING') the client last saw, or None.
+        Returns a dictionary from query id to the latest status of every
+        query whose status is known."""
+        known = dict((int(q), s) for q, s in known.items())
+        deadline = self.clock() + timeout
+        with self._changed:
+            now = self.clock()
+            for query_id in known:
+                self._watch(query_id, now).watchers += 1
+        try:
+            while True:
+                with self._changed:
+                    now = self.clock()
+                    watches = [self._watches[q] for q in known]
+                    stale_times = [w.stale_at() for w in watches]
+                    stale = any(t is not None and t <= now
+                                for t in stale_times)
+                    if stale and self._polling:
+                        self._changed.wait(MAX_POLL_INTERVAL)
+                        continue
+                    if not stale:
+                        snapshot = dict((q, self._watches[q].status)
+                                        for q in known
+                                        if self._watches[q].status)
+                        if now >= deadline or any(
+                                snapshot[q]['status'] != known[q]
+                                for q in snapshot):
+                            return snapshot
+                        wake = min([deadline] +
+                                   [t for t in stale_times if t is not None])
+                        self._changed.wait(wake - now)
+                        continue
+                    # Fetch every stale query that someone is waiting for
+                    self._polling = True
+                    previous = dict(
+                        (q, w.status) for q, w in self._watches.items()
+                        if w.watchers and w.stale_at() is not None and
+                        w.stale_at() <= now)
+                self._refresh(previous)
+        finally:
+            with self._changed:
+                for query_id in known:
+                    self._watches[query_id].watchers -= 1
+
+    def _watch(self, query_id, now):
+        watch = self._watches.get(query_id)
+        if watch is None:
+            watch = self._watches[query_id] = _Watch(now)
+        watch.last_used = now
+        return watch
+
+    def _refresh(self, previous):
+        succeeded = []
+        results = {}
+        try:
+            results = self._fetch(previous)
+        finally:
+            with self._changed:
+                now = self.clock()
+                for query_id, (status, error) in results.items():
+                    watch = self._watches[query_id]
+                    if status is not None:
+                        # Only a success seen happening counts: a query
+                        # first fetched after it finished changed nothing,
+                        # unless it was submitted here (see submitted)
+                        old = previous[query_id]
+                        if (status['status'] == 'SUCCESS' and
+                                old is not None and
+                                old['status'] != 'SUCCESS'):
+                            succeeded.append(query_id)
+                        watch.status = status
+                    watch.error = error
+                    watch.fetched_at = now
+                for query_id, watch in self._watches.items():
+                    if (not watch.watchers and
+                            now - watch.last_used > WATCH_EXPIRY):
+                        del self._watches[query_id]
+                self._polling = False
+                self._changed.notify_all()
+        if succeeded and self.on_success is not None:
+            self.on_success()
+
+    def _fetch(self, previous):
+        """Fetch the status of each query, given the previous status of
+        each. Returns a dictionary from query id to (status, error)."""
+        results = {}
+        query_ids = sorted(previous)
+        if len(query_ids) > 1 and query_ids[-1] - query_ids[0] < BATCH_SPAN:
+            # One listing tells which queries changed; only those need their
+            # full status fetched
+            try:
+                self.fetches += 1
+                listing = self.connection.queries(
+                    limit=query_ids[-1] - query_ids[0] + 1,
+                    min_id=query_ids[0], max_id=query_ids[-1])['results']
+            except Exception:
+                listing = []
+            for query in listing:
+                old = previous.get(query['queryId'])
+                if old is not None and old['status'] == query['status']:
+                    results[query['queryId']] = (old, None)
+
+        for query_id in query_ids:
+            if query_id in results:
+                continue
+            try:
+                self.fetches += 1
+                results[query_id] = (
+                    self.connection.get_query_status(query_id), None)
+            except Exception as e:
+                results[query_id] = (None, e)
+        return results
+
+    @property
+    def stats(self):
+        with self._changed:
+            return {'watched': len(self._watches),
+                    'fetches': self.fetches}
@@ -0,0 +1,95 @@
+"""A small language of assignments, to test the PLY lexer and parser on:
+
+    x = 1 + 2 * y;
+    y = (x - 3) / 4;
+
+A program parses to a list of (name, expression) statements, where an
+expression is a number, ('name', name) or (operator, left, right)."""
+from ply import lex, yacc
+
+
+class Calc(object):
+    tokens = ('NAME', 'NUMBER', 'PLUS', 'MINUS', 'TIMES', 'DIVIDE',
+              'EQUALS', 'LPAREN', 'RPAREN', 'SEMI')
+
+    t_PLUS = r'\+'
+    t_MINUS = r'-'
+    t_TIMES = r'\*'
+    t_DIVIDE = r'/'
+    t_EQUALS = r'='
+    t_LPAREN = r'\('
+    t_RPAREN = r'\)'
+    t_SEMI = r';'
+    t_NAME = r'[a-zA-Z_][a-zA-Z0-9_]*'
+    t_ignore = ' \t'
+
+    precedence = (('left', 'PLUS', 'MINUS'),
+                  ('left', 'TIMES', 'DIVIDE'))
+    start = 'program'
+
+    def __init__(self, **kwargs):
+        """Build the lexer and the parser; kwargs are passed to yacc."""
+        kwargs.setdefault('tabmodule', 'calc_parsetab')
+        kwargs.setdefault('write_tables', 0)
+        self.lexer = lex.lex(module=self)
+        self.parser = yacc.yacc(module=self, debug=0,
+                                errorlog=yacc.NullLogger(), **kwargs)
+
+    def parse(self, text):
+        return self.parser.parse(text, lexer=self.lexer.clone())
+
+    def t_NUMBER(self, t):
+        r'\d+'
+        t.value = int(t.value)
+        return t
+
+    def t_newline(self, t):
+        r'\n+'
+        t.lexer.lineno += len(t.value)
+
+    def t_error(self, t):
+        raise SyntaxError("illegal character %r" % t.value[0])
+
+    def p_program(self, p):
+        'program : statements'
+        p[0] = p[1]
+
+    def p_statements(self, p):
+        '''statements : statements statement
+                      | statement'''
+        if len(p) == 3:
+            p[0] = p[1] + [p[2]]
+        else:
+            p[0] = [p[1]]
+
+    def p_statement(self, p):
+        'statement : NAME EQUALS expression SEMI'
+        p[0] = (p[1], p[3])
+
+    def p_expression_binary(self, p):
+        '''expression : expression PLUS expression
+                      | expression MINUS expression
+                      | expression TIMES expression
+                      | expression DIVIDE expression'''
+        p[0] = (p[2], p[1], p[3])
+
+    def p_expression_group(self, p):
+        'expression : LPAREN expression RPAREN'
+        p[0] = p[2]
+
+    def p_expression_number(self, p):
+        'expression : NUMBER'
+        p[0] = p[1]
+
+    def p_expression_name(self, p):
+        'expression : NAME'
+        p[0] = ('name', p[1])
+
+    def p_error(self, p):
+        raise SyntaxError("syntax error at %r" % (p.value if p else 'EOF'))
+
+
+PROGRAM = '''x = 1 + 2 * y;
+y = (x - 3) / 4;
+z = x * (y + 2) - 7 / x;
+'''
@@ -0,0 +1,227 @@
+from threading import Event, Thread
+import time
+
+from nose.tools import assert_equals, assert_not_equals, assert_raises
+
+from cache import CatalogCache, LRUCache, PlanCache, RefreshingValue
+
+
+class FakeClock(object):
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_lru_eviction():
+    cache = LRUCache(max_size=2)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    # touch a so that b is the least recently used
+    assert_equals(cache.get('a'), 1)
+    cache.put('c', 3)
+    assert 'a' in cache
+    assert 'b' not in cache
+    assert 'c' in cache
+    assert_equals(len(cache), 2)
+
+
+def test_ttl_expiry():
+    clock = FakeClock()
+    cache = LRUCache(max_size=4, ttl=10, clock=clock)
+    cache.put('a', 1)
+    clock.now = 9
+    assert_equals(cache.get('a'), 1)
+    clock.now = 10
+    assert_equals(cache.get('a'), None)
+
+
+def test_get_or_compute_caches_values_not_errors():
+    cache = LRUCache()
+    calls = []
+
+    def fail():
+        calls.append(1)
+        raise ValueError('bad query')
+
+    assert_raises(ValueError, cache.get_or_compute, 'k', fail)
+    assert_raises(ValueError, cache.get_or_compute, 'k', fail)
+    assert_equals(len(calls), 2)
+
+    assert_equals(cache.get_or_compute('k', lambda: 42), 42)
+    assert_equals(cache.get_or_compute('k', lambda: 43), 42)
+    assert_equals(cache.stats['hits'], 1)
+
+
+def test_get_or_compute_single_flight():
+    cache = LRUCache()
+    calls = []
+
+    def slow():
+        calls.append(1)
+        time.sleep(0.05)
+        return 'plan'
+
+    results = []
+    threads = [Thread(target=lambda: results.append(
+        cache.get_or_compute('k', slow))) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert_equals(results, ['plan'] * 8)
+    assert_equals(len(calls), 1)
+
+
+def test_plan_cache_key():
+    cache = PlanCache()
+    query = u'T = scan(public:adhoc:Twitter); store(T, X);'
+    # the logical plan ignores the physical options
+    assert_equals(cache.key(query, 'myrial', 'logical', True, True),
+                  cache.key(query, 'myrial', 'logical'))
+    assert_not_equals(cache.key(query, 'myrial', 'physical', True, True),
+                      cache.key(query, 'myrial', 'physical'))
+    assert_not_equals(cache.key(query, 'myrial', 'physical'),
+                      cache.key(query, 'sql', 'physical'))
+
+
+def test_plan_cache_catalog_changed():
+    cache = PlanCache()
+    key = cache.key('A(x) :- R(x,3)', 'datalog', 'logical')
+    cache.put(key, 'plan')
+    cache.catalog_changed()
+    assert key not in cache
+    assert_not_equals(key,
+                      cache.key('A(x) :- R(x,3)', 'datalog', 'logical'))
+
+
+class FakeConnection(object):
+    def __init__(self, datasets):
+        self._datasets = datasets
+        self.calls = []
+
+    def dataset(self, relation_key):
+        self.calls.append(('dataset', relation_key['relationName']))
+        for d in self._datasets:
+            if d['relationKey'] == relation_key:
+                return d
+        raise KeyError(relation_key)
+
+    def datasets(self):
+        self.calls.append(('datasets',))
+        return self._datasets
+
+    def workers_alive(self):
+        self.calls.append(('workers_alive',))
+        return [1, 2]
+
+
+def relation_key(name):
+    return {'userName': 'public', 'programName': 'adhoc',
+            'relationName': name}
+
+
+def test_catalog_cache_shares_dataset_lookups():
+    twitter = {'relationKey': relation_key('Twitter'), 'numTuples': 10}
+    conn = FakeConnection([twitter])
+    catalog = CatalogCache(conn)
+    assert_equals(catalog.dataset(relation_key('Twitter')), twitter)
+    assert_equals(catalog.dataset(relation_key('Twitter')), twitter)
+    assert_equals(catalog.workers_alive(), [1, 2])
+    assert_equals(catalog.workers_alive(), [1, 2])
+    assert_equals(conn.calls, [('dataset', 'Twitter'), ('workers_alive',)])
+    # missing relations are not cached
+    assert_raises(KeyError, catalog.dataset, relation_key('Missing'))
+    assert_raises(KeyError, catalog.dataset, relation_key('Missing'))
+
+
+def test_catalog_cache_warm_and_invalidate():
+    datasets = [{'relationKey': relation_key(n)} for n in ('R', 'S', 'T')]
+    conn = FakeConnection(datasets)
+    changes = []
+    catalog = CatalogCache(conn, on_change=lambda: changes.append(1))
+    catalog.warm()
+    for d in datasets:
+        catalog.dataset(d['relationKey'])
+    assert_equals(conn.calls, [('datasets',)])
+
+    catalog.invalidate(relation_key('R'))
+    catalog.dataset(relation_key('R'))
+    catalog.dataset(relation_key('S'))
+    assert_equals(conn.calls, [('datasets',), ('dataset', 'R')])
+    assert_equals(catalog.version, 1)
+    assert_equals(changes, [1])
+
+
+def test_catalog_cache_ttl():
+    clock = FakeClock()
+    conn = FakeConnection([])
+    catalog = CatalogCache(conn, workers_ttl=5, clock=clock)
+    catalog.workers_alive()
+    clock.now = 6
+    catalog.workers_alive()
+    assert_equals(conn.calls, [('workers_alive',), ('workers_alive',)])
+
+
+def test_refreshing_value():
+    clock = FakeClock()
+    values = iter(['first', 'second'])
+
+    def fetch():
+        return next(values)
+
+    value = RefreshingValue(fetch, ttl=10, clock=clock)
+    assert_equals(value.get(), 'first')
+    assert_equals(value.get(), 'first')
+    assert_equals(value.fetches, 1)
+
+    # the first reader to find the value stale refreshes it
+    clock.now = 10
+    assert_equals(value.get(), 'second')
+    assert_equals(value.fetches, 2)
+
+
+def test_refreshing_value_served_stale_during_refresh():
+    clock = FakeClock()
+    values = iter(['first', 'second'])
+    started = Event()
+    release = Event()
+
+    def fetch():
+        if value.fetches:
+            started.set()
+            release.wait(1)
+        return next(values)
+
+    value = RefreshingValue(fetch, ttl=10, clock=clock)
+    value.get()
+    clock.now = 10
+    results = []
+    refresher = Thread(target=lambda: results.append(value.get()))
+    refresher.start()
+    started.wait(1)
+    # readers do not wait for the refresh, nor start another
+    assert_equals(value.get(), 'first')
+    release.set()
+    refresher.join()
+    assert_equals(results, ['second'])
+    assert_equals(value.get(), 'second')
+    assert_equals(value.fetches, 2)
+
+
+def test_refreshing_value_error():
+    clock = FakeClock()
+    values = iter(['first', KeyError('second'), 'third'])
+
+    def fetch():
+        result = next(values)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    value = RefreshingValue(fetch, ttl=10, clock=clock)
+    value.get()
+    clock.now = 10
+    assert_raises(KeyError, value.get)
+    assert_equals(value.get(), 'third')
@@ -0,0 +1,86 @@
+from nose.tools import assert_equals
+
+from dataset_index import DatasetIndex, normalize_sort
+from pagination import (DatasetPagination, DATASETS_PER_PAGE,
+                        MAX_DATASETS_PER_PAGE)
+
+
+class FakeCatalogCache(object):
+    def __init__(self, datasets):
+        self.datasets = datasets
+        self.version = 0
+        self.warms = 0
+
+    def warm(self):
+        self.warms += 1
+        return self.datasets
+
+
+def dataset(user, program, name, num_tuples, created):
+    return {'relationKey': {'userName': user, 'programName': program,
+                            'relationName': name},
+            'numTuples': num_tuples, 'created': created}
+
+
+DATASETS = [dataset('public', 'adhoc', 'Twitter', 1000, '2014-02-09'),
+            dataset('public', 'adhoc', 'TwitterK', 10, '2014-02-10'),
+            dataset('jwang', 'adhoc', 'Twitter', -1, '2014-01-01'),
+            dataset('public', 'seaflow', 'opp', 500, '2014-03-01')]
+
+
+def names(datasets):
+    return [(d['relationKey']['userName'], d['relationKey']['relationName'])
+            for d in datasets]
+
+
+def test_normalize_sort():
+    assert_equals(normalize_sort(None), ('created', True))
+    assert_equals(normalize_sort('bogus', 'asc'), ('created', False))
+    assert_equals(normalize_sort('name'), ('name', False))
+    assert_equals(normalize_sort('size', 'asc'), ('size', False))
+
+
+def test_search_filters_and_sorts():
+    index = DatasetIndex(FakeCatalogCache(DATASETS))
+    assert_equals(names(index.search(name='twit', sort='size')),
+                  [('public', 'Twitter'), ('public', 'TwitterK'),
+                   ('jwang', 'Twitter')])
+    assert_equals(names(index.search(user='public', program='adhoc',
+                                     sort='created', order='asc')),
+                  [('public', 'Twitter'), ('public', 'TwitterK')])
+    assert_equals(index.search(user='nobody'), [])
+
+
+def test_listing_is_shared_until_the_catalog_changes():
+    catalog = FakeCatalogCache(DATASETS)
+    index = DatasetIndex(catalog)
+    index.search()
+    index.search(name='opp')
+    index.page(0, 2)
+    assert_equals(catalog.warms, 1)
+    catalog.version += 1
+    index.search()
+    assert_equals(catalog.warms, 2)
+
+
+def test_pages():
+    index = DatasetIndex(FakeCatalogCache(DATASETS))
+    args = {'limit': '3', 'offset': '3', 'sort': 'name', 'name': ''}
+    result = index.page(DatasetPagination.offset(args),
+                        DatasetPagination.limit(args), sort='name')
+    assert_equals(names(result['results']), [('public', 'TwitterK')])
+    assert_equals(result['total'], 4)
+
+    pagination = DatasetPagination(args, result)
+    assert pagination.has_prev
+    assert not pagination.has_next
+    assert_equals(pagination.prev_args, {'limit': 3, 'sort': 'name'})
+    assert_equals([p['current'] for p in pagination.iter_pages()],
+                  [False, True])
+
+
+def test_page_size_is_bounded():
+    assert_equals(DatasetPagination.limit({'limit': '1000000'}),
+                  MAX_DATASETS_PER_PAGE)
+    assert_equals(DatasetPagination.limit({'limit': 'all'}),
+                  DATASETS_PER_PAGE)
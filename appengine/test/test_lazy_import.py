@@ -0,0 +1,16 @@
+from nose.tools import assert_equals
+
+from lazy_import import LazyModule, is_loaded, load_all
+
+
+def test_lazy_module_imports_on_first_use():
+    colorsys = LazyModule('colorsys')
+    assert not is_loaded(colorsys)
+    assert_equals(colorsys.rgb_to_hsv(1.0, 0.0, 0.0), (0.0, 1.0, 1.0))
+    assert is_loaded(colorsys)
+
+
+def test_load_all():
+    sndhdr = LazyModule('sndhdr')
+    assert 'sndhdr' in load_all()
+    assert is_loaded(sndhdr)
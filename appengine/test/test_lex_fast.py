@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+import imp
+import os
+import random
+import shutil
+import sys
+import tempfile
+
+from nose.tools import assert_equals
+
+from calc_grammar import Calc, PROGRAM
+from ply import lex
+
+
+class Rules(object):
+    """Rules that the first character tables must get right: strings that
+    are prefixes of others, optional and zero-width prefixes, classes of
+    characters, ignored tokens, literals and a state for comments."""
+    tokens = ('EQ', 'ASSIGN', 'ARROW', 'MINUS', 'NUMBER', 'ID', 'WORD',
+              'STRING', 'OTHER', 'COMMENT')
+    literals = '(),;'
+    states = (('comment', 'exclusive'),)
+
+    t_EQ = r'=='
+    t_ASSIGN = r'='
+    t_ARROW = r'->'
+    t_MINUS = r'-'
+    t_NUMBER = r'-?\d+(\.\d*)?'
+    t_WORD = r'\b[A-Z]+\b'
+    t_STRING = r'"[^"\n]*"'
+    t_OTHER = u'[^\x00-\x7f]+'
+    t_ignore = ' \t'
+    t_ignore_HASH = r'\#[^\n]*'
+    t_comment_ignore = ''
+
+    def t_ID(self, t):
+        r'(?!__)[a-z_][a-z_0-9]*'
+        if t.value == 'end':
+            t.type = 'WORD'
+        return t
+
+    def t_newline(self, t):
+        r'\n+'
+        t.lexer.lineno += len(t.value)
+
+    def t_begin_comment(self, t):
+        r'/\*'
+        t.lexer.push_state('comment')
+
+    def t_comment_COMMENT(self, t):
+        r'\*/'
+        t.lexer.pop_state()
+        return t
+
+    def t_comment_body(self, t):
+        r'[^*]+|\*'
+
+    def t_comment_error(self, t):
+        t.lexer.skip(1)
+
+    def t_error(self, t):
+        t.lexer.skip(1)
+        if t.value[0] == '!':
+            t.type = 'OTHER'
+            t.value = '!'
+            return t
+
+
+ALPHABET = (list(' \t\n=->-.0123456789"#(),;!?*/_') + ['ab', 'END', 'x1'] +
+            [u'\xe9', u'☃'])
+
+
+def random_text(rng, length=200):
+    return u''.join(rng.choice(ALPHABET) for _ in xrange(length))
+
+
+def tokens(lexer, text):
+    """The token stream of text, ending with the error raised, if any."""
+    lexer = lexer.clone()
+    lexer.input(text)
+    stream = []
+    try:
+        for tok in lexer:
+            stream.append((tok.type, tok.value, tok.lineno, tok.lexpos))
+    except Exception as e:
+        stream.append((type(e), str(e), lexer.lexpos))
+    return stream
+
+
+def assert_same_tokens(module, texts, **kwargs):
+    plain = lex.lex(module=module, fast=0, **kwargs)
+    fast = lex.lex(module=module, fast=1, **kwargs)
+    assert_equals(isinstance(fast, lex.FastLexer), True)
+    for text in texts:
+        assert_equals(tokens(fast, text), tokens(plain, text))
+
+
+def test_random_texts():
+    rng = random.Random(1)
+    assert_same_tokens(Rules(), [random_text(rng) for _ in xrange(300)])
+
+
+def test_calc():
+    calc = Calc()
+    rng = random.Random(2)
+    texts = [PROGRAM, PROGRAM * 20, 'x = 1 $ 2;'] + [
+        ''.join(rng.choice('xy12+-*/=(); \n') for _ in xrange(100))
+        for _ in xrange(100)]
+    assert_same_tokens(calc, texts)
+
+
+def test_first_character_table():
+    lexer = lex.lex(module=Rules(), fast=1)
+    table, other = lexer.lexstatefirst['INITIAL']
+    # plain strings are matched without a regex
+    assert_equals(table['='], (((r'==', 'EQ'), (r'=', 'ASSIGN')), None))
+    assert_equals(table['('], ((), None))
+    # a number may start with a minus
+    strings, regexes = table['-']
+    assert_equals(strings, None)
+    names = set(name for lexre, _ in regexes for name in lexre.groupindex)
+    assert_equals(names, set(['t_ARROW', 't_MINUS', 't_NUMBER']))
+    # only the class of non-ASCII characters starts with one
+    strings, regexes = other
+    assert_equals([sorted(lexre.groupindex) for lexre, _ in regexes],
+                  [['t_OTHER']])
+
+
+def test_clone_with_object():
+    rules = Rules()
+    lexer = lex.lex(module=rules, fast=1)
+    other = Rules()
+    other.t_ID = lambda t: None
+    clone = lexer.clone(other)
+    assert_equals([t[0] for t in tokens(lexer, 'abc 1')], ['ID', 'NUMBER'])
+    # the functions of clone are those of the object
+    assert_equals([t[0] for t in tokens(clone, 'abc 1')], ['NUMBER'])
+
+
+def test_lextab():
+    directory = tempfile.mkdtemp()
+    sys.path.insert(0, directory)
+    try:
+        lex.lex(module=Rules(), optimize=1, lextab='fast_lextab',
+                outputdir=directory)
+        lextab = imp.load_source('fast_lextab',
+                                 os.path.join(directory, 'fast_lextab.py'))
+        rng = random.Random(3)
+        assert_same_tokens(Rules(), [random_text(rng) for _ in xrange(50)],
+                           optimize=1, lextab=lextab)
+    finally:
+        sys.path.remove(directory)
+        sys.modules.pop('fast_lextab', None)
+        shutil.rmtree(directory)
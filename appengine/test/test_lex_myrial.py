@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+from nose.tools import assert_equals
+
+from examples import myria_examples, sql_examples
+from ply import lex
+from raco.myrial import scanner
+
+# Programs that use every kind of Myrial token: comments over several lines
+# (which move the line number), literals of every type, keywords in any case
+# and the operators that are prefixes of others
+TEXTS = [code for _, code in myria_examples + sql_examples] + [
+    '''/* a comment
+          over lines */ T = scan(public:adhoc:Twitter); -- rest of line
+    x = [from T where $0 <= 1.5e3 and $1 >= .25 or $0 != 2 emit
+         $0, "a \\"quoted\\" string", 'single', b'\\x01\\xff'];
+    y = [from x order   by $0 emit *];
+    z = [from y where $0 <> 3 and $1 < 4 and $0 > 5 emit count(*)];
+    do x = x; while [from x emit max($0) < 10]; end
+    store(z, OUT);''',
+    # not ASCII: the one operator that is, and characters that are not valid
+    # anywhere but in strings
+    u'x = [from T where $0 ≠ 1 emit "été"];',
+    u'x = [from T emit $0];\n\n  é = 1;',
+    'x = [from T emit $0 ? 1];',
+]
+
+
+def tokens(lexer, text):
+    """The tokens of text, then the error that stopped the lexer (or
+    None)."""
+    lexer.input(text)
+    result = []
+    try:
+        for t in lexer:
+            result.append((t.type, t.value, t.lineno, t.lexpos))
+    except Exception as e:
+        # raco's rules raise MyrialScanException on characters that are not
+        # tokens, and UnicodeEncodeError on strings that are not ASCII
+        token = getattr(e, 'token', None)
+        if token is not None:
+            details = (token.value, token.lineno, token.lexpos)
+        else:
+            details = e.args
+        return result, (type(e).__name__, details, lexer.lexpos)
+    return result, None
+
+
+def test_fast_lexer_matches_lexer():
+    lexers = [lex.lex(module=scanner, fast=fast, errorlog=lex.NullLogger())
+              for fast in (0, 1)]
+    assert_equals([lexer.__class__ for lexer in lexers],
+                  [lex.Lexer, lex.FastLexer])
+    for text in TEXTS:
+        expected = tokens(lexers[0].clone(), text)
+        assert_equals(tokens(lexers[1].clone(), text), expected)
+        if text.startswith('/*'):
+            assert_equals(expected[0][0][2:], (2, 37))
+
+    # lexing one text after another, the line number carries over
+    plain, fast = [lexer.clone() for lexer in lexers]
+    for text in TEXTS:
+        assert_equals(tokens(fast, text), tokens(plain, text))
+        assert_equals(fast.lineno, plain.lineno)
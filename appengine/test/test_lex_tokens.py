@@ -0,0 +1,181 @@
+import random
+
+from nose.tools import assert_equals
+
+from calc_grammar import Calc, PROGRAM
+from ply import lex, yacc
+from test_lex_fast import Rules, random_text
+from test_yacc_tables import EXPECTED
+
+
+class Statements(object):
+    """Assignments with error recovery, recording what the parser tells the
+    rules and p_error about positions."""
+    tokens = ('NAME', 'NUMBER', 'EQUALS', 'SEMI')
+    t_EQUALS = r'='
+    t_SEMI = r';'
+    t_ignore = ' '
+    start = 'statements'
+
+    def __init__(self):
+        self.lexer = lex.lex(module=self)
+        self.parser = yacc.yacc(module=self, debug=0, write_tables=0,
+                                errorlog=yacc.NullLogger())
+
+    def parse(self, text, tracking, batch):
+        """The statements of text and the errors reported."""
+        self.errors = []
+        lexer = self.lexer.clone()
+        if batch:
+            value = self.parser.parse(tokens=lexer.tokenize_all(text),
+                                      tracking=tracking)
+        else:
+            value = self.parser.parse(text, lexer=lexer, tracking=tracking)
+        return value, self.errors
+
+    def t_NAME(self, t):
+        r'[a-z]+'
+        return t
+
+    def t_NUMBER(self, t):
+        r'\d+'
+        t.value = int(t.value)
+        return t
+
+    def t_newline(self, t):
+        r'\n+'
+        t.lexer.lineno += len(t.value)
+
+    def t_error(self, t):
+        t.lexer.skip(1)
+
+    def p_statements(self, p):
+        '''statements : statements statement
+                      | empty'''
+        if len(p) == 3:
+            p[0] = p[1] + [p[2]]
+        else:
+            p[0] = [p[1]]
+
+    def p_empty(self, p):
+        'empty :'
+        p[0] = ('start', p.lineno(0), p.lexpos(0))
+
+    def p_statement(self, p):
+        'statement : NAME EQUALS value SEMI'
+        p[0] = (p[1], p[3], p.lineno(1), p.lexspan(1), p.linespan(3),
+                p.lexspan(0))
+
+    def p_statement_error(self, p):
+        'statement : error SEMI'
+        p[0] = ('error', p.lineno(2), p.lexpos(2))
+
+    def p_value(self, p):
+        '''value : NUMBER
+                 | NAME'''
+        p[0] = p[1]
+
+    def p_error(self, p):
+        self.errors.append(p and (p.type, p.value, p.lineno, p.lexpos,
+                                  p.lexer.lexpos, p.lexer.lineno))
+
+
+def token_objects(lexer, text):
+    lexer = lexer.clone()
+    lexer.input(text)
+    return [(t.type, t.value, t.lineno, t.lexpos) for t in lexer]
+
+
+def assert_same_tokens(lexer, text):
+    expected = token_objects(lexer, text)
+    clone = lexer.clone()
+    tokens = clone.tokenize_all(text)
+    assert_equals(clone.lexpos, len(text))
+    assert_equals([(t.type, t.value, t.lineno, t.lexpos) for t in tokens],
+                  expected)
+    assert_equals([(tokens.type(i), tokens.value(i), tokens.lineno(i),
+                    tokens.lexpos(i)) for i in xrange(len(tokens))],
+                  expected)
+
+
+def test_tokens():
+    rng = random.Random(4)
+    texts = [random_text(rng) for _ in xrange(200)]
+    for fast in (0, 1):
+        lexer = lex.lex(module=Rules(), fast=fast)
+        for text in texts:
+            assert_same_tokens(lexer, text)
+
+
+def test_states():
+    # rules that change the state make the batch switch rules too
+    for fast in (0, 1):
+        lexer = lex.lex(module=Rules(), fast=fast)
+        assert_same_tokens(lexer, 'a /* b = 1 */ c /* */\n/* d */ = e')
+
+
+def test_values_of_functions():
+    lexer = lex.lex(module=Calc())
+    tokens = lexer.tokenize_all('x = 12 +\n 3;')
+    assert_equals(tokens.typenames,
+                  ['EQUALS', 'NAME', 'NUMBER', 'PLUS', 'SEMI'])
+    assert_equals(list(tokens.types), [1, 0, 2, 3, 2, 4])
+    assert_equals((list(tokens.starts), list(tokens.ends)),
+                  ([0, 2, 4, 7, 10, 11], [1, 3, 6, 8, 11, 12]))
+    assert_equals(list(tokens.linenos), [1, 1, 1, 1, 2, 2])
+    # only the values t_NUMBER made are kept
+    assert_equals(tokens.values, {2: 12, 4: 3})
+    assert_equals(tokens.objects, {})
+    assert_equals([tokens.value(i) for i in xrange(len(tokens))],
+                  ['x', '=', 12, '+', 3, ';'])
+
+
+def test_objects_of_functions():
+    rules = Rules()
+    lexer = lex.lex(module=rules)
+    tokens = lexer.tokenize_all('a end !')
+    assert_equals([tokens.type(i) for i in xrange(len(tokens))],
+                  ['ID', 'WORD', 'OTHER'])
+    # t_ID changed the type of the second token, which is kept with its
+    # value; the token t_error returned is kept as it is
+    assert_equals(tokens.values, {0: 'a', 1: 'end'})
+    assert_equals(sorted(tokens.objects), [2])
+    assert_equals(tokens.token(2) is tokens.objects[2], True)
+    assert_equals(tokens.value(2), '!')
+
+
+def test_parse_calc():
+    calc = Calc()
+    for fast in (0, 1):
+        lexer = lex.lex(module=calc, fast=fast)
+        tokens = lexer.tokenize_all(PROGRAM)
+        assert_equals(calc.parser.parse(tokens=tokens), EXPECTED)
+        assert_equals(calc.parser.parse(tokens=tokens, tracking=1), EXPECTED)
+        # the array can be parsed again, and by the other parse loops
+        assert_equals(calc.parser.parse(tokens=tokens,
+                                        debug=yacc.NullLogger()), EXPECTED)
+        assert_equals(calc.parser.parse(tokenfunc=tokens.tokenfunc()),
+                      EXPECTED)
+
+
+def test_parse_statements():
+    statements = Statements()
+    rng = random.Random(5)
+    words = ['a', 'bc', '=', ';', '1', '23', ' ', '\n', '?']
+    texts = ['', 'a = = 1; b = 2;\n c;'] + [
+        ''.join(rng.choice(words) for _ in xrange(30)) for _ in xrange(200)]
+    for text in texts:
+        assert_equals(statements.parse(text, 0, batch=True),
+                      statements.parse(text, 0, batch=False))
+
+
+def test_parse_statements_tracking():
+    # (not with errors: tracking fails on the error symbol in every loop)
+    statements = Statements()
+    rng = random.Random(6)
+    texts = ['', 'a = 1;\nb = c;'] + [
+        ''.join(rng.choice(['a = 1;', 'bc=d ;', '\n', '  ', '?'])
+                for _ in xrange(20)) for _ in xrange(50)]
+    for text in texts:
+        assert_equals(statements.parse(text, 1, batch=True),
+                      statements.parse(text, 1, batch=False))
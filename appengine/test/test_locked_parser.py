@@ -0,0 +1,62 @@
+from threading import Thread
+import time
+
+from nose.tools import assert_equals, assert_raises
+
+from locked_parser import LockedParser
+
+
+class SlowParser(object):
+    """A parser whose parses all use one object, like raco's."""
+    parsing = []
+    created = 0
+
+    def __init__(self):
+        SlowParser.created += 1
+        time.sleep(0.02)
+
+    def parse(self, text):
+        SlowParser.parsing.append(text)
+        try:
+            assert_equals(len(SlowParser.parsing), 1)
+            if text == 'error':
+                raise SyntaxError(text)
+            time.sleep(0.02)
+            return text.upper()
+        finally:
+            SlowParser.parsing.remove(text)
+
+
+def test_parse():
+    SlowParser.created = 0
+    parser = LockedParser(SlowParser)
+    assert_equals(parser.parse('x'), 'X')
+    assert_equals(parser.parse('y'), 'Y')
+    assert_equals(SlowParser.created, 1)
+    assert_equals(parser.stats['parses'], 2)
+    assert parser.stats['parse_time'] > 0
+    # creating the parser is not waiting for it
+    assert parser.stats['build_time'] > 0
+    assert parser.stats['wait_time'] < parser.stats['build_time']
+
+
+def test_parser_kept_after_error():
+    SlowParser.created = 0
+    parser = LockedParser(SlowParser)
+    assert_raises(SyntaxError, parser.parse, 'error')
+    assert_equals(parser.parse('x'), 'X')
+    assert_equals(SlowParser.created, 1)
+
+
+def test_one_parse_at_a_time():
+    parser = LockedParser(SlowParser)
+    results = []
+    threads = [Thread(target=lambda: results.append(parser.parse('q')))
+               for _ in range(6)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert_equals(results, ['Q'] * 6)
+    assert_equals(parser.stats['parses'], 6)
+    assert parser.stats['wait_time'] > 0
@@ -1,12 +1,16 @@
 from json import dumps as jstr
+import os
 import sys
+from threading import Thread
 import urlparse
 
 from httmock import all_requests, HTTMock
 from nose.tools import assert_equals
 from webtest import TestApp
 
+import compiler
 from myria_web_main import Application
+from profiling.columns import read_frame
 
 
 app = TestApp(Application(hostname='fake.fake', port=12345))
@@ -37,6 +41,12 @@ def mock_myria_get(url, request):
         body = {'max': ret[0]['queryId'], 'min': ret[-1]['queryId'],
                 'results': ret}
         return {'status_code': 200, 'content': body}
+    elif url.path in ('/logs/profiling', '/logs/sent'):
+        fragment_id = query_params['fragmentId'][0]
+        with open(os.path.join(os.path.dirname(__file__), os.pardir, 'data',
+                               '{}_4_{}.csv'.format(url.path[6:],
+                                                    fragment_id))) as f:
+            return {'status_code': 200, 'content': f.read()}
     elif url.path == '/query/query-140':
         return {'status_code': 201,
                 'headers': {'Location': 'http://fake.fake:12345/query/query-140'},
@@ -97,6 +107,42 @@ def test_queries_connects():
     assert 'query-131' in str(response)
 
 
+def test_query_log_json():
+    response = mock_get('/queries.json', {'limit': 3})
+    assert_equals(response.status_code, 200)
+    log = response.json
+    assert_equals([q['queryId'] for q in log['results']], [140, 139, 138])
+    assert_equals(log['latest'], 140)
+    assert_equals(log['results'][2]['bootstrapStatus'], 'danger')
+
+    # The same log again costs nothing
+    with HTTMock(mock_myria):
+        response = app.get('/queries.json', {'limit': 3},
+                           headers={'If-None-Match': response.headers['ETag']})
+    assert_equals(response.status_code, 304)
+
+    # Only queries changed since a time
+    response = mock_get('/queries.json', {
+        'limit': 3, 'changed': '2014-02-26T00:40:00.000-08:00'})
+    assert_equals([q['queryId'] for q in response.json['results']],
+                  [140, 139])
+
+
+def test_profile_histogram():
+    response = mock_get('/profile/range', {'queryId': 4, 'fragmentId': 0})
+    assert_equals(response.status_code, 200)
+    assert_equals(response.body.splitlines(),
+                  ['min_startTime,max_endTime', '738857,4298383040'])
+
+    response = mock_get('/profile/histogram', {
+        'queryId': 4, 'fragmentId': 0, 'start': 0, 'end': 4300000000,
+        'step': 100000000, 'onlyRootOp': 'true'})
+    assert_equals(response.status_code, 200)
+    lines = response.body.splitlines()
+    assert_equals(lines[0], 'nanoTime,numWorkers')
+    assert_equals(lines[1], '0,8')
+
+
 def test_datasets_connects():
     response = mock_get('/datasets')
     assert_equals(response.status_code, 200)
@@ -108,6 +154,17 @@ def test_datasets_connects():
     assert 'fake.fake:12345/dataset/user-public/program-adhoc/relation-TwitterK/data' in str(response)
 
 
+def test_datasets_search():
+    response = mock_get('/datasets', {'name': 'twitterk', 'sort': 'size'})
+    assert_equals(response.status_code, 200)
+    assert 'relation-TwitterK' in str(response)
+    assert 'relation-Twitter"' not in str(response)
+
+    response = mock_get('/datasets', {'user': 'nobody'})
+    assert_equals(response.status_code, 200)
+    assert 'No datasets' in str(response)
+
+
 def test_datalog():
     params = {'language': 'datalog',
               'query': 'A(x) :- Twitter(x,3)'}
@@ -153,6 +210,43 @@ def test_myrial():
     assert_equals(response.status_code, 201)
 
 
+def test_myrial_parses_in_threads():
+    # programs that start on different lines, half of them with an error
+    # whose message has its line number
+    texts = ['\n' * n + 'R = SCAN(public:adhoc:Twitter);\n'
+             'Ans = [FROM R WHERE $1=%d EMIT $0];\n'
+             'STORE(Ans%s justx);' % (n, ',' if n % 2 else '')
+             for n in range(8)]
+
+    def outcome(text):
+        try:
+            return len(compiler.myrial_parser.parse(text))
+        except compiler.MyrialCompileException as e:
+            return str(e)
+
+    expected = [outcome(text) for text in texts]
+    assert_equals(expected[1], 3)
+    assert_equals(expected[2], 'Parse error at token justx on line 5')
+    results = {}
+
+    def parse_all(n):
+        results[n] = [outcome(text) for text in texts * 5]
+
+    threads = [Thread(target=parse_all, args=(n,)) for n in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert_equals(results, dict((n, expected * 5) for n in range(4)))
+
+
+def test_myrial_lexer_is_fast():
+    # however raco was first imported (by the compiler or by keywords)
+    from ply import lex
+    from raco.myrial import scanner
+    assert_equals(isinstance(scanner.lexer, lex.FastLexer), True)
+
+
 def test_sql():
     params = {'language': 'sql',
               'query': '''R = SCAN(public:adhoc:Twitter);
@@ -218,3 +312,57 @@ def test_dot_sql():
     params['type'] = 'physical'
     response = mock_get('/dot', params)
     assert_equals(response.status_code, 200)
+
+
+def test_profile_intervals():
+    response = mock_get('/profile/intervals', {
+        'queryId': 4, 'fragmentId': 0, 'start': 0, 'end': 4300000000,
+        'minLength': 1000000000, 'onlyRootOp': 'true'})
+    assert_equals(response.status_code, 200)
+    lines = response.body.splitlines()
+    assert_equals(lines[0],
+                  'workerId,opId,startTime,endTime,numTuples,depth,count')
+    assert len(lines) > 1
+
+    params = {'queryId': 4, 'fragmentId': 0, 'start': 0, 'end': 4300000000,
+              'minLength': 1000000000, 'onlyRootOp': 'true',
+              'format': 'binary'}
+    response = mock_get('/profile/intervals', params)
+    assert_equals(response.content_type, 'application/octet-stream')
+    kind, columns = read_frame(response.body)
+    assert_equals(columns.keys(), lines[0].split(','))
+    assert_equals(len(columns['workerId']), len(lines) - 1)
+    with HTTMock(mock_myria):
+        part = app.get('/profile/intervals', params,
+                       headers={'Range': 'bytes=0-99'})
+    assert_equals(part.status_int, 206)
+    assert_equals(part.body, response.body[:100])
+
+
+def test_profile_shuffle():
+    response = mock_get('/profile/shuffle', {'queryId': 4, 'fragmentId': 2})
+    assert_equals(response.status_code, 200)
+    shuffle = response.json
+    assert_equals(len(shuffle['matrix']), len(shuffle['workers']))
+    assert_equals(sum(shuffle['timeBuckets']['numTuples']),
+                  shuffle['numTuples'])
+    assert_equals([f['fragmentId'] for f in shuffle['fragments']], [2])
+
+    response = mock_get('/profile/shuffle?queryId=4&fragmentId=0'
+                        '&fragmentId=1')
+    assert_equals(response.status_code, 200)
+    assert_equals(response.json['numTuples'],
+                  sum(f['numTuples'] for f in response.json['fragments']))
+
+
+def test_profile_tail():
+    params = {'queryId': 4, 'fragmentId': 1}
+    response = mock_get('/profile/tail', params)
+    assert_equals(response.status_code, 200)
+    assert_equals(response.json['reset'], True)
+
+    params['version'] = response.json['version']
+    response = mock_get('/profile/tail', params)
+    assert_equals(response.json['reset'], False)
+    assert_equals(response.json['version'], params['version'])
+    assert_equals(response.json['intervals'], [])
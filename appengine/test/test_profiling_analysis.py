@@ -0,0 +1,112 @@
+import os
+
+from nose.tools import assert_equals
+
+from profiling.analysis import FragmentAnalysis, query_report
+from profiling.logs import DirectoryLogs, read_events
+
+DATA = os.path.join(os.path.dirname(__file__), os.pardir, 'data')
+
+# A plan like that of the sample query: fragments 0 and 1 shuffle two
+# scans to fragment 2, which joins them and sends the result to fragment 3
+PLAN = [
+    {'fragmentIndex': 0, 'operators': [
+        {'opId': 'Shuffle(R)', 'opType': 'ShuffleProducer',
+         'argChild': 'Scan(R)'},
+        {'opId': 'Scan(R)', 'opType': 'DbQueryScan'}]},
+    {'fragmentIndex': 1, 'operators': [
+        {'opId': 'Shuffle(S)', 'opType': 'ShuffleProducer',
+         'argChild': 'Scan(S)'},
+        {'opId': 'Scan(S)', 'opType': 'DbQueryScan'}]},
+    {'fragmentIndex': 2, 'operators': [
+        {'opId': 'SendResult', 'opType': 'CollectProducer',
+         'argChild': 'Join'},
+        {'opId': 'Join', 'opType': 'SymmetricHashJoin',
+         'argChild1': 'GatherR', 'argChild2': 'GatherS'},
+        {'opId': 'GatherR', 'opType': 'ShuffleConsumer',
+         'argOperatorId': 'Shuffle(R)'},
+        {'opId': 'GatherS', 'opType': 'ShuffleConsumer',
+         'argOperatorId': 'Shuffle(S)'}]},
+    {'fragmentIndex': 3, 'operators': [
+        {'opId': 'Insert', 'opType': 'DbInsert', 'argChild': 'CollectResult'},
+        {'opId': 'CollectResult', 'opType': 'CollectConsumer',
+         'argOperatorId': 'SendResult'}]},
+]
+
+
+def events(*rows):
+    return read_events(['workerId,opName,nanoTime,numTuples,eventType'] +
+                       [','.join(str(v) for v in row) for row in rows])
+
+
+def test_self_time():
+    analysis = FragmentAnalysis(events((1, 'Send', 0, -1, 'call'),
+                                       (1, 'Join', 10, -1, 'call'),
+                                       (1, 'Scan', 15, -1, 'call'),
+                                       (1, 'Scan', 35, 8, 'return'),
+                                       (1, 'Join', 40, 3, 'return'),
+                                       (1, 'Scan', 50, -1, 'call'),
+                                       (1, 'Scan', 60, 2, 'return'),
+                                       (1, 'Send', 100, 3, 'return')))
+    ops = dict((op, stats.to_json()) for op, stats in analysis.ops.items())
+    assert_equals(ops['Send'], {'calls': 1, 'totalTime': 100,
+                                'selfTime': 60, 'numTuples': 3})
+    assert_equals(ops['Join'], {'calls': 1, 'totalTime': 30,
+                                'selfTime': 10, 'numTuples': 3})
+    assert_equals(ops['Scan'], {'calls': 2, 'totalTime': 30,
+                                'selfTime': 30, 'numTuples': 10})
+    # Join took 30 of Send's time and the direct Scan 10
+    assert_equals(analysis.critical_path(), ['Send', 'Join', 'Scan'])
+    assert_equals(analysis.workers[1].busy_time, 100)
+
+
+def test_stragglers():
+    analysis = FragmentAnalysis(events((1, 'Send', 0, -1, 'call'),
+                                       (1, 'Send', 10, 0, 'return'),
+                                       (2, 'Send', 0, -1, 'call'),
+                                       (2, 'Send', 12, 0, 'return'),
+                                       (3, 'Send', 0, -1, 'call'),
+                                       (3, 'Send', 50, 0, 'return')))
+    assert_equals(analysis.stragglers(), [(3, 38), (2, 0), (1, -2)])
+
+
+def test_sample_query():
+    logs = DirectoryLogs(DATA)
+    analyses = dict((f, FragmentAnalysis(read_events(
+        logs.fetch('profiling', 4, 0, f)))) for f in xrange(4))
+    report = query_report(analyses, PLAN)
+
+    assert_equals([f['fragmentId'] for f in report['criticalPath']][-2:],
+                  [2, 3])
+    assert_equals(report['criticalPath'][-1]['operators'],
+                  ['Insert', 'CollectResult'])
+    fragments = dict((f['fragmentId'], f) for f in report['fragments'])
+    assert_equals(fragments[2]['upstream'], [0, 1])
+    assert_equals(fragments[3]['upstream'], [2])
+
+    # only the consumers wait for other workers
+    waiting = [op['opId'] for op in fragments[2]['operators']
+               if op['waits']]
+    assert_equals(sorted(waiting), ['GatherR', 'GatherS'])
+    assert_equals(fragments[0]['shuffleWait'], 0)
+    assert_equals(fragments[2]['shuffleWait'] > 0, True)
+    assert_equals(report['shuffleWait'],
+                  sum(f['shuffleWait'] for f in fragments.values()))
+
+    # self times add up to the time of the root operators
+    for fragment_id, analysis in analyses.items():
+        assert_equals(sum(op['selfTime']
+                          for op in fragments[fragment_id]['operators']),
+                      sum(analysis.roots.values()))
+
+    lags = [s['lag'] for s in report['stragglers']]
+    assert_equals(lags, sorted(lags, reverse=True))
+
+
+def test_without_plan():
+    report = query_report({0: FragmentAnalysis(events(
+        (1, 'Send', 0, -1, 'call'), (1, 'Send', 10, 0, 'return')))})
+    assert_equals(report['criticalPath'],
+                  [{'fragmentId': 0, 'start': 0, 'end': 10,
+                    'operators': ['Send']}])
+    assert_equals(report['shuffleWait'], 0)
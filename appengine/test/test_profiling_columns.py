@@ -0,0 +1,135 @@
+from array import array
+import json
+import os
+import shutil
+import struct
+import tempfile
+
+from nose.tools import assert_equals, assert_raises
+
+from profiling.archive import DirectoryArchive, MemcacheArchive
+from profiling.columns import (DELTA, FRAME_ALIGNMENT, FormatError, frame,
+                               pack, read_frame, rows_frame, unpack)
+from profiling.logs import DirectoryLogs, EventLog, read_events
+from profiling.store import ProfileStore
+
+DATA = os.path.join(os.path.dirname(__file__), os.pardir, 'data')
+
+
+def test_frame():
+    times = array('l', [100, 1 << 40, 5])
+    flags = array('b', [1, 0, 1])
+    data = frame('example', [('time', times), ('flag', flags)])
+    kind, columns = read_frame(data)
+    assert_equals(kind, 'example')
+    assert_equals(columns['time'], [100.0, float(1 << 40), 5.0])
+    assert_equals(columns['flag'], [1, 0, 1])
+    header = json.loads(data[12:12 + struct.unpack('<I', data[8:12])[0]])
+    assert_equals([(c['name'], c['type']) for c in header['columns']],
+                  [('time', 'Float64'), ('flag', 'Int8')])
+    # every column can be viewed in place as a typed array
+    for column in header['columns']:
+        assert_equals(column['offset'] % FRAME_ALIGNMENT, 0)
+    assert_raises(FormatError, read_frame, 'MYRIACOL')
+
+
+def test_rows_frame():
+    rows = [(1, 'Scan', 10, 0.5), (2, 'Join', 20, 1.0), (1, 'Scan', 30, 2.5)]
+    kind, columns = read_frame(rows_frame(
+        'rows', ['workerId', 'opId', 'nanoTime', 'mean'], rows))
+    assert_equals(columns.keys(), ['workerId', 'opId', 'nanoTime', 'mean'])
+    assert_equals(zip(*columns.values()), rows)
+    kind, columns = read_frame(rows_frame('empty', ['a', 'b'], []))
+    assert_equals(columns, {'a': [], 'b': []})
+
+
+def test_pack_unpack():
+    times = array('l', [100, 250, 250, 1000])
+    codes = array('b', [0, 1, 1, 0])
+    data = pack('example', [('time', times), ('op', codes)],
+                dictionaries={'op': ['Scan', 'Join']},
+                encodings={'time': DELTA})
+    table = unpack(data)
+    assert_equals(table.kind, 'example')
+    assert_equals(table.rows, 4)
+    assert_equals(table.column('time'), times)
+    assert_equals(table.column('op'), codes)
+    assert_equals(table.dictionary('op'), ['Scan', 'Join'])
+    assert_raises(FormatError, unpack, 'not a table')
+
+
+def test_packed_log_is_smaller_than_csv():
+    lines = DirectoryLogs(DATA).fetch('profiling', 4, 0, 2)
+    log = read_events(lines)
+    data = log.pack()
+    assert len(data) * 5 < sum(len(line) + 1 for line in lines)
+    assert_equals(list(EventLog.unpack(data).rows()), list(log.rows()))
+
+
+class FakeMemcache(object):
+    def __init__(self):
+        self.values = {}
+
+    def get(self, key):
+        return self.values.get(key)
+
+    def get_multi(self, keys):
+        return dict((k, self.values[k]) for k in keys if k in self.values)
+
+    def set(self, key, value):
+        self.values[key] = value
+        return True
+
+    def set_multi(self, mapping):
+        self.values.update(mapping)
+        return []
+
+
+def test_memcache_archive_splits_large_blobs():
+    client = FakeMemcache()
+    archive = MemcacheArchive(client, chunk_size=10)
+    archive.put('log', 'x' * 25)
+    assert_equals(archive.get('log'), 'x' * 25)
+    assert_equals(len(client.values), 4)
+    # a lost chunk loses the blob
+    del client.values[archive.prefix + 'log/1']
+    assert_equals(archive.get('log'), None)
+    assert_equals(archive.get('missing'), None)
+
+
+def test_directory_archive():
+    path = tempfile.mkdtemp()
+    try:
+        archive = DirectoryArchive(path)
+        assert_equals(archive.get('log'), None)
+        log = read_events(DirectoryLogs(DATA).fetch('profiling', 4, 0, 0))
+        archive.put('log', log.pack())
+        assert_equals(list(EventLog.unpack(archive.get('log')).rows()),
+                      list(log.rows()))
+    finally:
+        shutil.rmtree(path)
+
+
+def test_store_archives_finished_queries_only():
+    archive = MemcacheArchive(FakeMemcache())
+    finished = set([4])
+
+    def store():
+        return ProfileStore(DirectoryLogs(DATA), archive=archive,
+                            is_finished=lambda query_id: query_id in finished)
+
+    first = store()
+    first.events(4, 0, 1)
+    first.sent(4, 0, 1)
+    # another instance (or a restarted one) reads them from the archive
+    second = store()
+    second.events(4, 0, 1)
+    second.sent(4, 0, 1)
+    assert_equals((first.downloads, second.downloads), (2, 0))
+    assert_equals(second.archive_hits, 2)
+
+    finished.clear()
+    third = store()
+    third.events(4, 0, 1)
+    third.events(4, 0, 1)
+    assert_equals(third.downloads, 2)
@@ -0,0 +1,103 @@
+import os
+import random
+
+from nose.tools import assert_equals
+
+from profiling.intervals import IntervalIndex, operator_intervals
+from profiling.logs import DirectoryLogs, EventLog, read_events
+
+DATA = os.path.join(os.path.dirname(__file__), os.pardir, 'data')
+
+
+def events(*rows):
+    return read_events(['workerId,opName,nanoTime,numTuples,eventType'] +
+                       [','.join(str(v) for v in row) for row in rows])
+
+
+def test_pairing():
+    log = events((1, 'Send', 0, -1, 'call'),
+                 (1, 'Scan', 10, -1, 'call'),
+                 (1, 'Scan', 20, 4, 'return'),
+                 (1, 'Send', 30, 4, 'return'),
+                 (2, 'Send', 5, -1, 'call'),
+                 (2, 'Send', 8, 0, 'return'))
+    intervals = list(operator_intervals(log))
+    assert_equals(sorted(intervals), [(1, 0, 'Send', 0, 30, 4),
+                                      (1, 1, 'Scan', 10, 20, 4),
+                                      (2, 0, 'Send', 5, 8, 0)])
+
+
+def test_unmatched_calls_are_closed():
+    log = events((1, 'Send', 0, -1, 'call'),
+                 (1, 'Scan', 10, -1, 'call'),
+                 (1, 'Send', 30, 4, 'return'),
+                 (1, 'Send', 40, -1, 'call'),
+                 (1, 'Send', 50, -1, 'eos'))
+    intervals = [interval[1:] for interval in operator_intervals(log)]
+    assert_equals(sorted(intervals), [(0, 'Send', 0, 30, 4),
+                                      (0, 'Send', 40, 50, -1),
+                                      (1, 'Scan', 10, 30, -1)])
+
+
+def random_log(seed, workers=3, calls=300):
+    rng = random.Random(seed)
+    log = EventLog()
+    for worker in xrange(workers):
+        time = 0
+        for _ in xrange(calls):
+            time += rng.randint(0, 50)
+            log.append(worker, 'Root', time, -1, 0)
+            if rng.random() < 0.5:
+                time += rng.randint(0, 20)
+                log.append(worker, 'Child', time, -1, 0)
+                time += rng.randint(0, 200)
+                log.append(worker, 'Child', time, 1, 1)
+            time += rng.randint(0, 100)
+            log.append(worker, 'Root', time, 2, 1)
+    return log
+
+
+def test_query_matches_brute_force():
+    log = random_log(1)
+    index = IntervalIndex(log)
+    everything = [(w, op, s, e, n, d, 1)
+                  for w, d, op, s, e, n in operator_intervals(log)]
+    assert_equals(len(index), len(everything))
+    rng = random.Random(2)
+    for _ in xrange(50):
+        start = rng.randint(0, 30000)
+        end = start + rng.randint(0, 5000)
+        min_length = rng.choice([0, 50, 150])
+        expected = sorted(i for i in everything
+                          if i[3] >= start and i[2] <= end and
+                          i[3] - i[2] >= min_length)
+        assert_equals(sorted(index.query(start, end, min_length)), expected)
+        assert_equals(
+            sorted(index.query(start, end, min_length, only_root=True)),
+            [i for i in expected if i[5] == 0])
+
+
+def test_merged_runs():
+    log = random_log(3)
+    index = IntervalIndex(log)
+    min_length = 400
+    merged = index.query(0, 10 ** 6, min_length, merge=True)
+    # every interval is accounted for exactly once
+    assert_equals(sum(i[6] for i in merged), len(index))
+    assert_equals(len(merged) < len(index), True)
+    for worker, op, start, end, tuples, depth, count in merged:
+        if count > 1:
+            assert_equals(end - start < min_length, True)
+    long_ones = [i for i in merged if i[3] - i[2] >= min_length]
+    assert_equals(sorted(long_ones), sorted(index.query(0, 10 ** 6,
+                                                        min_length)))
+
+
+def test_sample_fragment():
+    log = read_events(DirectoryLogs(DATA).fetch('profiling', 4, 0, 2))
+    index = IntervalIndex(log)
+    start, end = log.time_range
+    roots = index.query(start, end, only_root=True)
+    assert_equals(set(i[5] for i in roots), set([0]))
+    assert_equals(sum(i[6] for i in index.query(start, end, 10 ** 6,
+                                                merge=True)), len(index))
@@ -0,0 +1,131 @@
+import os
+
+from nose.tools import assert_equals
+
+from profiling.intervals import IntervalIndex
+from profiling.live import LiveProfile
+from profiling.logs import DirectoryLogs, EventLog, read_events
+from profiling.pyramid import ActivityPyramid, FragmentActivity, step_function
+
+DATA = os.path.join(os.path.dirname(__file__), os.pardir, 'data')
+
+
+def sample_log(fragment_id):
+    return read_events(DirectoryLogs(DATA).fetch('profiling', 4, 0,
+                                                 fragment_id))
+
+
+def until(log, end):
+    """The events of log up to time end, as if the query were still
+    running."""
+    partial = EventLog()
+    for i in xrange(len(log)):
+        if log.times[i] <= end:
+            partial.append(log.worker_ids[i], log.op_names[log.op_codes[i]],
+                           log.times[i], log.num_tuples[i],
+                           log.event_types[i])
+    return partial
+
+
+def test_extended_pyramid_matches_rebuilt():
+    changes = [(t, 1 if i % 2 == 0 else -1)
+               for i, t in enumerate(xrange(0, 10000, 7))]
+    whole = ActivityPyramid(*step_function(changes), base_buckets=64)
+    pyramid = ActivityPyramid(*step_function(changes[:10]), base_buckets=64)
+    for first in xrange(10, len(changes), 50):
+        pyramid = pyramid.extended(changes[first:first + 50])
+    assert_equals(list(pyramid.times), list(whole.times))
+    for step in (1, 50, 1000):
+        for stat in ('max', 'mean'):
+            assert_equals(pyramid.histogram(0, 10000, step, stat),
+                          whole.histogram(0, 10000, step, stat))
+
+
+def test_out_of_order_changes_rebuild():
+    pyramid = ActivityPyramid(*step_function([(10, 1), (20, -1)]))
+    extended = pyramid.extended([(5, 1), (15, -1)])
+    assert_equals(list(extended.times), [5, 10, 15, 20])
+    assert_equals(list(extended.counts), [1, 2, 1, 0])
+    assert_equals(list(pyramid.times), [10, 20])
+
+
+def test_live_profile_matches_finished_profile():
+    log = sample_log(2)
+    start, end = log.time_range
+    live = LiveProfile()
+    versions = []
+    for i in xrange(1, 6):
+        versions.append(live.ingest(until(log, start + (end - start) * i //
+                                          6)))
+    live.ingest(log, finished=True)
+    assert_equals(live.finished, True)
+    assert_equals(live.high_water_mark, end)
+
+    activity = FragmentActivity(log)
+    assert_equals(live.activity.time_range, activity.time_range)
+    assert_equals(list(live.activity.root.times),
+                  list(activity.root.times))
+    assert_equals(list(live.activity.root.counts),
+                  list(activity.root.counts))
+    step = (end - start) // 500
+    for op, pyramid in activity.ops.items():
+        assert_equals(live.activity.ops[op].histogram(start, end, step),
+                      pyramid.histogram(start, end, step))
+
+    index = IntervalIndex(log)
+    assert_equals(sorted(live.intervals.query(start, end)),
+                  sorted(index.query(start, end)))
+
+    # a client at the third version is sent everything since
+    version, intervals, changes = live.delta(versions[2])
+    assert_equals(version, live.version)
+    assert_equals(len(intervals) > 0, True)
+    assert_equals(live.delta(live.version), (live.version, [], []))
+    assert_equals(live.delta(live.version + 1), None)
+
+
+def test_ingesting_the_same_log_twice():
+    log = sample_log(0)
+    live = LiveProfile()
+    version = live.ingest(log)
+    assert_equals(live.ingest(log), version)
+    assert_equals(live.delta(version), (version, [], []))
+
+
+def profile(live):
+    start, end = live.activity.time_range
+    return (live.high_water_mark, sorted(live.marks.items()),
+            list(live.activity.root.times), list(live.activity.root.counts),
+            sorted(live.intervals.query(start, end)))
+
+
+def test_growing_lines_are_read_once():
+    lines = DirectoryLogs(DATA).fetch('profiling', 4, 0, 2)
+    read = []
+    live = LiveProfile()
+    whole = LiveProfile()
+    for i in xrange(1, 6):
+        grown = lines[:len(lines) * i // 6]
+        live.ingest_lines(grown)
+        whole.ingest(read_events(grown))
+        read.append(live.lines_read)
+        assert_equals(profile(live), profile(whole))
+    live.ingest_lines(lines, finished=True)
+    whole.ingest(read_events(lines), finished=True)
+    assert_equals(profile(live), profile(whole))
+    assert_equals(read, [len(lines) * i // 6 for i in xrange(1, 6)])
+
+
+def test_changed_lines_are_read_again():
+    lines = DirectoryLogs(DATA).fetch('profiling', 4, 0, 2)
+    half = len(lines) // 2
+    live = LiveProfile()
+    live.ingest_lines(lines[:half])
+    # the log is sent in another order: every line is read, and only the
+    # events after the high-water marks are new
+    reordered = lines[:1] + lines[:0:-1]
+    live.ingest_lines(reordered, finished=True)
+    whole = LiveProfile()
+    whole.ingest(read_events(lines[:half]))
+    whole.ingest(read_events(lines), finished=True)
+    assert_equals(profile(live), profile(whole))
@@ -0,0 +1,82 @@
+import csv
+import os
+
+from nose.tools import assert_equals
+
+from profiling.logs import DirectoryLogs, read_events
+from profiling.pyramid import ActivityPyramid, FragmentActivity, step_function
+from profiling.store import ProfileStore
+
+DATA = os.path.join(os.path.dirname(__file__), os.pardir, 'data')
+
+
+def sample_log(fragment_id):
+    return DirectoryLogs(DATA).fetch('profiling', 4, 0, fragment_id)
+
+
+def test_root_activity_matches_coordinator_histogram():
+    for fragment_id in (0, 1, 3):
+        activity = FragmentActivity(read_events(sample_log(fragment_id)))
+        histogram = DirectoryLogs(DATA).fetch('histogram', 4, 0, fragment_id)
+        expected = [(int(t), int(n))
+                    for t, n in list(csv.reader(histogram))[1:]]
+        assert_equals(zip(activity.root.times, activity.root.counts),
+                      expected)
+
+
+def test_interval_logs():
+    log = read_events(['workerId,opId,startTime,endTime,numTuples',
+                       '1,V1,10,20,5',
+                       '2,V1,15,30,7'])
+    activity = FragmentActivity(log)
+    assert_equals(list(activity.root.times), [10, 15, 20, 30])
+    assert_equals(list(activity.root.counts), [1, 2, 1, 0])
+    assert_equals(activity.ops.keys(), ['V1'])
+
+
+def test_histogram():
+    # two workers: one active over [0, 100), the other over [50, 60)
+    pyramid = ActivityPyramid(*step_function(
+        [(0, 1), (100, -1), (50, 1), (60, -1)]), base_buckets=10)
+    assert_equals(pyramid.histogram(0, 100, 50),
+                  [(0, 1), (50, 2)])
+    assert_equals(pyramid.histogram(0, 100, 50, stat='mean'),
+                  [(0, 1.0), (50, 1.2)])
+    # finer than the finest level, answered from the exact activity
+    assert_equals(pyramid.histogram(40, 70, 5),
+                  [(40, 1), (45, 1), (50, 2), (55, 2), (60, 1), (65, 1)])
+    # buckets without active workers are left out
+    assert_equals(pyramid.histogram(-100, 0, 50), [])
+
+
+def test_pyramid_levels_agree_with_exact_activity():
+    root = FragmentActivity(read_events(sample_log(2))).root
+    # a single bucket of the whole query: every histogram is computed from
+    # the exact activity
+    exact = ActivityPyramid(root.times, root.counts, base_buckets=1)
+    width = root.levels[0][0]
+    # buckets aligned with the pyramid's, and buckets that are not
+    for start, step in ((root.start, width * 8),
+                        (root.start - 12345, width * 5 + 77)):
+        for stat in ('max', 'mean'):
+            from_levels = root.histogram(start, root.end, step, stat)
+            assert from_levels
+            assert_equals(
+                [(t, round(n, 6)) for t, n in from_levels],
+                [(t, round(n, 6)) for t, n
+                 in exact.histogram(start, root.end, step, stat)])
+
+
+def test_store_downloads_each_log_once():
+    fetches = []
+
+    class CountingLogs(DirectoryLogs):
+        def fetch(self, *args):
+            fetches.append(args)
+            return DirectoryLogs.fetch(self, *args)
+
+    store = ProfileStore(CountingLogs(DATA))
+    store.activity(4, 0, 0)
+    store.activity(4, 0, 0)
+    store.events('4', '0', '0')
+    assert_equals(fetches, [('profiling', 4, 0, 0)])
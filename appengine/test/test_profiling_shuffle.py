@@ -0,0 +1,74 @@
+from collections import defaultdict
+import os
+
+from nose.tools import assert_equals
+
+from profiling.logs import DirectoryLogs, read_sent
+from profiling.shuffle import ShuffleMatrix, skew
+
+DATA = os.path.join(os.path.dirname(__file__), os.pardir, 'data')
+
+
+def sent(*rows):
+    return read_sent(['workerId,nanoTime,numTuples,destWorkerId'] +
+                     [','.join(str(v) for v in row) for row in rows])
+
+
+def test_matrix():
+    matrix = ShuffleMatrix.from_log(sent((1, 0, 10, 2),
+                                         (1, 50, 5, 1),
+                                         (2, 99, 7, 1),
+                                         (1, 20, 3, 2)))
+    assert_equals(matrix.workers, [1, 2])
+    assert_equals(matrix.rows(), [[5, 13], [7, 0]])
+    assert_equals(matrix.sources, [18, 7])
+    assert_equals(matrix.destinations, [12, 13])
+    assert_equals(matrix.num_tuples, 25)
+    assert_equals(matrix.local_tuples, 5)
+    assert_equals(matrix.duration, 99)
+    assert_equals(sorted(matrix.cells()), [(1, 1, 5), (1, 2, 13), (2, 1, 7)])
+
+    start, step, buckets = matrix.buckets
+    assert_equals((start, step), (0, 1))
+    assert_equals((buckets[0], buckets[20], buckets[50], buckets[99]),
+                  (10, 3, 5, 7))
+    assert_equals(sum(buckets), 25)
+
+
+def test_empty_log():
+    matrix = ShuffleMatrix.from_log(sent())
+    assert_equals(matrix.workers, [])
+    assert_equals(matrix.num_tuples, 0)
+    assert_equals(matrix.summary()['sourceSkew'], None)
+
+
+def test_skew():
+    assert_equals(skew([5, 5, 5, 5])['maxOverMean'], 1.0)
+    assert_equals(skew([5, 5, 5, 5])['cv'], 0.0)
+    stats = skew([0, 0, 0, 8])
+    assert_equals((stats['min'], stats['max'], stats['mean']), (0, 8, 2.0))
+    assert_equals(stats['maxOverMean'], 4.0)
+    assert_equals(skew([0, 0])['maxOverMean'], None)
+
+
+def test_merge():
+    first = ShuffleMatrix.from_log(sent((1, 0, 10, 2)))
+    second = ShuffleMatrix.from_log(sent((3, 0, 4, 1), (1, 5, 1, 2)))
+    total = ShuffleMatrix.merge([first, second])
+    assert_equals(total.workers, [1, 2, 3])
+    assert_equals(sorted(total.cells()), [(1, 2, 11), (3, 1, 4)])
+    assert_equals(total.buckets, None)
+
+
+def test_sample_matches_raw_rows():
+    for fragment_id in (0, 1, 2):
+        log = read_sent(DirectoryLogs(DATA).fetch('sent', 4, 0, fragment_id))
+        expected = defaultdict(int)
+        for src, _, num_tuples, dest in log.rows():
+            expected[(src, dest)] += num_tuples
+        matrix = ShuffleMatrix.from_log(log)
+        assert_equals(dict(((s, d), n) for s, d, n in matrix.cells()),
+                      dict((k, n) for k, n in expected.items() if n))
+        summary = matrix.summary()
+        assert_equals(sum(summary['timeBuckets']['numTuples']),
+                      summary['numTuples'])
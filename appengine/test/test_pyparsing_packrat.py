@@ -0,0 +1,102 @@
+import threading
+
+from nose.tools import assert_equals
+
+import pyparsing as pp
+
+
+def arithmetic():
+    operand = pp.Word(pp.nums) | pp.Word(pp.alphas)
+    return pp.operatorPrecedence(operand, [
+        (pp.oneOf('* /'), 2, pp.opAssoc.LEFT),
+        (pp.oneOf('+ -'), 2, pp.opAssoc.LEFT),
+        (pp.oneOf('< ='), 2, pp.opAssoc.LEFT),
+        (pp.Keyword('AND'), 2, pp.opAssoc.LEFT),
+    ])
+
+
+TEXT = '(a + (b * (c - 1))) = x AND (y + 2) * z < 3'
+EXPECTED = [[[['a', '+', ['b', '*', ['c', '-', '1']]], '=', 'x'], 'AND',
+             [[['y', '+', '2'], '*', 'z'], '<', '3']]]
+
+
+class Memo(pp.ParserElement):
+    """An element recording the memo its parse attempts are made with."""
+    memos = []
+
+    def parseImpl(self, instring, loc, doActions=True):
+        Memo.memos.append(pp._packratState.cache)
+        return loc, []
+
+
+def test_enabled_by_default():
+    assert_equals(pp.ParserElement._parse == pp.ParserElement._parseCache,
+                  True)
+    assert_equals(arithmetic().parseString(TEXT, parseAll=True).asList(),
+                  EXPECTED)
+
+
+def test_memo_per_parse():
+    Memo.memos = []
+    grammar = Memo() + pp.Word(pp.alphas)
+    grammar.parseString('a')
+    grammar.parseString('b')
+    first, second = Memo.memos
+    assert_equals(first is not second, True)
+    assert_equals(first.instring, 'a')
+    # the memo is gone once the parse is over
+    assert_equals(pp._packratState.cache, None)
+    assert_equals([t[0] for t, _, _ in grammar.scanString('x y')],
+                  ['x', 'y'])
+    assert_equals(pp._packratState.cache, None)
+
+
+def test_bounded():
+    cache = pp._PackratCache('text', 3)
+    for loc in range(5):
+        cache.add((1, loc, True, True), loc)
+    assert_equals(sorted(cache.results),
+                  [(1, loc, True, True) for loc in (2, 3, 4)])
+    try:
+        # a small memo still gives the same results
+        pp.ParserElement.enablePackrat(5)
+        assert_equals(arithmetic().parseString('a + 1 = b').asList(),
+                      [[['a', '+', '1'], '=', 'b']])
+    finally:
+        pp.ParserElement.enablePackrat(10000)
+
+
+def test_results_are_copied():
+    # alternatives sharing a prefix append to its results, which must not
+    # change the memoized ones
+    a = pp.Word('a')
+    b = pp.Word('b')
+    grammar = (a + 'q') | (a + b + 'x') | (a + b + 'y')
+    assert_equals(grammar.parseString('a b y').asList(), ['a', 'b', 'y'])
+
+
+def test_disabled():
+    try:
+        pp.ParserElement.disablePackrat()
+        Memo.memos = []
+        (Memo() + 'a').parseString('a')
+        assert_equals(Memo.memos, [None])
+    finally:
+        pp.ParserElement.enablePackrat()
+    assert_equals(pp.ParserElement._parse == pp.ParserElement._parseCache,
+                  True)
+
+
+def test_threads():
+    grammar = arithmetic()
+    results = {}
+
+    def parse(n):
+        results[n] = [grammar.parseString(TEXT).asList() for _ in range(5)]
+
+    threads = [threading.Thread(target=parse, args=(n,)) for n in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert_equals(results, dict((n, [EXPECTED] * 5) for n in range(4)))
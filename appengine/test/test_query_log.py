@@ -0,0 +1,34 @@
+from nose.tools import assert_equals
+
+from query_log import annotate, changed_since, nano_to_str, parse_timestamp
+
+
+def test_parse_timestamp():
+    assert_equals(parse_timestamp('1970-01-01T00:00:10Z'), 10)
+    assert_equals(parse_timestamp('1970-01-01T00:00:10.5'), 10.5)
+    # Myria reports times in the coordinator's zone
+    assert_equals(parse_timestamp('1969-12-31T16:00:10.000-08:00'), 10)
+    assert_equals(parse_timestamp('1970-01-01T01:00:10+0100'), 10)
+    assert_equals(parse_timestamp('yesterday'), None)
+    assert_equals(parse_timestamp(None), None)
+
+
+def test_changed_since():
+    queries = [{'queryId': 3, 'status': 'RUNNING',
+                'submitTime': '2014-02-26T15:10:37.718-08:00'},
+               {'queryId': 2, 'status': 'SUCCESS',
+                'submitTime': '2014-02-26T15:00:00.000-08:00',
+                'finishTime': '2014-02-26T15:10:38.648-08:00'},
+               {'queryId': 1, 'status': 'KILLED',
+                'submitTime': '2014-02-25T23:59:33.023-08:00',
+                'finishTime': '2014-02-25T23:59:33.337-08:00'}]
+    since = parse_timestamp('2014-02-26T15:05:00-08:00')
+    assert_equals([q['queryId'] for q in changed_since(queries, since)],
+                  [3, 2])
+
+
+def test_annotate():
+    query = annotate({'status': 'ERROR', 'elapsedNanos': 61 * 10 ** 9})
+    assert_equals(query['bootstrapStatus'], 'danger')
+    assert_equals(query['elapsedStr'], nano_to_str(61 * 10 ** 9))
+    assert_equals(annotate({'status': 'UNKNOWN'})['elapsedStr'], None)
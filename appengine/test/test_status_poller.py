@@ -0,0 +1,110 @@
+from threading import Thread
+
+from nose.tools import assert_equals, assert_raises
+
+from status_poller import QueryStatusPoller
+
+
+class FakeConnection(object):
+    def __init__(self, statuses):
+        self.statuses = statuses
+        self.calls = []
+
+    def get_query_status(self, query_id):
+        self.calls.append(('status', query_id))
+        if query_id not in self.statuses:
+            raise KeyError(query_id)
+        return {'queryId': query_id, 'status': self.statuses[query_id]}
+
+    def queries(self, limit, min_id, max_id):
+        self.calls.append(('queries', min_id, max_id))
+        return {'results': [{'queryId': q, 'status': s}
+                            for q, s in self.statuses.items()
+                            if min_id <= q <= max_id]}
+
+
+class FakeClock(object):
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_status_snapshot_is_shared():
+    conn = FakeConnection({7: 'RUNNING'})
+    clock = FakeClock()
+    poller = QueryStatusPoller(conn, clock=clock)
+    assert_equals(poller.status(7)['status'], 'RUNNING')
+    assert_equals(poller.status('7')['status'], 'RUNNING')
+    assert_equals(conn.calls, [('status', 7)])
+    # the snapshot goes stale after the poll interval
+    clock.now = 5
+    conn.statuses[7] = 'SUCCESS'
+    assert_equals(poller.status(7)['status'], 'SUCCESS')
+    # finished queries are never polled again
+    clock.now = 500
+    poller.status(7)
+    assert_equals(conn.calls, [('status', 7), ('status', 7)])
+
+
+def test_status_error():
+    poller = QueryStatusPoller(FakeConnection({}))
+    assert_raises(KeyError, poller.status, 3)
+
+
+def test_wait_returns_changes_and_batches():
+    conn = FakeConnection({1: 'RUNNING', 2: 'RUNNING', 3: 'ACCEPTED'})
+    succeeded = []
+    poller = QueryStatusPoller(conn, on_success=lambda: succeeded.append(1))
+    # nothing is known yet, so the first wait returns immediately
+    statuses = poller.wait({1: None, 2: None, 3: None})
+    assert_equals(sorted(statuses), [1, 2, 3])
+
+    conn.calls = []
+    conn.statuses[3] = 'SUCCESS'
+    results = []
+    thread = Thread(target=lambda: results.append(poller.wait(
+        {1: 'RUNNING', 2: 'RUNNING', 3: 'ACCEPTED'}, timeout=10)))
+    thread.start()
+    thread.join()
+    assert_equals(results[0][3]['status'], 'SUCCESS')
+    # one listing, plus a full status for the query that changed
+    assert_equals(conn.calls, [('queries', 1, 3), ('status', 3)])
+    assert_equals(succeeded, [1])
+
+
+def test_success_seen_first_is_not_a_change():
+    conn = FakeConnection({4: 'SUCCESS', 5: 'RUNNING'})
+    clock = FakeClock()
+    succeeded = []
+    poller = QueryStatusPoller(conn, on_success=lambda: succeeded.append(1),
+                               clock=clock)
+    poller.status(4)
+    poller.status(5)
+    assert_equals(succeeded, [])
+    clock.now = 5
+    conn.statuses[5] = 'SUCCESS'
+    poller.status(5)
+    assert_equals(succeeded, [1])
+
+
+def test_submitted_query_finished_before_first_poll():
+    conn = FakeConnection({6: 'SUCCESS'})
+    succeeded = []
+    poller = QueryStatusPoller(conn, on_success=lambda: succeeded.append(1))
+    poller.submitted({'queryId': 6, 'status': 'ACCEPTED'})
+    assert_equals(poller.status(6)['status'], 'SUCCESS')
+    assert_equals(succeeded, [1])
+    # a query that had already succeeded when submitted counts once
+    conn.statuses[8] = 'SUCCESS'
+    poller.submitted({'queryId': 8, 'status': 'SUCCESS'})
+    poller.status(8)
+    assert_equals(succeeded, [1, 1])
+
+
+def test_wait_timeout():
+    conn = FakeConnection({1: 'RUNNING'})
+    poller = QueryStatusPoller(conn)
+    statuses = poller.wait({1: 'RUNNING'}, timeout=0.1)
+    assert_equals(statuses[1]['status'], 'RUNNING')
@@ -0,0 +1,143 @@
+import imp
+import os
+import shutil
+import sys
+import tempfile
+import types
+
+from nose.tools import assert_equals, assert_not_equals, assert_raises
+
+from calc_grammar import Calc, PROGRAM
+from parser_tables import grammar_info, grammar_of
+from ply import yacc
+from test_yacc_construction import random_grammar
+from test_yacc_tables import EXPECTED, no_generation
+
+
+def without_errors(rows):
+    """The rows of a table without their None (forced error) entries."""
+    return dict((state, dict((sym, v) for sym, v in row.items()
+                             if v is not None))
+                for state, row in rows.items())
+
+
+def calc_tables():
+    return yacc.LRGeneratedTable(grammar_of(grammar_info(Calc())), 'LALR')
+
+
+def test_random_tables():
+    for seed in xrange(50):
+        try:
+            lr = yacc.LRGeneratedTable(random_grammar(seed), 'LALR')
+        except yacc.LALRError:
+            continue
+        for rows in (lr.lr_action, lr.lr_goto):
+            table = yacc.CombTable.from_rows(rows)
+            assert_equals(table.rows(), without_errors(rows))
+            # every slot belongs to one state, so lookups of symbols a
+            # state has no entry for find nothing
+            for state, row in without_errors(rows).items():
+                for sym in table.symbols + ['unknown']:
+                    assert_equals(table.get(state, sym, 'none'),
+                                  row.get(sym, 'none'))
+
+            unpacked = yacc.CombTable.unpack(table.pack())
+            assert_equals(unpacked.symbols, table.symbols)
+            assert_equals((unpacked.base, unpacked.check, unpacked.value),
+                          (table.base, table.check, table.value))
+
+
+def test_calc_parses():
+    calc = Calc()
+    assert_equals(calc.parse(PROGRAM), EXPECTED)
+    lr = calc_tables()
+    assert_equals(calc.parser.action, without_errors(lr.lr_action))
+    assert_equals(calc.parser.goto, without_errors(lr.lr_goto))
+    for text in ('x = ;', 'x = 1 +* 2;', 'x = (1;', 'x = 1'):
+        assert_raises(SyntaxError, calc.parse, text)
+
+
+def test_dictionary_tables_are_read():
+    lr = calc_tables()
+    parsetab = types.ModuleType('calc_dict_parsetab')
+    parsetab._tabversion = yacc.__tabversion__
+    parsetab._lr_method = 'LALR'
+    parsetab._lr_signature = grammar_info(Calc()).signature()
+    parsetab._lr_action = lr.lr_action
+    parsetab._lr_goto = lr.lr_goto
+    parsetab._lr_productions = yacc._production_tuples(lr.lr_productions)
+
+    generate = yacc.LRGeneratedTable
+    yacc.LRGeneratedTable = no_generation
+    try:
+        calc = Calc(tabmodule=parsetab)
+    finally:
+        yacc.LRGeneratedTable = generate
+    assert_equals(calc.parse(PROGRAM), EXPECTED)
+
+
+def test_written_tables_are_read():
+    directory = tempfile.mkdtemp()
+    try:
+        lr = calc_tables()
+        lr.write_table('calc_comb_parsetab', directory,
+                       grammar_info(Calc()).signature())
+        parsetab = imp.load_source(
+            'calc_comb_parsetab',
+            os.path.join(directory, 'calc_comb_parsetab.py'))
+        del sys.modules['calc_comb_parsetab']
+        assert_equals(hasattr(parsetab, '_lr_action'), False)
+        # PLYs that only know dictionary tables reject the file's version
+        assert_equals(parsetab._tabversion, yacc.__combtabversion__)
+        assert_not_equals(parsetab._tabversion, yacc.__tabversion__)
+        parsetab._tabversion = yacc.__tabversion__
+        assert_raises(yacc.VersionError, yacc.LRTable().read_table, parsetab)
+        parsetab._tabversion = yacc.__combtabversion__
+
+        generate = yacc.LRGeneratedTable
+        yacc.LRGeneratedTable = no_generation
+        try:
+            calc = Calc(tabmodule=parsetab)
+        finally:
+            yacc.LRGeneratedTable = generate
+        assert_equals(calc.parser.action, without_errors(lr.lr_action))
+        assert_equals(calc.parse(PROGRAM), EXPECTED)
+    finally:
+        shutil.rmtree(directory)
+
+
+def test_read_tables_are_written():
+    directory = tempfile.mkdtemp()
+    try:
+        lr = calc_tables()
+        signature = grammar_info(Calc()).signature()
+        binary = os.path.join(directory, 'calc.tables')
+        lr.write_binary_table(binary, signature)
+        yacc._binary_tables.clear()
+        read = yacc.LRTable()
+        read.read_binary_table(binary)
+        assert_equals(read.lr_action, None)
+
+        # the writers rebuild the dictionaries from the compact tables
+        pickled = os.path.join(directory, 'calc.pickle')
+        read.pickle_table(pickled, signature)
+        read.write_table('calc_read_parsetab', directory, signature)
+        tables = (without_errors(lr.lr_action), without_errors(lr.lr_goto))
+        reread = yacc.LRTable()
+        assert_equals(reread.read_pickle(pickled), signature)
+        assert_equals((reread.lr_action, reread.lr_goto), tables)
+        reread = yacc.LRTable()
+        parsetab = imp.load_source(
+            'calc_read_parsetab',
+            os.path.join(directory, 'calc_read_parsetab.py'))
+        del sys.modules['calc_read_parsetab']
+        assert_equals(reread.read_table(parsetab), signature)
+        assert_equals(reread.expand(), tables)
+    finally:
+        shutil.rmtree(directory)
+
+
+def test_rows_are_built_once():
+    calc = Calc()
+    assert_equals(calc.parser.action is calc.parser.action, True)
+    assert_equals(calc.parser.goto is calc.parser.goto, True)
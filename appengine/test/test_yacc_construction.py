@@ -0,0 +1,58 @@
+import random
+
+from nose.tools import assert_equals
+
+from calc_grammar import Calc
+from parser_tables import grammar_info, grammar_of
+from ply import yacc
+
+
+def random_grammar(seed, nonterminals=8, terminals=6, productions=20):
+    """A random grammar with empty productions, left and right recursion
+    and precedence, over nonterminals N0.. and terminals t0..."""
+    rng = random.Random(seed)
+    names = ['N%d' % i for i in xrange(nonterminals)]
+    tokens = ['t%d' % i for i in xrange(terminals)]
+    grammar = yacc.Grammar(tokens)
+    for level, token in enumerate(tokens[:3]):
+        grammar.set_precedence(token, rng.choice(['left', 'right']), level + 1)
+    rules = [(name, [] if rng.random() < 0.3 else [rng.choice(tokens)])
+             for name in names]
+    while len(rules) < productions:
+        length = rng.choice([0, 1, 2, 2, 3, 3, 4])
+        rule = (rng.choice(names),
+                [rng.choice(names + tokens) for _ in xrange(length)])
+        if rule not in rules:
+            rules.append(rule)
+    for line, (name, symbols) in enumerate(rules):
+        grammar.add_production(name, symbols, 'p_%d' % line, 'random', line)
+    grammar.set_start('N0')
+    return grammar
+
+
+def assert_same_tables(grammar, method, *args):
+    tables = []
+    for fast in (0, 1):
+        try:
+            lr = yacc.LRGeneratedTable(grammar(*args), method, fast=fast)
+        except yacc.LALRError as e:
+            # some random grammars make PLY give up, as it should either way
+            tables.append(str(e))
+        else:
+            tables.append((lr.lr_action, lr.lr_goto, sorted(lr.sr_conflicts),
+                           sorted((st, chosen.number, rejected.number)
+                                  for st, chosen, rejected in lr.rr_conflicts),
+                           [p.reduced for p in lr.lr_productions]))
+    assert_equals(tables[0], tables[1])
+
+
+def test_same_tables_as_reference():
+    for seed in xrange(100):
+        for method in ('LALR', 'SLR'):
+            yield assert_same_tables, random_grammar, method, seed
+
+
+def test_calc_tables():
+    def grammar():
+        return grammar_of(grammar_info(Calc()))
+    assert_same_tables(grammar, 'LALR')
@@ -0,0 +1,120 @@
+import random
+
+from nose.tools import assert_equals, assert_raises
+
+from calc_grammar import Calc
+from test_lex_tokens import Statements
+from test_yacc_session import Skipping
+
+
+def program(n):
+    return ''.join('v%d = v%d * (%d + x);\n' % (i, i - 1, i)
+                   for i in xrange(n))
+
+
+def edit(rng, text):
+    """text with a few characters replaced, inserted or deleted."""
+    start = rng.randrange(len(text) + 1)
+    end = min(len(text), start + rng.randrange(3))
+    return text[:start] + ''.join(rng.choice('xy12+*(); \n')
+                                  for _ in xrange(rng.randrange(3))) + \
+        text[end:]
+
+
+def outcome(parse, text):
+    try:
+        return parse(text)
+    except SyntaxError as e:
+        return str(e)
+
+
+def test_edits():
+    calc = Calc()
+    incremental = calc.parser.incremental('statement', calc.lexer)
+    rng = random.Random(9)
+    text = program(30)
+    for _ in xrange(300):
+        # an edit, or, after an error, its undoing
+        if isinstance(outcome(calc.parse, text), str) and rng.random() < 0.5:
+            text = program(30)
+        else:
+            text = edit(rng, text)
+        assert_equals(outcome(incremental.parse, text),
+                      outcome(calc.parse, text))
+
+
+def test_only_the_edit_is_parsed():
+    calc = Calc()
+    incremental = calc.parser.incremental('statement', calc.lexer)
+    text = program(100)
+    assert_equals(incremental.parse(text), calc.parse(text))
+    assert_equals((incremental.resumed, incremental.reused), (0, 0))
+
+    # a change to statement 50 restarts after statement 49, and reuses the
+    # statements after 50
+    start = text.index('v50 =')
+    edited = text[:start] + 'w' + text[start + 1:]
+    assert_equals(incremental.parse(edited), calc.parse(edited))
+    assert_equals((incremental.resumed, incremental.reused),
+                  (start - 1, 49))
+
+    # so do insertions of lines, which move the statements after them
+    inserted = edited[:start] + 'y = 1;\n\n' + edited[start:]
+    assert_equals(incremental.parse(inserted), calc.parse(inserted))
+    assert_equals((incremental.resumed, incremental.reused),
+                  (start - 1, 49))
+    symbols = incremental.statements
+    last = inserted.rindex('v99')
+    assert_equals((symbols[last][3].lineno, symbols[last][3].lexpos),
+                  (102, last))
+
+    # the same text again is only parsed after the last statement
+    assert_equals(incremental.parse(inserted), calc.parse(inserted))
+    assert_equals(incremental.resumed, inserted.rindex(';') + 1)
+
+
+def test_errors():
+    calc = Calc()
+    incremental = calc.parser.incremental('statement', calc.lexer)
+    text = program(10)
+    incremental.parse(text)
+    assert_raises(SyntaxError, incremental.parse, text.replace('v5 =', 'v5'))
+    # after an error, the next parse starts from the beginning
+    assert_equals(incremental.parse(text), calc.parse(text))
+    assert_equals(incremental.resumed, 0)
+
+
+def test_error_productions():
+    statements = Statements()
+    incremental = statements.parser.incremental('statement',
+                                                statements.lexer)
+    text = 'a = 1;\n= b = 2;\nc = 3;\n'
+    statements.errors = []
+    value = incremental.parse(text)
+    # (positions are tracked, so only the first fields match the plain parse)
+    assert_equals([s[:3] for s in value[1:]],
+                  [s[:3] for s in statements.parse(text, 0, False)[0][1:]])
+    assert_equals(value[2], ('error', 2, 14))
+
+
+def test_errors_are_reported_again():
+    skipping = Skipping()
+    incremental = skipping.parser.incremental('statement', skipping.lexer)
+    text = 'a = 1;\n= b = 2;\nc = 3;\nd = 4;\n'
+    skipping.errors = []
+    incremental.parse(text)
+    assert_equals(skipping.errors, [7])
+    # the parse of an edit after the error goes through it again
+    skipping.errors = []
+    incremental.parse(text.replace('d = 4', 'd = 5'))
+    assert_equals(skipping.errors, [7])
+    assert_equals(incremental.resumed, 0)
+
+
+def test_parse_many():
+    calc = Calc()
+    incremental = calc.parser.incremental('statement', calc.lexer)
+    texts = [program(10), program(11)]
+    assert_equals(incremental.parse_many(texts),
+                  [calc.parse(text) for text in texts])
+    assert_equals(incremental.resumed, program(10).rindex(';') + 1)
@@ -0,0 +1,97 @@
+import random
+import threading
+
+from nose.tools import assert_equals, assert_raises
+
+from calc_grammar import Calc, PROGRAM
+from ply import yacc
+from test_lex_tokens import Statements
+from test_yacc_tables import EXPECTED
+
+
+class Skipping(Statements):
+    """Statements whose p_error skips past the next semicolon by itself
+    (which is only right between statements)."""
+
+    def p_error(self, p):
+        self.errors.append(p and p.lexpos)
+        while p is not None and p.type != 'SEMI':
+            p = yacc.token()
+        yacc.errok()
+        return yacc.token()
+
+
+def random_program(rng):
+    return ''.join('%s = %s;\n' % (rng.choice('xyz'),
+                                   ' '.join(rng.choice('xy12+-*/')
+                                            for _ in xrange(7)))
+                   for _ in xrange(3))
+
+
+def outcome(parse, text):
+    try:
+        return parse(text)
+    except SyntaxError as e:
+        return str(e)
+
+
+def test_sessions_share_tables():
+    calc = Calc()
+    session = calc.parser.session(calc.lexer)
+    assert_equals(session.action_table is calc.parser.action_table, True)
+    assert_equals(session.productions is calc.parser.productions, True)
+    assert_equals(session.lexer is calc.lexer, False)
+    assert_equals(session.parse(PROGRAM), EXPECTED)
+    assert_equals(session.symstack, [])
+
+
+def test_parse_many():
+    calc = Calc()
+    rng = random.Random(7)
+    texts = [PROGRAM] + [random_program(rng) for _ in xrange(50)]
+    assert_equals(calc.parser.parse_many([PROGRAM, PROGRAM], calc.lexer),
+                  [EXPECTED, EXPECTED])
+    session = calc.parser.session(calc.lexer)
+    assert_equals([outcome(session.parse, text) for text in texts],
+                  [outcome(calc.parse, text) for text in texts])
+
+
+def test_parses_start_afresh():
+    statements = Statements()
+    session = statements.parser.session(statements.lexer)
+    statements.errors = []
+    first, second = session.parse_many(['a = 1;\nb = 2;\n', 'c = 3;'])
+    # the line numbers of the second input start from 1 again
+    assert_equals([s[2] for s in first[1:]], [1, 2])
+    assert_equals([s[2] for s in second[1:]], [1])
+
+
+def test_error_recovery_functions():
+    skipping = Skipping()
+    skipping.errors = []
+    session = skipping.parser.session(skipping.lexer)
+    assert_equals(session.parse('a = 1; = b = 2; c = 3;')[1:],
+                  [('a', 1, 1, (0, 0), (0, 0), (0, 0)),
+                   ('c', 3, 1, (16, 16), (0, 0), (0, 0))])
+    assert_equals(skipping.errors, [7])
+    assert_raises(yacc.YaccError, yacc.errok)
+
+
+def test_threads():
+    calc = Calc()
+    rng = random.Random(8)
+    texts = [random_program(rng) for _ in xrange(100)]
+    expected = [outcome(calc.parse, text) for text in texts]
+    results = {}
+
+    def parse_all(n):
+        session = calc.parser.session(calc.lexer)
+        results[n] = [outcome(session.parse, text) for text in texts]
+
+    threads = [threading.Thread(target=parse_all, args=(n,))
+               for n in xrange(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert_equals(results, dict((n, expected) for n in xrange(8)))
@@ -0,0 +1,126 @@
+import os
+import shutil
+import tempfile
+
+from nose.tools import assert_equals, assert_raises
+
+from calc_grammar import Calc, PROGRAM
+from parser_tables import grammar_info
+from ply import yacc
+
+EXPECTED = [('x', ('+', 1, ('*', 2, ('name', 'y')))),
+            ('y', ('/', ('-', ('name', 'x'), 3), 4)),
+            ('z', ('-', ('*', ('name', 'x'), ('+', ('name', 'y'), 2)),
+                   ('/', 7, ('name', 'x'))))]
+
+
+class Sums(Calc):
+    """Calc without operator precedence: another grammar."""
+    precedence = (('left', 'PLUS', 'MINUS', 'TIMES', 'DIVIDE'),)
+
+
+class NotRegenerated(Exception):
+    pass
+
+
+def no_generation(*args, **kwargs):
+    raise NotRegenerated()
+
+
+class TestTableCache(object):
+    def setup(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'calc.tables')
+        yacc._binary_tables.clear()
+
+    def teardown(self):
+        shutil.rmtree(self.directory)
+
+    def signature(self):
+        return yacc.LRTable().read_binary_table(self.path)
+
+    def calc(self, path=None):
+        return Calc(tabcache=path or self.path, write_tables=1,
+                    outputdir=self.directory)
+
+    def test_round_trip(self):
+        built = self.calc()
+        assert_equals(built.parse(PROGRAM), EXPECTED)
+        assert_equals(sorted(os.listdir(self.directory)),
+                      ['calc.tables', 'calc_parsetab.py'])
+
+        generate = yacc.LRGeneratedTable
+        yacc.LRGeneratedTable = no_generation
+        try:
+            # from the tables decoded by this process, then from the file
+            cached = self.calc()
+            yacc._binary_tables.clear()
+            loaded = self.calc()
+        finally:
+            yacc.LRGeneratedTable = generate
+        for calc in (cached, loaded):
+            assert_equals(calc.parser.action, built.parser.action)
+            assert_equals(calc.parser.goto, built.parser.goto)
+            assert_equals(calc.parse(PROGRAM), EXPECTED)
+
+        # without a cache the tables are generated again
+        yacc.LRGeneratedTable = no_generation
+        try:
+            assert_raises(NotRegenerated, Calc)
+        finally:
+            yacc.LRGeneratedTable = generate
+
+    def test_stale_cache_is_regenerated(self):
+        self.calc()
+        signature = self.signature()
+        lr = yacc.LRTable()
+        lr.read_binary_table(self.path)
+        lr.write_binary_table(self.path, 'another grammar')
+        assert_equals(self.signature(), 'another grammar')
+
+        assert_equals(self.calc().parse(PROGRAM), EXPECTED)
+        assert_equals(self.signature(), signature)
+
+    def test_corrupt_cache_is_regenerated(self):
+        self.calc()
+        signature = self.signature()
+        for data in ('', 'not tables', yacc._tab_magic + '\0' * 16):
+            with open(self.path, 'wb') as f:
+                f.write(data)
+            yacc._binary_tables.clear()
+            assert_raises(Exception, self.signature)
+            assert_equals(self.calc().parse(PROGRAM), EXPECTED)
+            assert_equals(self.signature(), signature)
+
+    def test_unwritable_cache(self):
+        path = os.path.join(self.directory, 'missing', 'calc.tables')
+        assert_equals(self.calc(path).parse(PROGRAM), EXPECTED)
+        assert_equals(os.listdir(self.directory), ['calc_parsetab.py'])
+
+    def test_not_written_without_write_tables(self):
+        calc = Calc(tabcache=self.path, outputdir=self.directory)
+        assert_equals(calc.parse(PROGRAM), EXPECTED)
+        assert_equals(os.listdir(self.directory), [])
+
+    def test_caches_of_grammars(self):
+        try:
+            yacc.tab_cache_dir = self.directory
+            calc = Calc(write_tables=1, outputdir=self.directory)
+            sums = Sums(write_tables=1, outputdir=self.directory)
+            # each grammar has a cache of its own
+            names = [os.path.basename(yacc.tab_cache_file(
+                self.directory, grammar_info(module).signature()))
+                for module in (calc, sums)]
+            assert_equals(sorted(os.listdir(self.directory)),
+                          sorted(names + ['calc_parsetab.py']))
+
+            generate = yacc.LRGeneratedTable
+            yacc.LRGeneratedTable = no_generation
+            try:
+                assert_equals(Calc().parse(PROGRAM), EXPECTED)
+                assert_equals(Sums().parse('x = 1 + 2 * 3;'),
+                              [('x', ('*', ('+', 1, 2), 3))])
+            finally:
+                yacc.LRGeneratedTable = generate
+        finally:
+            yacc.tab_cache_dir = None
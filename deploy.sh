@@ -15,6 +15,12 @@ else
 		echo "could not re-create parsetab.py in raco submodule; cannot deploy"
 		exit
 	fi
+	# prebuild the Myrial parser's binary LR table cache
+	pushd appengine ; python parser_tables.py build > /dev/null ; tables_exit_code=$? ; popd
+	if [[ $tables_exit_code != 0 ]] ; then
+		echo "could not build the parser table cache; cannot deploy"
+		exit
+	fi
 	git rev-parse HEAD > appengine/VERSION && \
 	git rev-parse --abbrev-ref HEAD > appengine/BRANCH && \
 	appcfg.py --oauth2 update appengine